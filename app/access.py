@@ -4,12 +4,15 @@ import time
 import pytz
 import base64
 import re
-from bs4 import BeautifulSoup
 
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+
+from . import gmailservice
+from . import htmltext
+from . import storyclusters
+from .podcastfy.utils.tracing import span
 
 # If modifying these scopes, delete the file token.json
 SCOPES = [
@@ -39,16 +42,18 @@ def gmail_authenticate():
         with open("token.json", "w") as token:
             token.write(creds.to_json())
 
-    return build("gmail", "v1", credentials=creds)
+    return gmailservice.build_gmail_service(creds)
 
 def get_emails(service, query):
-    results = service.users().messages().list(userId='me', q=query).execute()
-    messages = results.get('messages', [])
+    with span("gmail.list") as current:
+        results = service.users().messages().list(userId='me', q=query).execute()
+        messages = results.get('messages', [])
+        current.set(messages=len(messages))
     return messages
 
 def clean_html_content(html):
     """
-    Cleans and normalizes HTML content using BeautifulSoup and regex.
+    Cleans and normalizes HTML content with the configured HTML-to-text backend.
     
     Args:
         html (str): Raw HTML content.
@@ -56,39 +61,140 @@ def clean_html_content(html):
     Returns:
         str: Cleaned and normalized plain text.
     """
-    soup = BeautifulSoup(html, 'html.parser')
-    text = soup.get_text(separator="\n")  # Keep logical newlines
+    return htmltext.html_to_text(html)
+
+# For multipart/alternative, which rendering to keep. HTML carries the section
+# structure the boilerplate filters rely on; the plain-text copy is usually a
+# lossy duplicate of it.
+PREFERRED_ALTERNATIVE = 'text/html'
+
+# Footer and chrome lines that never carry news, when they come after the last news
+# paragraph: a headline about a privacy policy or unsubscribe rates is news
+FOOTER_LINE = re.compile(
+    r'unsubscribe|manage (?:your )?(?:email )?(?:preferences|subscriptions?)'
+    r'|view (?:this email |it )?(?:in|on) (?:your |a |the )?(?:browser|web)'
+    r'|you(?:\'re| are) receiving this|you received this|was this email forwarded'
+    r'|privacy policy|update your (?:email )?preferences|add us to your address book',
+    re.IGNORECASE,
+)
+
+# A sentence of more words that is not a footer line is news, and the footer starts
+# after it. Addresses and link rows of the footer do not end a sentence.
+FOOTER_MAX_WORDS = 8
+SENTENCE_END = re.compile(r'[.!?]["\')\u201d\u2019]*\s*$')
+
+# A line with at most this many words besides its footer phrases is chrome anywhere,
+# e.g. "View in browser" or "Unsubscribe | Manage preferences"
+CHROME_MAX_WORDS = 2
+
+# Rough size of an LLM input token, for reporting only
+CHARS_PER_TOKEN = 4
+
+def decode_part(part):
+    data = part.get('body', {}).get('data')
+    if not data:
+        return ""
+    return base64.urlsafe_b64decode(data.encode('UTF-8')).decode('utf-8', errors='replace')
+
+def _is_chrome(line):
+    rest = re.sub(r'[^\w\s]', ' ', FOOTER_LINE.sub(' ', line))
+    return len(rest.split()) <= CHROME_MAX_WORDS
+
+def strip_footer_lines(text):
+    """
+    Drops chrome lines, and footer lines in the trailing block after the last news paragraph.
+    """
+    lines = text.split("\n")
+    footer_start = 0
+    for i, line in enumerate(lines):
+        if (len(line.split()) > FOOTER_MAX_WORDS and SENTENCE_END.search(line)
+                and not FOOTER_LINE.search(line)):
+            footer_start = i + 1
+    body = [line for line in lines[:footer_start] if not (FOOTER_LINE.search(line) and _is_chrome(line))]
+    footer = [line for line in lines[footer_start:] if not FOOTER_LINE.search(line)]
+    return "\n".join(body + footer)
+
+def _is_attachment(part):
+    return bool(part.get('filename')) or part.get('body', {}).get('attachmentId') is not None
+
+def _leaf_type(part):
+    """The text type a part would render as: its own type, or the best one nested inside it."""
+    if part.get('parts'):
+        types = [_leaf_type(p) for p in part['parts']]
+        if PREFERRED_ALTERNATIVE in types:
+            return PREFERRED_ALTERNATIVE
+        return next((t for t in types if t), None)
+    mime_type = part.get('mimeType')
+    if mime_type in ('text/plain', 'text/html') and not _is_attachment(part):
+        return mime_type
+    return None
+
+def _estimate_text_chars(part):
+    """Approximate text size of a part without parsing it, for the savings report."""
+    if part.get('parts'):
+        return sum(_estimate_text_chars(p) for p in part['parts'])
+    if _leaf_type(part) is None:
+        return 0
+    decoded = decode_part(part)
+    if part.get('mimeType') == 'text/html':
+        decoded = re.sub(r'<[^>]+>', ' ', decoded)
+    return len(htmltext.normalize_whitespace(decoded))
+
+def extract_body(part, stats=None):
+    """
+    Extracts the readable text of a MIME part.
 
-    # Normalize whitespace
-    text = text.replace('\xa0', ' ')           # Non-breaking spaces → normal spaces
-    text = re.sub(r'[ \t]+', ' ', text)        # Collapse tabs and multiple spaces
-    text = re.sub(r'\n\s*\n+', '\n\n', text)   # Collapse multiple blank lines
-    text = text.strip()                        # Trim leading/trailing whitespace
+    multipart/alternative keeps only one rendering (PREFERRED_ALTERNATIVE when present),
+    other multiparts are walked recursively, attachments and non-text parts are skipped,
+    and hidden HTML elements and footer lines are dropped.
 
-    return text
+    Args:
+        part (dict): A Gmail API message payload or one of its parts.
+        stats (dict): Optional accumulator; "dropped_chars" counts text left out by
+            choosing one alternative.
+
+    Returns:
+        str: Plain text of the part.
+    """
+    mime_type = part.get('mimeType', '')
+    children = part.get('parts') or []
+
+    if children:
+        if mime_type == 'multipart/alternative':
+            candidates = [p for p in children if _leaf_type(p)]
+            if not candidates:
+                return ""
+            # Alternatives are ordered plainest first, so prefer the last matching one
+            chosen = next(
+                (p for p in reversed(candidates) if _leaf_type(p) == PREFERRED_ALTERNATIVE),
+                candidates[-1],
+            )
+            if stats is not None:
+                stats['dropped_chars'] = stats.get('dropped_chars', 0) + sum(
+                    _estimate_text_chars(p) for p in candidates if p is not chosen
+                )
+            return extract_body(chosen, stats)
+        texts = [extract_body(p, stats) for p in children]
+        return "\n".join(t for t in texts if t)
+
+    if _leaf_type(part) is None:
+        return ""
+    decoded = decode_part(part)
+    if mime_type == 'text/html':
+        # Parsed exactly once; the result is already plain text
+        decoded = htmltext.html_to_text(decoded, strip_hidden=True)
+    return strip_footer_lines(decoded)
 
 def extract_parts(parts):
-    body = ""
-    for part in parts:
-        mime_type = part.get('mimeType')
-        if part.get('parts'):
-            extract_parts(part['parts'])
-        elif mime_type in ['text/plain', 'text/html']:
-            data = part['body'].get('data')
-            if data:
-                decoded = base64.urlsafe_b64decode(data.encode('UTF-8')).decode('utf-8')
-                if mime_type == 'text/html':
-                    soup = BeautifulSoup(decoded, 'html.parser')
-                    decoded = soup.get_text()
-                body += decoded + "\n"
-    return body
+    return extract_body({'mimeType': 'multipart/mixed', 'parts': parts})
 
 def get_content(service, messages) -> str:
     emails_data = []
 
     for msg in messages:
         msg_id = msg['id']
-        msg_detail = service.users().messages().get(userId='me', id=msg_id, format='full').execute()
+        with span("gmail.get", message_id=msg_id):
+            msg_detail = service.users().messages().get(userId='me', id=msg_id, format='full').execute()
 
         payload = msg_detail.get('payload', {})
         headers = payload.get('headers', [])
@@ -96,24 +202,28 @@ def get_content(service, messages) -> str:
         subject = next((h['value'] for h in headers if h['name'] == 'Subject'), '')
         sender = next((h['value'] for h in headers if h['name'] == 'From'), '')
 
-        parts = payload.get('parts', [])
-        body = ""
+        stats = {}
+        with span("html.clean") as current:
+            body = htmltext.normalize_whitespace(extract_body(payload, stats))
+            current.set(chars=len(body), dropped_chars=stats.get('dropped_chars', 0))
 
-        if 'data' in payload.get('body', {}):
-            # Handle non-multipart emails
-            body = base64.urlsafe_b64decode(payload['body']['data']).decode('utf-8')
-        else:
-            body = extract_parts(parts)
+        kept_tokens = len(body) // CHARS_PER_TOKEN
+        dropped_tokens = stats.get('dropped_chars', 0) // CHARS_PER_TOKEN
+        if dropped_tokens:
+            saved = 100 * dropped_tokens / (kept_tokens + dropped_tokens)
+            print(f"{subject}: ~{kept_tokens} input tokens, ~{dropped_tokens} saved "
+                  f"by skipping duplicate alternatives ({saved:.0f}% less)")
 
         emails_data.append({
+            'id': msg_id,
             'subject': subject,
             'from': sender,
-            'body': clean_html_content(body.strip())
+            'body': body
         })
     return emails_data
 
-def create_podcast_content(service):
-
+def get_todays_emails(service):
+    """Lists today's newsletter messages (ids only; the bodies are fetched by get_content)."""
     today_start = datetime.now(pytz.timezone('US/Eastern')).replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
     print("Today Start: " + str(today_start))
     unix_todaystart = int(time.mktime(today_start.timetuple()))
@@ -123,15 +233,41 @@ def create_podcast_content(service):
     query = " OR ".join([f'from:{sender}' for sender in senders])
     query = f"({query}) after:{unix_todaystart}"
     print("Using Query: " + query)
-    emails = get_emails(service, query)
+    return get_emails(service, query)
+
+def create_podcast_content(service, boilerplate_index=None, emails=None):
+    """
+    Builds the digest input from today's newsletters.
+
+    Args:
+        service: Gmail API service.
+        boilerplate_index (BoilerplateIndex): Optional per-sender boilerplate to strip.
+        emails (list): Messages listed by get_todays_emails; listed here when omitted.
+
+    Returns:
+        str: The newsletters' text, or None when there are none.
+    """
+    if emails is None:
+        emails = get_todays_emails(service)
 
     daily_content = ""
 
     if emails:
         news = get_content(service, emails)
+        if boilerplate_index is not None:
+            with span("boilerplate.strip", newsletters=len(news)):
+                for content in news:
+                    body = content['body']
+                    # Strip with what was learned from earlier issues, then learn from this one
+                    content['body'] = boilerplate_index.strip(content['from'], body)
+                    boilerplate_index.observe(content['from'], body, issue_id=content['id'])
+                    print(f"Boilerplate removed: ~{(len(body) - len(content['body'])) // CHARS_PER_TOKEN} tokens")
+        # The same story often runs in Axios AM, Axios PM and Morning Brew; discuss it once
+        with span("stories.merge", newsletters=len(news)):
+            news = storyclusters.merge_duplicate_stories(news)
         count = 0
         for content in news:
-            daily_content = daily_content + f"NEWSLETTER {count}\n" + content['body']
+            daily_content = daily_content + f"NEWSLETTER {count}\n" + content['body'] + "\n"
             print(f"title: {content['subject']}")
             count += 1
         print(f"Found {count} newsletters.")
@@ -3,17 +3,28 @@ from flask import Flask, redirect, url_for, session, request, abort, render_temp
 from google_auth_oauthlib.flow import Flow
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
-from googleapiclient.discovery import build
 from google.oauth2.credentials import Credentials as UserCredentials
 from google.cloud import datastore
 from google.cloud import tasks_v2
 from dotenv import load_dotenv
+import functools
+import json
 import secrets
+import shutil
+import tempfile
+from datetime import datetime
+import pytz
 import pathlib
 import requests
 from . import access  # Ensure access.py is imported to use its functions
 from . import podcast  # Ensure podcast.py is imported to use its functions
 from . import storagemanagement  # Ensure storage.py is imported to use its functions
+from . import boilerplate
+from . import credentialstore
+from . import digestpipeline
+from . import gmailservice
+from .podcastfy import hls
+from .podcastfy.checkpoint import CheckpointStore
 
 load_dotenv()
 
@@ -24,6 +35,20 @@ GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
 OAUTH_REDIRECT_URI = os.getenv("OAUTH_REDIRECT_URI", "https://127.0.0.1:5000/oauth2callback")
 PROJECT_ID = "quiknews-470023"
+BUCKET_NAME = "newsletter_content"
+BOILERPLATE_INDEX_BLOB = "state/boilerplate_index.json"
+BOILERPLATE_INDEX_PATH = "/tmp/boilerplate_index.json"
+# Per-stage episode artifacts; a retried digest resumes from the first missing one
+CHECKPOINT_ROOT = f"gs://{BUCKET_NAME}/checkpoints"
+EPISODE_DIR = "/tmp/episodes"
+# Workers and input queue size per digest stage, each sized to its own bottleneck:
+# Gmail I/O, the LLM quota, the TTS quota, and audio export plus upload
+PIPELINE_STAGES = {
+    "fetch": {"workers": 8, "queue_size": 16},
+    "generate": {"workers": 4, "queue_size": 4},
+    "synthesize": {"workers": 4, "queue_size": 4},
+    "upload": {"workers": 2, "queue_size": 4},
+}
 
 # Scopes:
 # - gmail.readonly proves Gmail authorization
@@ -35,39 +60,24 @@ SCOPES = [
     "https://www.googleapis.com/auth/gmail.readonly"
 ]
 
+@functools.lru_cache(maxsize=1)
 def ds_client():
+    # One Datastore client per process; it is reused by every request and the digest run
     return datastore.Client(project=PROJECT_ID)
 
 def save_credentials(user_email, creds):
-    # Consider encrypting creds.refresh_token with KMS before save!
     client = ds_client()
-    key = client.key("Email", user_email)
-    entity = datastore.Entity(key=key)
-    entity.update({
-        "token": creds.token,
-        "refresh_token": getattr(creds, "refresh_token", None),
-        "token_uri": creds.token_uri,
-        "client_id": GOOGLE_CLIENT_ID,
-        "client_secret": GOOGLE_CLIENT_SECRET,
-        "scopes": creds.scopes,
-        "expiry": creds.expiry.isoformat() if getattr(creds, "expiry", None) else None,
-    })
+    entity = credentialstore.credentials_to_entity(
+        client, user_email, creds, client_id=GOOGLE_CLIENT_ID, client_secret=GOOGLE_CLIENT_SECRET
+    )
     client.put(entity)
 
 def load_credentials(email: str) -> UserCredentials | None:
-    client = datastore.Client(project=PROJECT_ID)
-    entity = client.get(client.key("Email", email))
+    client = ds_client()
+    entity = client.get(client.key(credentialstore.KIND, email))
     if not entity:
         return None
-    # If you encrypted the refresh_token, decrypt here via Cloud KMS.
-    return UserCredentials(
-        token=entity["token"],
-        refresh_token=entity["refresh_token"],
-        token_uri=entity["token_uri"],
-        client_id=entity["client_id"],
-        client_secret=entity["client_secret"],
-        scopes=entity["scopes"],
-    )
+    return credentialstore.credentials_from_entity(entity)
 
 def _store_google_creds(creds):
     # Keep it small; avoid putting huge objects in cookies. Consider Flask-Session for server-side storage. WHAT DOES THIS MEAN???
@@ -105,7 +115,7 @@ def _load_google_creds(offline=False):
 def get_gmail_service(creds=None):
     if not creds:
         return None
-    return build("gmail", "v1", credentials=creds)
+    return gmailservice.build_gmail_service(creds)
 
 def flow_for_request():
     # Build Flow from explicit client config so we keep everything in one file (no JSON needed).
@@ -208,30 +218,110 @@ def kick_ai():
     client.create_task(parent=parent, task=task)
     return ("ok", 200)
 
+def fetch_stage(job, checkpoints, today, boilerplate_index):
+    """Fetches a user's newsletters. Returns None if there was no news."""
+    email = job["email"]
+    service = get_gmail_service(job["creds"])
+    if service is None:
+        raise RuntimeError("Gmail service not initialized (check refresh token / client credentials).")
+    emails = access.get_todays_emails(service)
+    if not emails:
+        # Nothing new: keep yesterday's episode and skip the LLM/TTS render and upload
+        print("No new emails found for", email)
+        return None
+    # Fetched content is keyed by the messages it was built from: a retry of today's
+    # digest skips fetching the bodies again, and a newsletter that arrived since is
+    # a new key rather than a stale snapshot
+    fetch_key = CheckpointStore.key("fetch", email, today, *sorted(m["id"] for m in emails))
+    content = (checkpoints.get(fetch_key) or b"").decode("utf-8")
+    if not content:
+        content = access.create_podcast_content(service, boilerplate_index, emails)
+        if not content:
+            print("No new emails found for", email)
+            return None
+        checkpoints.put(fetch_key, content.encode("utf-8"))
+    job["content"] = content
+    return job
+
+def generate_stage(job):
+    # Each episode gets its own directory so users in different stages never share files;
+    # the local part alone is not unique (a@x.com and a@y.com)
+    os.makedirs(EPISODE_DIR, exist_ok=True)
+    job["output_dir"] = tempfile.mkdtemp(prefix=f"{job['email'].split('@')[0]}_", dir=EPISODE_DIR)
+    job["transcript"] = podcast.generate_transcript(job.pop("content"), job["output_dir"], CHECKPOINT_ROOT)
+    return job
+
+def hls_publisher(email_prefix):
+    """Uploads every HLS segment and playlist of a user's episode as soon as it is written."""
+    def publish(path):
+        # Revalidated on every request: the playlist grows and re-renders rewrite segments
+        storagemanagement.upload_blob(
+            BUCKET_NAME, path, f"static/{email_prefix}_hls/{os.path.basename(path)}",
+            hls.CONTENT_TYPES[os.path.splitext(path)[1]], cache_control="no-cache",
+        )
+    return publish
+
+def synthesize_stage(job):
+    publish = hls_publisher(job["email"].split('@')[0])
+    job["audio"] = podcast.generate_audio(job["transcript"], job["output_dir"], CHECKPOINT_ROOT, publish)
+    return job
+
+def upload_stage(job):
+    email_prefix = job["email"].split('@')[0]
+    profile = podcast.audio_profile()
+    storagemanagement.upload_blob(
+        BUCKET_NAME, job["audio"], f"static/{email_prefix}_podcast.{profile.extension}", profile.mime_type
+    )
+    shutil.rmtree(job["output_dir"], ignore_errors=True)
+    print("200: News digest created for", job["email"])
+    return job
+
+def print_timing_report(episode):
+    outcome = "failed" if episode.error else "done" if episode.completed else "skipped"
+    print(f"Timing report for {episode.key} ({outcome} at {episode.stage}): {json.dumps(episode.trace.report())}")
+
 @app.route("/tasks/newsletter-digest", methods=["POST"])
 def newsletter_digest():
     # Only allow App Engine Cron
     if not request.headers.get("X-Appengine-Queuename"):
         abort(403)
 
-    client = datastore.Client(project=PROJECT_ID)
-    query = client.query(kind="Email")
-    query.keys_only()
-    for e in query.fetch():
-        creds = load_credentials(e.key.name)
-        email = e.key.name
-        print("Loaded creds from Datastore: ", email)
-
-        service = get_gmail_service(creds)
-        if service is None:
-            raise RuntimeError("Gmail service not initialized (check refresh token / client credentials).")
-        content = access.create_podcast_content(service)
-        if content is None:
-            print("No new emails found", 200)
-        podcast.generate_pod(content)
-        email_prefix = email.split('@')[0]
-        storagemanagement.upload_blob("newsletter_content", "/tmp/podcast.mp3", f"static/{email_prefix}_podcast.mp3")
-        print("200: News digest created")
+    # Bulk-load every user's credentials and refresh expiring tokens up front,
+    # then write the refreshed tokens back in a single batch
+    store = credentialstore.CredentialStore(client=ds_client())
+    all_creds = store.load_all(store.emails())
+    all_creds = store.refresh_expiring(all_creds)
+    store.flush()
+    print(f"Loaded creds from Datastore for {len(all_creds)} users")
+
+    # Per-sender newsletter templates, shared by all users and refined every run
+    storagemanagement.download_blob(BUCKET_NAME, BOILERPLATE_INDEX_BLOB, BOILERPLATE_INDEX_PATH)
+    boilerplate_index = boilerplate.BoilerplateIndex.load(BOILERPLATE_INDEX_PATH)
+
+    checkpoints = CheckpointStore(CHECKPOINT_ROOT)
+    today = datetime.now(pytz.timezone('US/Eastern')).date().isoformat()
+
+    # Users flow through the stages one after another, so while one user's episode is
+    # synthesized the next one's transcript is being generated
+    stages = [
+        digestpipeline.Stage(
+            "fetch",
+            functools.partial(fetch_stage, checkpoints=checkpoints, today=today, boilerplate_index=boilerplate_index),
+            **PIPELINE_STAGES["fetch"],
+        ),
+        digestpipeline.Stage("generate", generate_stage, **PIPELINE_STAGES["generate"]),
+        digestpipeline.Stage("synthesize", synthesize_stage, **PIPELINE_STAGES["synthesize"]),
+        digestpipeline.Stage("upload", upload_stage, **PIPELINE_STAGES["upload"]),
+    ]
+    jobs = ((email, {"email": email, "creds": creds}) for email, creds in all_creds.items())
+    # Per-episode timing report: where the run's time budget went for this user
+    episodes = digestpipeline.run_pipeline(stages, jobs, on_done=print_timing_report)
+    print(f"Digest run: {sum(e.completed for e in episodes)} episodes, "
+          f"{sum(e.error is not None for e in episodes)} failed, {len(episodes)} users")
+
+    boilerplate_index.save(BOILERPLATE_INDEX_PATH)
+    storagemanagement.upload_blob(BUCKET_NAME, BOILERPLATE_INDEX_PATH, BOILERPLATE_INDEX_BLOB)
+    return ("ok", 200)
 
 @app.route("/home")
 def home():
@@ -241,7 +331,11 @@ def home():
     # transcript_filepath = "tmp/transcript.txt"
     # audio_filepath = "tmp/podcast.mp3"
     email_prefix = session["user"]["email"].split("@")[0]
-    audio_url = f"https://storage.googleapis.com/newsletter_content/static/{email_prefix}_podcast.mp3"
+    profile = podcast.audio_profile()
+    audio_url = f"https://storage.googleapis.com/newsletter_content/static/{email_prefix}_podcast.{profile.extension}"
+    playlist_url = None
+    if podcast.hls_enabled():
+        playlist_url = f"https://storage.googleapis.com/newsletter_content/static/{email_prefix}_hls/{hls.PLAYLIST_NAME}"
 
     # if podcast.is_file_empty(transcript_filepath):
     #     service = get_gmail_service()
@@ -251,7 +345,8 @@ def home():
     #     service = get_gmail_service()
     #     podcast.generate_audio(transcript_filepath)
 
-    return render_template("home.html", user=session["user"], audio_filename=audio_url)
+    return render_template("home.html", user=session["user"], audio_filename=audio_url, audio_type=profile.mime_type,
+                           playlist_url=playlist_url)
 
 @app.route("/logout")
 def logout():
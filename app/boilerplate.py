@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from email.utils import parseaddr
+
+_DIGITS = re.compile(r'\d+')
+_NON_WORD = re.compile(r'[^\w ]+')
+_SPACES = re.compile(r'\s+')
+
+# Story labels ("Why it matters:", "Go deeper:") recur in every issue but introduce the
+# news after them, so they are never boilerplate
+LABEL_MAX_WORDS = 5
+
+def _is_label(line):
+    line = line.strip()
+    return line.endswith(":") and len(line.split()) <= LABEL_MAX_WORDS
+
+class BoilerplateIndex:
+    """
+    Learns each sender's recurring template lines (sponsor blocks, "view in browser"
+    links, social links, footers) from past issues and strips them from new ones.
+
+    A line is boilerplate once the sender has at least `min_issues` issues on record and
+    the line appeared in at least `threshold` of them. Lines are stored as short
+    fingerprints, so the index stays small and can be persisted as JSON and updated
+    incrementally after every issue.
+    """
+
+    VERSION = 1
+
+    def __init__(self, data=None, min_issues=3, threshold=0.6,
+                 max_fingerprints=5000, max_recent_issues=500, max_strip_ratio=0.9):
+        data = data or {}
+        self.senders = data.get("senders", {}) if data.get("version") == self.VERSION else {}
+        self.min_issues = min_issues
+        self.threshold = threshold
+        self.max_fingerprints = max_fingerprints
+        self.max_recent_issues = max_recent_issues
+        # Guard against a bad template wiping out a whole issue
+        self.max_strip_ratio = max_strip_ratio
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """Loads an index from a JSON file, or starts an empty one if it does not exist."""
+        if not path or not os.path.exists(path):
+            return cls(**kwargs)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(json.load(f), **kwargs)
+        except (OSError, ValueError) as e:
+            print(f"Could not read boilerplate index {path}: {e}")
+            return cls(**kwargs)
+
+    def save(self, path):
+        with self._lock:
+            data = {"version": self.VERSION, "senders": self.senders}
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+
+    @staticmethod
+    def sender_key(from_header):
+        """Normalizes a From header ("Axios AM <am@axios.com>") to its address."""
+        address = parseaddr(from_header or "")[1]
+        return (address or from_header or "").strip().lower()
+
+    @staticmethod
+    def fingerprint(line):
+        """Fingerprint of a line that ignores case, punctuation, spacing and numbers (dates, counts)."""
+        normalized = _DIGITS.sub("0", line.lower())
+        normalized = _SPACES.sub(" ", _NON_WORD.sub(" ", normalized)).strip()
+        if not normalized:
+            return None
+        return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+    def _template(self, key):
+        return self.senders.setdefault(key, {"issues": 0, "lines": {}, "recent": []})
+
+    def strip(self, sender, text):
+        """Removes the sender's learned boilerplate lines from an issue's text."""
+        key = self.sender_key(sender)
+        with self._lock:
+            template = self.senders.get(key)
+            if not template or template["issues"] < self.min_issues:
+                return text
+            cutoff = self.threshold * template["issues"]
+            counts = template["lines"]
+
+            lines = text.split("\n")
+            kept = []
+            removed = 0
+            for line in lines:
+                fp = self.fingerprint(line)
+                if fp is not None and counts.get(fp, 0) >= cutoff and not _is_label(line):
+                    removed += 1
+                    continue
+                kept.append(line)
+
+        non_empty = sum(1 for line in lines if line.strip())
+        if non_empty and removed / non_empty > self.max_strip_ratio:
+            print(f"Boilerplate filter would remove {removed}/{non_empty} lines from {key}; keeping issue intact")
+            return text
+        return "\n".join(kept)
+
+    def observe(self, sender, text, issue_id=None):
+        """
+        Records an issue's lines. Each issue is counted once: pass its Gmail message id as
+        `issue_id`, so an issue observed twice is skipped even with a fixed subject line.
+        The same issue in another user's mailbox has another message id, so issues are
+        also recognized by their normalized lines.
+        """
+        key = self.sender_key(sender)
+        fingerprints = {fp for fp in map(self.fingerprint, text.split("\n")) if fp is not None}
+        content = hashlib.blake2b("".join(sorted(fingerprints)).encode("utf-8"), digest_size=8).hexdigest()
+        seen = [content]
+        if issue_id:
+            seen.append(hashlib.blake2b(issue_id.encode("utf-8"), digest_size=8).hexdigest())
+
+        with self._lock:
+            template = self._template(key)
+            if any(issue in template["recent"] for issue in seen):
+                return
+            template["recent"].extend(seen)
+            del template["recent"][:-2 * self.max_recent_issues]
+
+            template["issues"] += 1
+            counts = template["lines"]
+            for fp in fingerprints:
+                counts[fp] = counts.get(fp, 0) + 1
+
+            if len(counts) > self.max_fingerprints:
+                # Keep the most frequent lines; one-off story lines are the bulk of the index
+                keep = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+                template["lines"] = dict(keep[:int(self.max_fingerprints * 0.8)])
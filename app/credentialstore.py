@@ -0,0 +1,137 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List
+
+from google.auth.transport import requests as google_requests
+from google.cloud import datastore
+from google.oauth2.credentials import Credentials as UserCredentials
+
+PROJECT_ID = "quiknews-470023"
+KIND = "Email"
+
+# Datastore caps lookups at 1000 keys and commits at 500 entities per request
+GET_BATCH_SIZE = 1000
+PUT_BATCH_SIZE = 500
+
+def _batched(items: List, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _utc_now() -> datetime:
+    """Current time as the naive UTC datetime google-auth uses for expiry."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def credentials_from_entity(entity) -> UserCredentials:
+    """Builds user credentials from an "Email" entity."""
+    # If you encrypted the refresh_token, decrypt here via Cloud KMS.
+    expiry = entity.get("expiry")
+    return UserCredentials(
+        token=entity["token"],
+        refresh_token=entity["refresh_token"],
+        token_uri=entity["token_uri"],
+        client_id=entity["client_id"],
+        client_secret=entity["client_secret"],
+        scopes=entity["scopes"],
+        # google-auth compares expiry against a naive UTC datetime
+        expiry=_naive_utc(datetime.fromisoformat(expiry)) if expiry else None,
+    )
+
+def credentials_to_entity(client, user_email: str, creds, client_id=None, client_secret=None):
+    """Builds an "Email" entity holding the user's credentials."""
+    # Consider encrypting creds.refresh_token with KMS before save!
+    entity = datastore.Entity(key=client.key(KIND, user_email))
+    entity.update({
+        "token": creds.token,
+        "refresh_token": getattr(creds, "refresh_token", None),
+        "token_uri": creds.token_uri,
+        "client_id": client_id or creds.client_id,
+        "client_secret": client_secret or creds.client_secret,
+        "scopes": creds.scopes,
+        "expiry": creds.expiry.isoformat() if getattr(creds, "expiry", None) else None,
+    })
+    return entity
+
+class CredentialStore:
+    """
+    Loads, refreshes and persists the credentials of many users with a handful of
+    Datastore round trips: one client, batched get_multi lookups, concurrent token
+    refreshes and batched put_multi write-backs.
+    """
+
+    def __init__(self, client=None, refresh_margin=timedelta(minutes=5), max_workers=16):
+        self.client = client or datastore.Client(project=PROJECT_ID)
+        self.refresh_margin = refresh_margin
+        self.max_workers = max_workers
+        self._dirty: Dict[str, UserCredentials] = {}
+
+    def emails(self) -> List[str]:
+        """Lists every stored user with a keys-only query."""
+        query = self.client.query(kind=KIND)
+        query.keys_only()
+        return [e.key.name for e in query.fetch()]
+
+    def load_all(self, emails: Iterable[str]) -> Dict[str, UserCredentials]:
+        """Bulk-loads credentials for the given users. Unknown users are omitted."""
+        keys = [self.client.key(KIND, email) for email in emails]
+        creds = {}
+        for batch in _batched(keys, GET_BATCH_SIZE):
+            missing = []
+            entities = self.client.get_multi(batch, missing=missing)
+            for entity in entities:
+                creds[entity.key.name] = credentials_from_entity(entity)
+            if missing:
+                print(f"No credentials stored for {len(missing)} users")
+        return creds
+
+    def _needs_refresh(self, creds: UserCredentials) -> bool:
+        if not creds.refresh_token:
+            return False
+        if creds.expiry is None:
+            # Unknown expiry (e.g. entities saved before expiry was recorded): refresh once
+            return True
+        return creds.expiry - self.refresh_margin <= _utc_now()
+
+    def refresh_expiring(self, creds: Dict[str, UserCredentials]) -> Dict[str, UserCredentials]:
+        """
+        Refreshes, in parallel, every token that expires within the refresh margin so no
+        refresh happens later in the middle of a user's digest. Refreshed credentials are
+        staged for the next flush(). Users whose refresh fails are dropped from the result.
+        """
+        expiring = [email for email, c in creds.items() if self._needs_refresh(c)]
+        if not expiring:
+            return creds
+
+        def refresh(email):
+            # Request wraps a requests.Session, which is not shared between threads
+            creds[email].refresh(google_requests.Request())
+            return email
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(expiring))) as pool:
+            futures = {pool.submit(refresh, email): email for email in expiring}
+            for future, email in futures.items():
+                try:
+                    future.result()
+                    self.save(email, creds[email])
+                except Exception as e:
+                    print(f"Failed to refresh token for {email}: {e}")
+                    failed.append(email)
+
+        print(f"Refreshed {len(expiring) - len(failed)}/{len(expiring)} expiring tokens")
+        return {email: c for email, c in creds.items() if email not in failed}
+
+    def save(self, email: str, creds: UserCredentials) -> None:
+        """Stages updated credentials; they are written on the next flush()."""
+        self._dirty[email] = creds
+
+    def flush(self) -> None:
+        """Writes all staged credentials back in batched put_multi calls."""
+        entities = [credentials_to_entity(self.client, email, c) for email, c in self._dirty.items()]
+        for batch in _batched(entities, PUT_BATCH_SIZE):
+            self.client.put_multi(batch)
+        self._dirty.clear()
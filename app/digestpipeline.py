@@ -0,0 +1,143 @@
+import queue
+import threading
+import time
+
+from .podcastfy.utils import tracing
+
+# Tells a worker that its stage has no more input
+_DONE = object()
+
+class Stage:
+    """
+    One step of the digest: a function applied to every episode by the stage's own pool
+    of workers, fed from a bounded queue.
+
+    The function takes the value produced by the previous stage and returns the value for
+    the next one, or None to drop the episode (e.g. a user without new mail).
+    """
+
+    def __init__(self, name, fn, workers=1, queue_size=2):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        # How far the previous stage may run ahead before it blocks
+        self.queue_size = queue_size
+
+class Episode:
+    """One user's episode moving through the stages, with its timing trace."""
+
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+        self.trace = tracing.TraceCollector()
+        self.stage = None
+        self.error = None
+        self.completed = False
+        self._enqueued = None
+
+def _run_stage(stage, episode):
+    wait_ms = (time.perf_counter() - episode._enqueued) * 1000
+    with tracing.span(f"digest.{stage.name}", episode=episode.key, queue_wait_ms=round(wait_ms, 1)):
+        return stage.fn(episode.value)
+
+def run_pipeline(stages, items, on_done=None):
+    """
+    Runs every (key, value) item through the stages in order, each stage on its own
+    worker pool so one user's synthesis overlaps the next user's generation.
+
+    Backpressure: a stage blocks on handing an episode on while the next stage's queue is
+    full, so no stage runs more than its queue size ahead and every pool can be sized to
+    its own bottleneck (Gmail I/O, LLM quota, TTS quota, upload). A failed episode is
+    recorded and the others keep going.
+
+    Returns:
+        list: The Episodes, completed, dropped or failed, in the order they finished.
+    """
+    queues = [queue.Queue(maxsize=stage.queue_size) for stage in stages]
+    finished = []
+    lock = threading.Lock()
+
+    def finish(episode):
+        with lock:
+            finished.append(episode)
+        if on_done is not None:
+            on_done(episode)
+
+    def work(index):
+        stage = stages[index]
+        while True:
+            episode = queues[index].get()
+            if episode is _DONE:
+                return
+            episode.stage = stage.name
+            try:
+                episode.value = tracing.run_collected(episode.trace, _run_stage, stage, episode)
+            except Exception as e:
+                print(f"{stage.name} failed for {episode.key}: {e}")
+                episode.error = e
+                finish(episode)
+                continue
+            if episode.value is None:
+                finish(episode)
+            elif index == len(stages) - 1:
+                episode.completed = True
+                finish(episode)
+            else:
+                episode._enqueued = time.perf_counter()
+                queues[index + 1].put(episode)
+
+    pools = []
+    for index, stage in enumerate(stages):
+        threads = [
+            threading.Thread(target=work, args=(index,), name=f"digest-{stage.name}-{n}", daemon=True)
+            for n in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        pools.append(threads)
+
+    for key, value in items:
+        episode = Episode(key, value)
+        episode._enqueued = time.perf_counter()
+        queues[0].put(episode)
+
+    # Shut the stages down in order: a stage only stops once everything before it has drained
+    for index, threads in enumerate(pools):
+        for _ in threads:
+            queues[index].put(_DONE)
+        for thread in threads:
+            thread.join()
+    return finished
+
+def main(users=12, scale=0.01):
+    """
+    Compares the pipelined digest with running each user's stages back to back, using
+    sleeps sized like a real episode (Gmail fetch 3 s, LLM 20 s, TTS 30 s, upload 2 s).
+    """
+    durations = {"fetch": 3, "generate": 20, "synthesize": 30, "upload": 2}
+    workers = {"fetch": 4, "generate": 2, "synthesize": 3, "upload": 2}
+
+    def sleeper(name):
+        def fn(value):
+            time.sleep(durations[name] * scale)
+            return value
+        return fn
+
+    start = time.perf_counter()
+    for _ in range(users):
+        for name in durations:
+            sleeper(name)(None)
+    sequential = time.perf_counter() - start
+
+    stages = [Stage(name, sleeper(name), workers=workers[name]) for name in durations]
+    start = time.perf_counter()
+    episodes = run_pipeline(stages, [(f"user{i}", i) for i in range(users)])
+    pipelined = time.perf_counter() - start
+
+    completed = sum(e.completed for e in episodes)
+    print(f"{users} users, stage workers {workers}")
+    print(f"sequential: {sequential:.2f} s")
+    print(f"pipelined:  {pipelined:.2f} s ({sequential / pipelined:.1f}x), {completed}/{users} completed")
+
+if __name__ == "__main__":
+    main()
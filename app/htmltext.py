@@ -0,0 +1,151 @@
+import functools
+import os
+import re
+import time
+
+# Precompiled once; clean-up runs on every newsletter
+_HORIZONTAL_WS = re.compile(r'[ \t]+')
+_BLANK_LINES = re.compile(r'\n\s*\n+')
+
+# Tags whose contents are never readable text, the ones BeautifulSoup's get_text skips.
+# <noscript> is not one of them, so every backend keeps its contents like the original
+# html.parser cleaning did.
+_NON_TEXT_TAGS = ["script", "style", "template"]
+
+# Inline styles that hide an element: preheader text, tracking blocks, Outlook-only copies
+_HIDDEN_STYLE = re.compile(
+    r'display\s*:\s*none|visibility\s*:\s*hidden|mso-hide\s*:\s*all'
+    r'|max-height\s*:\s*0(?:px)?\s*(?:;|$|!)|font-size\s*:\s*0(?:px)?\s*(?:;|$|!)',
+    re.IGNORECASE,
+)
+
+# Fastest first. "auto" picks the first backend whose parser is installed.
+BACKEND_PREFERENCE = ["selectolax", "lxml", "html.parser"]
+DEFAULT_BACKEND = os.getenv("HTML_TEXT_BACKEND", "auto")
+
+def normalize_whitespace(text):
+    """
+    Normalizes whitespace in extracted text.
+
+    Args:
+        text (str): Text extracted from HTML or a plain-text email part.
+
+    Returns:
+        str: Text with collapsed spaces and blank lines, trimmed.
+    """
+    text = text.replace('\xa0', ' ')           # Non-breaking spaces → normal spaces
+    text = _HORIZONTAL_WS.sub(' ', text)       # Collapse tabs and multiple spaces
+    text = _BLANK_LINES.sub('\n\n', text)      # Collapse multiple blank lines
+    return text.strip()                        # Trim leading/trailing whitespace
+
+def _selectolax_text(html, strip_hidden=False):
+    # Lexbor is a C HTML5 parser; the whole tree walk happens in C
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(_NON_TEXT_TAGS)
+    if strip_hidden:
+        for node in tree.css("[style]"):
+            if _HIDDEN_STYLE.search(node.attributes.get("style") or ""):
+                node.decompose()
+    root = tree.root
+    return root.text(separator="\n") if root is not None else ""
+
+def _bs4_text(html, parser, strip_hidden=False):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, parser)
+    if strip_hidden:
+        for tag in soup.find_all(style=_HIDDEN_STYLE):
+            tag.decompose()
+    return soup.get_text(separator="\n")
+
+_BACKENDS = {
+    "selectolax": _selectolax_text,
+    "lxml": functools.partial(_bs4_text, parser="lxml"),
+    "html.parser": functools.partial(_bs4_text, parser="html.parser"),
+}
+
+_BACKEND_MODULES = {
+    "selectolax": "selectolax.lexbor",
+    "lxml": "lxml",
+    "html.parser": "bs4",
+}
+
+@functools.lru_cache(maxsize=None)
+def resolve_backend(name=None):
+    """Returns the backend name to use, resolving "auto" to the fastest installed parser."""
+    name = name or DEFAULT_BACKEND
+    if name != "auto":
+        if name not in _BACKENDS:
+            raise ValueError(f"Unknown HTML backend: {name}. Choose from: {', '.join(_BACKENDS)}")
+        return name
+    for candidate in BACKEND_PREFERENCE:
+        try:
+            __import__(_BACKEND_MODULES[candidate])
+            return candidate
+        except ImportError:
+            continue
+    raise ImportError("No HTML parser available; install selectolax, lxml or beautifulsoup4")
+
+def html_to_text(html, backend=None, strip_hidden=False):
+    """
+    Converts HTML to normalized plain text with a single parse.
+
+    Args:
+        html (str): Raw HTML content.
+        backend (str): "selectolax", "lxml", "html.parser" or "auto". Defaults to
+            the HTML_TEXT_BACKEND environment variable, or "auto".
+        strip_hidden (bool): Drop elements hidden with inline styles, such as email
+            preheaders and tracking blocks.
+
+    Returns:
+        str: Cleaned and normalized plain text.
+    """
+    text = _BACKENDS[resolve_backend(backend)](html, strip_hidden=strip_hidden)
+    return normalize_whitespace(text)
+
+def main(corpus_dir="benchmarks/data/newsletters", repeat=5):
+    """
+    Benchmarks every installed backend over a directory of saved newsletter HTML and
+    checks that each one produces the same text as the original BeautifulSoup/html.parser
+    cleaning.
+    """
+    paths = sorted(
+        os.path.join(corpus_dir, name) for name in os.listdir(corpus_dir) if name.endswith(".html")
+    ) if os.path.isdir(corpus_dir) else []
+    if not paths:
+        print(f"No .html files found in {corpus_dir}")
+        return
+
+    corpus = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            corpus.append(f.read())
+
+    # The original clean_html_content: BeautifulSoup with the pure-Python html.parser
+    reference = [html_to_text(html, backend="html.parser") for html in corpus]
+    failures = []
+    for backend in _BACKENDS:
+        try:
+            __import__(_BACKEND_MODULES[backend])
+        except ImportError:
+            print(f"{backend:12s} not installed")
+            continue
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            outputs = [html_to_text(html, backend=backend) for html in corpus]
+        elapsed = (time.perf_counter() - start) / repeat
+
+        mismatches = [path for path, out, ref in zip(paths, outputs, reference) if out != ref]
+        print(f"{backend:12s} {elapsed * 1000:8.1f} ms for {len(corpus)} files, "
+              f"{len(mismatches)} text mismatches")
+        for path in mismatches:
+            print(f"    differs: {path}")
+        failures.extend((backend, path) for path in mismatches)
+
+    assert not failures, f"{len(failures)} outputs differ from the html.parser reference"
+
+if __name__ == "__main__":
+    main()
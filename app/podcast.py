@@ -1,7 +1,9 @@
 from os import path
 import os
 
+from .podcastfy.audio_encoding import OutputProfile
 from .podcastfy.client import generate_podcast, process_content
+from .podcastfy.utils.config_conversation import load_conversation_config
 
 
 # Define a custom conversation config for a tech debate podcast
@@ -33,22 +35,46 @@ def is_file_empty(file_path):
         print(f"Error: File not found at {file_path}")
         return True  # Consider non-existent files as "empty" in this context
 
-def generate_transcript(content):
+def episode_config(output_dir=None):
+    """The podcast config, writing the transcript and audio to output_dir when one is given."""
+    if output_dir is None:
+        return podcast_config
+    return dict(podcast_config, text_to_speech={
+        'output_directories': {'transcripts': output_dir, 'audio': output_dir}
+    })
+
+def tts_settings():
+    """The text_to_speech section of the episode config, defaults included."""
+    return load_conversation_config(episode_config()).to_dict().get('text_to_speech', {})
+
+def audio_profile():
+    """The output profile episodes are encoded with (extension and content type of the audio)."""
+    return OutputProfile.from_config(tts_settings())
+
+def hls_enabled():
+    """Whether episodes are also published as HLS segments and a playlist."""
+    return bool((tts_settings().get('hls') or {}).get('enabled', False))
+
+def generate_transcript(content, output_dir=None, checkpoint_root=None):
         return process_content(text=content, 
                 model_name="gemini-2.5-pro",
                 generate_audio=False,
-                conversation_config=podcast_config)
+                conversation_config=episode_config(output_dir),
+                checkpoint_root=checkpoint_root)
 
-def generate_audio(filepath):
-        generate_podcast(transcript_file=filepath, 
+def generate_audio(filepath, output_dir=None, checkpoint_root=None, publish=None):
+        return generate_podcast(transcript_file=filepath, 
                         tts_model='gemini',
-                        conversation_config=podcast_config)
+                        conversation_config=episode_config(output_dir),
+                        checkpoint_root=checkpoint_root,
+                        publish=publish)
 
-def generate_pod(content):
+def generate_pod(content, checkpoint_root=None):
         generate_podcast(text=content,
                         llm_model_name="gemini-2.5-pro", 
                         tts_model='gemini',
-                        conversation_config=podcast_config)
+                        conversation_config=podcast_config,
+                        checkpoint_root=checkpoint_root)
 
 
 # TEST            
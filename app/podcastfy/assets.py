@@ -0,0 +1,211 @@
+"""
+Assets Module
+
+Every episode opens with the same greeting (podcast name and tagline) and closes with the
+same ending message. This module synthesizes those lines once per provider, voice, text
+and library version, keeps the audio in a CheckpointStore (a local directory or a GCS
+prefix), and lets TextToSpeech splice it in when it assembles an episode. The fixed lines
+then cost no synthesis request per episode, and sound the same in every episode.
+
+A music bed is a pre-encoded file in the same store. The encoder mixes it under the
+episode in the ffmpeg run that encodes the episode, so the bed adds no separate pass.
+"""
+
+import logging
+import os
+import sys
+import threading
+from typing import Any, Dict, List, Optional
+
+from .checkpoint import CheckpointStore
+from .transcript import Transcript, Turn
+
+logger = logging.getLogger(__name__)
+
+SPOKEN_ASSETS = ("intro", "outro")
+
+DEFAULTS: Dict[str, Any] = {
+    "root": "data/audio/assets",
+    "version": 1,
+    "intro": "Welcome to {podcast_name} - {podcast_tagline}.",
+    "intro_speaker": 1,
+    "outro": "{ending_message}",
+    "outro_speaker": 2,
+    "music_bed": None,
+    "bed_gain_db": -24.0,
+    "bed_fade_seconds": 2.0,
+    "duck": True,
+}
+
+
+def asset_settings(conversation_config: Any) -> Optional[Dict[str, Any]]:
+    """
+    Settings of the asset library, with the intro and outro texts filled in.
+
+    Args:
+        conversation_config (Any): Conversation config, as a dict or a NestedConfig
+
+    Returns:
+        Optional[Dict[str, Any]]: text_to_speech.assets over DEFAULTS, or None when the
+            library is disabled
+    """
+    if hasattr(conversation_config, "to_dict"):
+        conversation_config = conversation_config.to_dict()
+    tts_config = (conversation_config or {}).get("text_to_speech") or {}
+    settings = tts_config.get("assets") or {}
+    if not settings.get("enabled", False):
+        return None
+
+    settings = dict(DEFAULTS, **settings)
+    fields = {
+        "podcast_name": conversation_config.get("podcast_name") or "",
+        "podcast_tagline": conversation_config.get("podcast_tagline") or "",
+        "ending_message": tts_config.get("ending_message") or "",
+    }
+    for name in SPOKEN_ASSETS:
+        settings[name] = (settings[name] or "").format(**fields).strip()
+    return settings
+
+
+class AssetLibrary:
+    """
+    Intro, outro and music bed of the episodes rendered by one TextToSpeech.
+
+    Spoken assets are synthesized on first use with the TextToSpeech's provider and voices
+    and stored under a key of everything that determines their audio, so another voice,
+    text or version gives a new asset rather than reusing a stale one.
+    """
+
+    def __init__(self, tts: Any, settings: Dict[str, Any]):
+        """
+        Args:
+            tts (TextToSpeech): Provider and voices to synthesize the spoken assets with
+            settings (Dict[str, Any]): Output of asset_settings
+        """
+        self.tts = tts
+        self.settings = settings
+        self.store = CheckpointStore(settings["root"])
+        self._audio: Dict[str, bytes] = {}
+        self._bed: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def key(self, name: str) -> str:
+        """Store key of a spoken asset."""
+        return CheckpointStore.key(
+            "asset",
+            str(self.settings["version"]),
+            name,
+            self.tts.chunk_format,
+            self.tts._checkpoint_scope(),
+            str(self.settings[f"{name}_speaker"]),
+            self.settings[name],
+        )
+
+    def get(self, name: str) -> Optional[bytes]:
+        """
+        Audio of a spoken asset, synthesizing and storing it if the store lacks it.
+
+        Args:
+            name (str): "intro" or "outro"
+
+        Returns:
+            Optional[bytes]: Audio in the TextToSpeech's chunk format, or None when the
+                asset has no text
+        """
+        if not self.settings.get(name):
+            return None
+        # Episodes starting at once wait for one synthesis instead of each requesting it
+        with self._lock:
+            if name not in self._audio:
+                self._audio[name] = self.store.cached(self.key(name), lambda: self._synthesize(name))
+            return self._audio[name]
+
+    def _synthesize(self, name: str) -> bytes:
+        text = self.settings[name]
+        speaker = int(self.settings[f"{name}_speaker"])
+        logger.info(f"Synthesizing the {name} asset: {text!r}")
+        if self.tts.provider.multi_speaker:
+            return self.tts._synthesize_chunk(Transcript([Turn(speaker, text)]))
+        return self.tts._synthesize_turn(text, "question" if speaker == 1 else "answer")
+
+    def splice(self, inputs: List[Any]) -> List[Any]:
+        """
+        Surround the chunks of an episode with the intro and outro.
+
+        Args:
+            inputs (List[Any]): Encoded chunks or file paths, in speaking order
+
+        Returns:
+            List[Any]: Intro, the inputs, outro
+        """
+        intro, outro = self.get("intro"), self.get("outro")
+        return ([intro] if intro else []) + list(inputs) + ([outro] if outro else [])
+
+    def music_bed(self) -> Optional[Dict[str, Any]]:
+        """
+        Music bed to mix under the episodes, see audio_encoding.concat_and_encode.
+
+        A bed in a GCS store is downloaded once to the TextToSpeech temp directory.
+
+        Returns:
+            Optional[Dict[str, Any]]: path, gain_db, fade_seconds and duck, or None
+                without a music_bed
+
+        Raises:
+            FileNotFoundError: If the configured bed is not in the store
+        """
+        name = self.settings.get("music_bed")
+        if not name:
+            return None
+        with self._lock:
+            if self._bed is None:
+                if self.store.root.startswith("gs://"):
+                    data = self.store.get(name)
+                    if data is None:
+                        raise FileNotFoundError(f"Music bed {name} not found in {self.store.root}")
+                    path = os.path.join(self.tts.temp_audio_dir, "assets", os.path.basename(name))
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path, "wb") as f:
+                        f.write(data)
+                else:
+                    path = os.path.join(self.store.root, name)
+                    if not os.path.exists(path):
+                        raise FileNotFoundError(f"Music bed {path} not found")
+                self._bed = {
+                    "path": os.path.abspath(path),
+                    "gain_db": float(self.settings["bed_gain_db"]),
+                    "fade_seconds": float(self.settings["bed_fade_seconds"]),
+                    "duck": bool(self.settings["duck"]),
+                }
+            return self._bed
+
+    def warm(self) -> Dict[str, int]:
+        """
+        Make sure every asset is in the store, e.g. before the first episode of a new version.
+
+        Returns:
+            Dict[str, int]: Size in bytes of every spoken asset
+        """
+        sizes = {name: len(self.get(name) or b"") for name in SPOKEN_ASSETS}
+        self.music_bed()
+        return sizes
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Generate the assets of a provider: python -m app.podcastfy.assets [TTS_MODEL]
+    """
+    from .text_to_speech import TextToSpeech
+
+    args = sys.argv[1:] if argv is None else argv
+    tts = TextToSpeech(model=args[0] if args else "geminimulti")
+    if tts.assets is None:
+        print("text_to_speech.assets is not enabled in the conversation config")
+        return
+    for name, size in tts.assets.warm().items():
+        print(f"{name}: {size} bytes, {tts.assets.key(name)}")
+    print(f"music bed: {tts.assets.music_bed()}")
+
+
+if __name__ == "__main__":
+    main()
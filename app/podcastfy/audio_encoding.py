@@ -0,0 +1,457 @@
+"""
+Audio Encoding Module
+
+Decoding the synthesized chunks, concatenating them and exporting the episode is
+CPU-bound ffmpeg and pydub work. This module runs it in a pool of worker processes, so
+several episodes are encoded on all cores while the threads that asked for them (request
+handlers, digest workers) stay free for I/O-bound work.
+
+At most one job per worker runs at a time; further submissions wait in a bounded queue,
+and submit() blocks while that queue is full.
+
+An OutputProfile (text_to_speech.output_profiles in the conversation config) sets the
+episode's container, codec, bitrate and channels. When the provider already returned the
+profile's codec, the chunks are concatenated by stream copy instead of being re-encoded.
+
+A music bed is mixed under the episode by the ffmpeg run that encodes it, looped to the
+episode's length, faded in and out and optionally ducked while someone speaks.
+"""
+
+import asyncio
+import concurrent.futures
+import io
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+# Encoded audio data, or the path of an audio file
+AudioInput = Union[bytes, str]
+
+
+@dataclass(frozen=True)
+class OutputProfile:
+    """
+    Encoding of the finished episode.
+
+    Attributes:
+        name (str): Profile name in text_to_speech.output_profiles
+        format (str): ffmpeg muxer, e.g. mp3, ogg, webm, ipod (M4A)
+        extension (str): File extension of the episode
+        codec (str): ffmpeg encoder, e.g. libmp3lame, libopus, aac
+        bitrate (Optional[str]): Target bitrate, e.g. 64k
+        channels (Optional[int]): Downmix to this many channels
+        sample_rate (Optional[int]): Resample to this rate in Hz
+        mime_type (str): Content type the episode is served with
+        passthrough (bool): Keep provider audio that already uses this codec as is,
+            concatenating it by stream copy; bitrate, channels and sample rate then are
+            the provider's
+    """
+    name: str
+    format: str = "mp3"
+    extension: str = "mp3"
+    codec: str = "libmp3lame"
+    bitrate: Optional[str] = None
+    channels: Optional[int] = None
+    sample_rate: Optional[int] = None
+    mime_type: str = "audio/mpeg"
+    passthrough: bool = False
+
+    @classmethod
+    def from_config(cls, tts_config: Dict[str, Any]) -> "OutputProfile":
+        """
+        Profile selected by the text_to_speech config section.
+
+        Without an output_profile, episodes are 320 kbps MP3 files.
+
+        Args:
+            tts_config (Dict[str, Any]): text_to_speech section of the conversation config
+
+        Returns:
+            OutputProfile: Selected profile
+
+        Raises:
+            ValueError: If output_profile names a profile that is not defined
+        """
+        name = tts_config.get("output_profile")
+        if not name:
+            return cls("default", bitrate="320k")
+        profiles = tts_config.get("output_profiles") or {}
+        if name not in profiles:
+            raise ValueError(f"Unknown output profile {name!r}; defined: {', '.join(profiles)}")
+        return cls(name=name, **profiles[name])
+
+    def export_params(self) -> Dict[str, Any]:
+        """concat_and_encode export arguments for this profile."""
+        return {k: v for k, v in asdict(self).items()
+                if k in ("format", "codec", "bitrate", "channels", "sample_rate") and v is not None}
+
+
+def decode_audio(audio: AudioInput, input_format: Optional[str] = None) -> "AudioSegment":
+    """
+    Decode encoded audio data in memory, or an audio file.
+
+    Args:
+        audio (AudioInput): Encoded audio data or the path of an audio file
+        input_format (Optional[str]): Format of the audio; None lets ffmpeg probe it
+
+    Returns:
+        AudioSegment: Decoded audio
+    """
+    from pydub import AudioSegment
+
+    # Bytes are piped to ffmpeg from memory; nothing is written next to the caller
+    source = io.BytesIO(audio) if isinstance(audio, (bytes, bytearray)) else audio
+    return AudioSegment.from_file(source, format=input_format)
+
+
+def _concat_copy(inputs: Sequence[AudioInput], output_file: Optional[str],
+                 input_format: Optional[str], output_format: str) -> Optional[bytes]:
+    """Concatenate inputs that share a codec with ffmpeg's concat demuxer, without re-encoding."""
+    from pydub.utils import get_encoder_name
+
+    work_dir = tempfile.mkdtemp(prefix="concat_")
+    try:
+        listing = os.path.join(work_dir, "inputs.txt")
+        with open(listing, "w") as f:
+            for i, item in enumerate(inputs):
+                if isinstance(item, (bytes, bytearray)):
+                    path = os.path.join(work_dir, f"{i}.{input_format or 'bin'}")
+                    with open(path, "wb") as chunk:
+                        chunk.write(item)
+                else:
+                    path = os.path.abspath(item)
+                f.write("file '{}'\n".format(path.replace("'", "'\\''")))
+
+        target = output_file or os.path.join(work_dir, "output")
+        if output_file is not None:
+            os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+        result = subprocess.run(
+            [get_encoder_name(), "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+             "-i", listing, "-c", "copy", "-f", output_format, target],
+            capture_output=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg concat failed: {result.stderr.decode(errors='replace').strip()}")
+        if output_file is None:
+            with open(target, "rb") as f:
+                return f.read()
+        return None
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _mix_music_bed(episode: "AudioSegment", bed: Dict[str, Any], output_file: Optional[str],
+                   output_format: str, params: Dict[str, Any]) -> Optional[bytes]:
+    """Mix a looped music bed under the decoded episode and encode the result in one ffmpeg run."""
+    from pydub.utils import get_encoder_name
+
+    seconds = len(episode) / 1000
+    fade = min(float(bed.get("fade_seconds", 2.0)), seconds / 2)
+    layout = "mono" if episode.channels == 1 else "stereo"
+    bed_chain = (
+        f"[1:a]aformat=sample_rates={episode.frame_rate}:channel_layouts={layout},"
+        f"volume={float(bed.get('gain_db', -24.0))}dB,"
+        f"afade=t=in:d={fade:.3f},afade=t=out:st={seconds - fade:.3f}:d={fade:.3f}[bed]"
+    )
+    if bed.get("duck", True):
+        # The speech is the sidechain: the bed drops further while someone speaks
+        graph = (
+            f"[0:a]asplit=2[voice][key];{bed_chain};"
+            "[bed][key]sidechaincompress=threshold=0.02:ratio=6:attack=20:release=400[ducked];"
+            "[voice][ducked]amix=inputs=2:duration=first:normalize=0"
+        )
+    else:
+        graph = f"{bed_chain};[0:a][bed]amix=inputs=2:duration=first:normalize=0"
+
+    work_dir = tempfile.mkdtemp(prefix="bed_")
+    try:
+        # Muxers such as ipod need a seekable output, so the result goes to a file
+        target = output_file or os.path.join(work_dir, "output")
+        if output_file is not None:
+            os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+        command = [
+            get_encoder_name(), "-y", "-loglevel", "error",
+            "-f", "s16le", "-ar", str(episode.frame_rate), "-ac", str(episode.channels), "-i", "pipe:0",
+            "-stream_loop", "-1", "-i", bed["path"],
+            "-filter_complex", graph,
+        ]
+        if params.get("codec"):
+            command += ["-c:a", params["codec"]]
+        if params.get("bitrate"):
+            command += ["-b:a", params["bitrate"]]
+        command += ["-f", output_format, target]
+        result = subprocess.run(command, input=episode.set_sample_width(2).raw_data, capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg music bed mix failed: {result.stderr.decode(errors='replace').strip()}")
+        if output_file is None:
+            with open(target, "rb") as f:
+                return f.read()
+        return None
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def concat_and_encode(
+    inputs: Sequence[AudioInput],
+    output_file: Optional[str] = None,
+    input_format: Optional[str] = None,
+    export_params: Optional[Dict[str, Any]] = None,
+    stream_copy: bool = False,
+    postprocess: Optional[Dict[str, Any]] = None,
+    music_bed: Optional[Dict[str, Any]] = None,
+) -> Optional[bytes]:
+    """
+    Decode the inputs, concatenate them in order and encode the result.
+
+    Runs in a worker process; it is a module-level function so it can be pickled.
+
+    Args:
+        inputs (Sequence[AudioInput]): Encoded chunks or file paths, in order
+        output_file (Optional[str]): Path to write the result to; None returns the bytes
+        input_format (Optional[str]): Format of the inputs; None lets ffmpeg probe it
+        export_params (Optional[Dict[str, Any]]): AudioSegment.export arguments, e.g.
+            format, codec, bitrate, plus channels and sample_rate to downmix and resample
+        stream_copy (bool): The inputs already use the output codec; concatenate them
+            without decoding, keeping only the export format
+        postprocess (Optional[Dict[str, Any]]): Trim, level and crossfade the decoded
+            chunks with these audio_postprocess settings; overrides stream_copy
+        music_bed (Optional[Dict[str, Any]]): Mix this bed under the episode: path of the
+            encoded bed, gain_db, fade_seconds, duck; overrides stream_copy
+
+    Returns:
+        Optional[bytes]: Encoded audio, when output_file is None
+    """
+    params = dict(export_params or {})
+    output_format = params.pop("format", "mp3")
+    if stream_copy and postprocess is None and music_bed is None:
+        return _concat_copy(inputs, output_file, input_format, output_format)
+
+    from pydub import AudioSegment
+
+    segments = [decode_audio(item, input_format) for item in inputs]
+    if postprocess is not None:
+        from .audio_postprocess import process_segments
+
+        combined = process_segments(segments, postprocess)
+    else:
+        combined = sum(segments, AudioSegment.empty())
+
+    channels = params.pop("channels", None)
+    if channels:
+        combined = combined.set_channels(channels)
+    sample_rate = params.pop("sample_rate", None)
+    if sample_rate:
+        combined = combined.set_frame_rate(sample_rate)
+    if music_bed is not None:
+        return _mix_music_bed(combined, music_bed, output_file, output_format, params)
+    if output_file is None:
+        output = io.BytesIO()
+        combined.export(output, format=output_format, **params)
+        return output.getvalue()
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    combined.export(output_file, format=output_format, **params)
+    return None
+
+
+class AudioEncoder:
+    """Process pool for concat_and_encode jobs, with a bounded queue and sync and async APIs."""
+
+    def __init__(self, workers: Optional[int] = None, max_queue: Optional[int] = None):
+        """
+        Args:
+            workers (Optional[int]): Worker processes; None uses the core count, 0 encodes
+                in the calling thread
+            max_queue (Optional[int]): Jobs that may wait for a free worker; None allows
+                two per worker
+        """
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_queue = 2 * max(1, self.workers) if max_queue is None else max_queue
+        self._slots = threading.BoundedSemaphore(max(1, self.workers) + self.max_queue)
+        self._pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that runs request and digest threads is unsafe
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _reset(self, broken: concurrent.futures.ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._pool is broken:
+                self._pool = None
+        broken.shutdown(wait=False)
+
+    def submit(
+        self,
+        inputs: Sequence[AudioInput],
+        output_file: Optional[str] = None,
+        input_format: Optional[str] = None,
+        stream_copy: bool = False,
+        postprocess: Optional[Dict[str, Any]] = None,
+        music_bed: Optional[Dict[str, Any]] = None,
+        **export_params: Any,
+    ) -> "concurrent.futures.Future[Optional[bytes]]":
+        """
+        Queue a decode/concatenate/encode job, blocking while the queue is full.
+
+        Args:
+            inputs (Sequence[AudioInput]): Encoded chunks or file paths, in order
+            output_file (Optional[str]): Path to write the result to; None returns the bytes
+            input_format (Optional[str]): Format of the inputs; None lets ffmpeg probe it
+            stream_copy (bool): Concatenate without re-encoding, see concat_and_encode
+            postprocess (Optional[Dict[str, Any]]): audio_postprocess settings, see concat_and_encode
+            music_bed (Optional[Dict[str, Any]]): Bed to mix under the episode, see concat_and_encode
+            **export_params (Any): AudioSegment.export arguments, e.g. format, codec, bitrate
+
+        Returns:
+            Future[Optional[bytes]]: Result of concat_and_encode
+        """
+        args = (list(inputs), output_file, input_format, export_params, stream_copy, postprocess, music_bed)
+        if self.workers == 0:
+            future: concurrent.futures.Future = concurrent.futures.Future()
+            try:
+                future.set_result(concat_and_encode(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._slots.acquire()
+        try:
+            pool = self._executor()
+            try:
+                future = pool.submit(concat_and_encode, *args)
+            except concurrent.futures.process.BrokenProcessPool:
+                # A worker died (e.g. killed for memory); start a fresh pool once
+                logger.warning("Audio encoding pool broken, restarting it")
+                self._reset(pool)
+                future = self._executor().submit(concat_and_encode, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def encode(self, inputs: Sequence[AudioInput], output_file: Optional[str] = None,
+               input_format: Optional[str] = None, stream_copy: bool = False,
+               postprocess: Optional[Dict[str, Any]] = None, music_bed: Optional[Dict[str, Any]] = None,
+               **export_params: Any) -> Optional[bytes]:
+        """Like submit(), waiting for the result."""
+        return self.submit(inputs, output_file, input_format, stream_copy, postprocess, music_bed,
+                           **export_params).result()
+
+    async def encode_async(self, inputs: Sequence[AudioInput], output_file: Optional[str] = None,
+                           input_format: Optional[str] = None, stream_copy: bool = False,
+                           postprocess: Optional[Dict[str, Any]] = None,
+                           music_bed: Optional[Dict[str, Any]] = None,
+                           **export_params: Any) -> Optional[bytes]:
+        """Like submit(), awaiting the result; waiting for a queue slot does not block the event loop."""
+        loop = asyncio.get_running_loop()
+        future = await loop.run_in_executor(
+            None, lambda: self.submit(inputs, output_file, input_format, stream_copy, postprocess, music_bed,
+                                      **export_params)
+        )
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+
+_encoder: Optional[AudioEncoder] = None
+_encoder_lock = threading.Lock()
+
+
+def get_encoder(settings: Optional[Dict[str, Any]] = None) -> AudioEncoder:
+    """
+    Get the process-wide encoder, creating it on first use.
+
+    Args:
+        settings (Optional[Dict[str, Any]]): `audio_encoding` conversation config section
+            (workers, max_queue). The first configuration seen wins.
+
+    Returns:
+        AudioEncoder: Shared encoder
+    """
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            settings = settings or {}
+            _encoder = AudioEncoder(workers=settings.get("workers"), max_queue=settings.get("max_queue"))
+        return _encoder
+
+
+def _test_signal(seconds: float) -> bytes:
+    """A stereo 44.1 kHz MP3 of a tone under noise, standing in for a provider chunk."""
+    from pydub.generators import Sine, WhiteNoise
+
+    tone = Sine(220).to_audio_segment(duration=seconds * 1000)
+    signal = tone.overlay(WhiteNoise().to_audio_segment(duration=seconds * 1000) - 30)
+    chunk = io.BytesIO()
+    signal.set_channels(2).set_frame_rate(44100).export(chunk, format="mp3", bitrate="320k")
+    return chunk.getvalue()
+
+
+def compare_profiles(inputs: List[bytes], seconds: float) -> None:
+    """Print encode time and size of one episode for every configured output profile."""
+    from .utils.config_conversation import load_conversation_config
+
+    tts_config = load_conversation_config().to_dict().get("text_to_speech", {})
+    profiles = [
+        OutputProfile.from_config(dict(tts_config, output_profile=name))
+        for name in tts_config.get("output_profiles", {})
+    ]
+    print(f"{'profile':16s} {'container':10s} {'encode s':>9s} {'size KB':>9s} {'kbps':>6s}")
+    for profile in profiles:
+        start = time.perf_counter()
+        data = concat_and_encode(inputs, export_params=profile.export_params())
+        elapsed = time.perf_counter() - start
+        kbps = len(data) * 8 / 1000 / seconds
+        print(f"{profile.name:16s} {profile.extension:10s} {elapsed:9.2f} {len(data) / 1024:9.0f} {kbps:6.0f}")
+
+
+def main(episodes: int = 4, chunks: int = 12, seconds: float = 20.0) -> None:
+    """
+    Compare the output profiles' encode time and size on one episode, then encode
+    several episodes inline and on the process pool.
+    """
+    inputs = [_test_signal(seconds)] * chunks
+    compare_profiles(inputs, chunks * seconds)
+    print()
+
+    params = {"format": "mp3", "codec": "libmp3lame", "bitrate": "320k"}
+    start = time.perf_counter()
+    for _ in range(episodes):
+        concat_and_encode(inputs, export_params=params)
+    inline = time.perf_counter() - start
+
+    encoder = AudioEncoder()
+    encoder.encode(inputs[:1], **params)  # start the workers before timing
+    start = time.perf_counter()
+    futures: List[concurrent.futures.Future] = [encoder.submit(inputs, **params) for _ in range(episodes)]
+    for future in futures:
+        future.result()
+    pooled = time.perf_counter() - start
+    encoder.shutdown()
+
+    print(f"{episodes} episodes of {chunks} x {seconds:.0f} s chunks, {encoder.workers} workers")
+    print(f"inline:  {inline:.2f} s")
+    print(f"pooled:  {pooled:.2f} s ({inline / pooled:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Checkpoint Module
+
+This module stores the intermediate artifacts of an episode (fetched content, transcript,
+synthesized audio chunks, assembled episode) under content-addressed keys, either on local
+disk or under a Google Cloud Storage prefix. A retried run finds the artifacts of the stages
+that already succeeded and only redoes the piece that failed.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Callable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore:
+    """
+    Content-addressed artifact store.
+
+    Keys are derived from a stage name and every input that determines the stage output,
+    so a changed input (a new transcript, another voice) gives a new key and a stale
+    artifact is never reused. Artifacts are written once and never updated.
+    """
+
+    def __init__(self, root: str):
+        """
+        Initialize the CheckpointStore.
+
+        Args:
+            root (str): Local directory, or a "gs://bucket/prefix" location
+        """
+        self.root = root
+        self._bucket = None
+        if root.startswith("gs://"):
+            bucket_name, _, prefix = root[len("gs://"):].partition("/")
+            from google.cloud import storage
+
+            self._bucket = storage.Client().bucket(bucket_name)
+            self._prefix = prefix.strip("/")
+
+    @staticmethod
+    def key(stage: str, *parts: Union[str, bytes]) -> str:
+        """
+        Build the key of a stage artifact from the inputs that determine it.
+
+        Args:
+            stage (str): Stage name, used as the key prefix
+            *parts (Union[str, bytes]): Stage inputs
+
+        Returns:
+            str: Key of the form "<stage>/<sha256>"
+        """
+        digest = hashlib.sha256(stage.encode("utf-8"))
+        for part in parts:
+            data = part if isinstance(part, bytes) else str(part).encode("utf-8")
+            # Length-prefix each part so ("ab", "c") and ("a", "bc") differ
+            digest.update(len(data).to_bytes(8, "big"))
+            digest.update(data)
+        return f"{stage}/{digest.hexdigest()}"
+
+    def _blob_name(self, key: str) -> str:
+        return f"{self._prefix}/{key}" if self._prefix else key
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Read an artifact.
+
+        Args:
+            key (str): Artifact key
+
+        Returns:
+            Optional[bytes]: Artifact data, or None if it does not exist or cannot be read
+        """
+        try:
+            if self._bucket is not None:
+                blob = self._bucket.get_blob(self._blob_name(key))
+                return blob.download_as_bytes() if blob is not None else None
+            with open(os.path.join(self.root, key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # A checkpoint that cannot be read is recomputed rather than failing the episode
+            logger.warning(f"Could not read checkpoint {key}: {str(e)}")
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Write an artifact. Failures are logged and otherwise ignored.
+
+        Args:
+            key (str): Artifact key
+            data (bytes): Artifact data
+        """
+        try:
+            if self._bucket is not None:
+                self._bucket.blob(self._blob_name(key)).upload_from_string(data)
+                return
+            path = os.path.join(self.root, key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so an interrupted run never leaves a truncated artifact
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not write checkpoint {key}: {str(e)}")
+
+    def cached(self, key: str, produce: Callable[[], bytes]) -> bytes:
+        """
+        Return the artifact for key, producing and storing it if it is missing.
+
+        Args:
+            key (str): Artifact key
+            produce (Callable[[], bytes]): Computes the artifact
+
+        Returns:
+            bytes: Artifact data
+        """
+        data = self.get(key)
+        if data is not None:
+            logger.info(f"Resuming from checkpoint {key}")
+            return data
+        data = produce()
+        self.put(key, data)
+        return data
+
+    def cached_text(self, key: str, produce: Callable[[], str]) -> str:
+        """
+        Text variant of cached().
+
+        Args:
+            key (str): Artifact key
+            produce (Callable[[], str]): Computes the artifact
+
+        Returns:
+            str: Artifact text
+        """
+        return self.cached(key, lambda: produce().encode("utf-8")).decode("utf-8")
@@ -6,17 +6,22 @@ from URLs or existing transcript files. It orchestrates the content extraction,
 generation, and text-to-speech conversion processes.
 """
 
+import json
 import os
 import uuid
 import typer
 import yaml
+from ..podcastfy.checkpoint import CheckpointStore
 from ..podcastfy.content_parser.content_extractor import ContentExtractor
 from ..podcastfy.content_generator import ContentGenerator
+from ..podcastfy.compaction import ContentCompactor
 from ..podcastfy.text_to_speech import TextToSpeech
+from ..podcastfy.transcript import Transcript
 from ..podcastfy.utils.config import Config, load_config
 from ..podcastfy.utils.config_conversation import load_conversation_config
 from ..podcastfy.utils.logger import setup_logger
-from typing import List, Optional, Dict, Any
+from ..podcastfy.utils.tracing import collect, span
+from typing import Callable, List, Optional, Dict, Any, Tuple, Union
 import copy
 
 import logging
@@ -39,6 +44,29 @@ app = typer.Typer()
 os.environ["LANGCHAIN_TRACING_V2"] = "False"
 
 
+def _create_text_to_speech(
+    tts_model: str,
+    config: Config,
+    conversation_config: Dict[str, Any],
+    checkpoints: Optional[CheckpointStore] = None,
+) -> TextToSpeech:
+    """Create the TTS stage for a model, with its API key from the environment config."""
+    api_key = None
+    if tts_model not in ("edge", "composite"):
+        api_key = getattr(config, f"{tts_model.upper().split('-')[0]}_API_KEY")
+    return TextToSpeech(
+        model=tts_model,
+        api_key=api_key,
+        conversation_config=conversation_config,
+        checkpoints=checkpoints,
+    )
+
+
+def _audio_file_path(output_directories: Dict[str, Any], extension: str = "mp3") -> str:
+    """Path of the episode audio in the configured audio directory."""
+    return os.path.join(output_directories.get("audio", "./app/static/audio"), f"podcast.{extension}")
+
+
 def process_content(
     urls: Optional[List[str]] = None,
     transcript_file: Optional[str] = None,
@@ -52,10 +80,22 @@ def process_content(
     model_name: Optional[str] = None,
     api_key_label: Optional[str] = None,
     topic: Optional[str] = None,
-    longform: bool = False
+    longform: bool = False,
+    checkpoint_root: Optional[str] = None,
+    publish: Optional[Callable[[str], None]] = None,
 ):
     """
     Process URLs, a transcript file, image paths, or raw text to generate a podcast or transcript.
+
+    With checkpoint_root set (a local directory or a gs:// prefix), the transcript, every
+    synthesized chunk and the assembled episode are checkpointed under content-addressed
+    keys, and a retry resumes from the first missing artifact.
+
+    With the `streaming` conversation config enabled, a standard episode's turns are
+    synthesized as the LLM completes them, overlapping the two longest stages.
+
+    With text_to_speech.hls enabled, publish is called with every HLS segment and
+    playlist of the episode as soon as it is written.
     """
     try:
         if config is None:
@@ -70,6 +110,9 @@ def process_content(
         # Get output directories from conversation config
         tts_config = conv_config.get("text_to_speech", {})
         output_directories = tts_config.get("output_directories", {})
+        checkpoints = CheckpointStore(checkpoint_root) if checkpoint_root else None
+        text_to_speech = None
+        speech = None
 
         if transcript_file:
             logger.info(f"Using transcript file: {transcript_file}")
@@ -92,7 +135,8 @@ def process_content(
             
             if urls:
                 logger.info(f"Processing {len(urls)} links")
-                contents = [content_extractor.extract_content(link) for link in urls]
+                with span("content.extract", urls=len(urls)):
+                    contents = [content_extractor.extract_content(link) for link in urls]
                 combined_content += "\n\n".join(contents)
 
             if text:
@@ -107,35 +151,76 @@ def process_content(
                 topic_content = content_extractor.generate_topic_content(topic)
                 combined_content += f"\n\n{topic_content}"
 
+            # Bound the LLM input so generation time does not grow with the amount of mail
+            compaction_config = conv_config.to_dict().get("input_compaction", {})
+            if compaction_config.get("enabled", False) and not longform:
+                compactor = ContentCompactor.from_config(compaction_config)
+                with span("content.compact", input_chars=len(combined_content)) as current:
+                    combined_content = compactor.compact(combined_content)
+                    current.set(output_chars=len(combined_content))
+
             # Generate Q&A content using output directory from conversation config
             random_filename = "transcript.txt"
             transcript_filepath = os.path.join(
                 output_directories.get("transcripts", "./app/static/transcripts"),
                 random_filename,
             )
-            qa_content = content_generator.generate_qa_content(
-                combined_content,
-                image_file_paths=image_paths or [],
-                output_filepath=transcript_filepath,
-                longform=longform
-            )
+            # Voice the turns while the LLM is still writing the rest of the transcript
+            streaming_config = conv_config.to_dict().get("streaming", {})
+            if generate_audio and not longform and streaming_config.get("enabled", False):
+                text_to_speech = _create_text_to_speech(tts_model, config, conv_config.to_dict(), checkpoints)
+                speech = text_to_speech.open_stream(
+                    _audio_file_path(output_directories, text_to_speech.output_profile.extension),
+                    streaming_config.get("tts_workers", 4),
+                    publish,
+                )
 
-        if generate_audio:
-            api_key = None
-            if tts_model != "edge":
-                api_key = getattr(config, f"{tts_model.upper().split('-')[0]}_API_KEY")
-
-            text_to_speech = TextToSpeech(
-                model=tts_model,
-                api_key=api_key,
-                conversation_config=conv_config.to_dict(),
-            )
+            def generate_transcript() -> str:
+                return content_generator.generate_qa_content(
+                    combined_content,
+                    image_file_paths=image_paths or [],
+                    output_filepath=transcript_filepath,
+                    longform=longform,
+                    on_turn=speech.add if speech is not None else None,
+                )
 
-            random_filename = "podcast.mp3"
-            audio_file = os.path.join(
-                output_directories.get("audio", "./app/static/audio"), random_filename
-            )
-            text_to_speech.convert_to_speech(qa_content, audio_file)
+            try:
+                if checkpoints is None:
+                    qa_content = generate_transcript()
+                else:
+                    generate_key = CheckpointStore.key(
+                        "generate",
+                        combined_content,
+                        json.dumps(conv_config.to_dict(), sort_keys=True, default=str),
+                        model_name,
+                        is_local,
+                        longform,
+                        *(image_paths or []),
+                    )
+                    qa_content = checkpoints.cached_text(generate_key, generate_transcript)
+                    # A resumed transcript still has to land where callers expect it
+                    with open(transcript_filepath, "w") as file:
+                        file.write(qa_content)
+            except Exception:
+                if speech is not None:
+                    speech.close()
+                raise
+            if speech is not None and not speech.turns:
+                # Resumed from a checkpoint: nothing was streamed, convert the transcript below
+                speech.close()
+                speech = None
+
+        if generate_audio:
+            if text_to_speech is None:
+                text_to_speech = _create_text_to_speech(tts_model, config, conv_config.to_dict(), checkpoints)
+            audio_file = _audio_file_path(output_directories, text_to_speech.output_profile.extension)
+            # Parse the transcript once and hand the turns to the TTS stage
+            transcript = Transcript.parse(qa_content)
+            with span("tts.convert", turns=len(transcript), chars=len(qa_content), streamed=speech is not None):
+                if speech is not None:
+                    speech.finish()
+                else:
+                    text_to_speech.convert_to_speech(transcript, audio_file, publish)
             logger.info(f"Podcast generated successfully using {tts_model} TTS model")
             return audio_file
         else:
@@ -289,7 +374,10 @@ def generate_podcast(
     api_key_label: Optional[str] = None,
     topic: Optional[str] = None,
     longform: bool = False,
-) -> Optional[str]:
+    checkpoint_root: Optional[str] = None,
+    return_timing_report: bool = False,
+    publish: Optional[Callable[[str], None]] = None,
+) -> Union[Optional[str], Tuple[Optional[str], Dict[str, Any]]]:
     """
     Generate a podcast or transcript from a list of URLs, a file containing URLs, a transcript file, or image files.
 
@@ -307,10 +395,40 @@ def generate_podcast(
         llm_model_name (Optional[str]): LLM model name for content generation.
         api_key_label (Optional[str]): Environment variable name for LLM API key.
         topic (Optional[str]): Topic to generate podcast about.
+        longform (bool): Generate long-form content. Defaults to False.
+        checkpoint_root (Optional[str]): Local directory or gs:// prefix for stage checkpoints.
+            A retried call resumes from the first missing artifact.
+        return_timing_report (bool): Also return the per-stage timing report of the episode.
+        publish (Optional[Callable[[str], None]]): Called with every HLS segment and playlist
+            as it is written, when text_to_speech.hls is enabled (e.g. to upload it).
 
     Returns:
         Optional[str]: Path to the final podcast audio file, or None if only generating a transcript.
+            With return_timing_report, a (path, report) tuple; see TraceCollector.report.
     """
+    if return_timing_report:
+        with collect() as trace:
+            with span("episode"):
+                result = generate_podcast(
+                    urls=urls,
+                    url_file=url_file,
+                    transcript_file=transcript_file,
+                    tts_model=tts_model,
+                    transcript_only=transcript_only,
+                    config=config,
+                    conversation_config=conversation_config,
+                    image_paths=image_paths,
+                    is_local=is_local,
+                    text=text,
+                    llm_model_name=llm_model_name,
+                    api_key_label=api_key_label,
+                    topic=topic,
+                    longform=longform,
+                    checkpoint_root=checkpoint_root,
+                    publish=publish,
+                )
+        return result, trace.report()
+
     try:
         print("Generating podcast...")
         # Load default config
@@ -355,7 +473,9 @@ def generate_podcast(
                 model_name=llm_model_name,
                 api_key_label=api_key_label,
                 topic=topic,
-                longform=longform
+                longform=longform,
+                checkpoint_root=checkpoint_root,
+                publish=publish,
             )
         else:
             urls_list = urls or []
@@ -381,7 +501,9 @@ def generate_podcast(
                 model_name=llm_model_name,
                 api_key_label=api_key_label,
                 topic=topic,
-                longform=longform
+                longform=longform,
+                checkpoint_root=checkpoint_root,
+                publish=publish,
             )
 
     except Exception as e:
@@ -0,0 +1,232 @@
+"""
+Input Compaction Module
+
+This module bounds the size of the input sent to the LLM. It splits the combined
+source text into paragraphs, drops near-duplicate paragraphs (the same story told
+by several newsletters), ranks what is left and keeps the best paragraphs that fit
+a configurable token budget, in their original order.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Any
+
+from .utils.similarity import minhash_sketch, shingles, sketch_similarity
+from .utils.tokens import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SECTION_HEADER = re.compile(r"^NEWSLETTER \d+\s*$")
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]?\s")
+_NUMBER = re.compile(r"\d")
+
+
+@dataclass
+class Paragraph:
+    index: int
+    text: str
+    tokens: int
+    section_rank: int
+    pinned: bool = False
+    score: float = 0.0
+
+
+class ContentCompactor:
+    """
+    Fits input text into a token budget.
+
+    Paragraphs are deduplicated with MinHash sketches over word shingles, scored by
+    position within their newsletter, presence of figures and length, then selected
+    greedily until the budget is spent. Section headers are always kept.
+    """
+
+    def __init__(
+        self,
+        max_input_tokens: int = 16000,
+        token_counter: Optional[Callable[[str], int]] = None,
+        duplicate_threshold: float = 0.5,
+        shingle_size: int = 5,
+        sketch_size: int = 64,
+        min_shingles: int = 3,
+    ):
+        """
+        Initialize the ContentCompactor.
+
+        Args:
+            max_input_tokens (int): Token budget for the compacted text
+            token_counter (Optional[Callable[[str], int]]): Function returning the token
+                count of a text. Defaults to a 4-characters-per-token estimate.
+            duplicate_threshold (float): Estimated Jaccard similarity above which a
+                paragraph is a duplicate of an earlier one
+            shingle_size (int): Words per shingle
+            sketch_size (int): MinHash sketch size
+            min_shingles (int): Paragraphs with fewer shingles are never duplicates;
+                repeated labels ("Why it matters:", "Go deeper") introduce each story
+        """
+        self.max_input_tokens = max_input_tokens
+        self.count_tokens = token_counter or TokenCounter()
+        self.duplicate_threshold = duplicate_threshold
+        self.shingle_size = shingle_size
+        self.sketch_size = sketch_size
+        self.min_shingles = min_shingles
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ContentCompactor":
+        """
+        Create a compactor from the `input_compaction` conversation config section.
+
+        Args:
+            config (Dict[str, Any]): Compaction settings
+
+        Returns:
+            ContentCompactor: Configured compactor
+        """
+        return cls(
+            max_input_tokens=config.get("max_input_tokens", 16000),
+            token_counter=TokenCounter(config.get("chars_per_token", 4.0)),
+            duplicate_threshold=config.get("duplicate_threshold", 0.5),
+            shingle_size=config.get("shingle_size", 5),
+            min_shingles=config.get("min_shingles", 3),
+        )
+
+    def split_paragraphs(self, text: str) -> List[Paragraph]:
+        """
+        Split text into paragraphs, separating section headers into pinned paragraphs.
+
+        A header line ends the paragraph before it wherever it appears in a block, since
+        the newsletters are joined with single newlines.
+
+        Args:
+            text (str): Input text
+
+        Returns:
+            List[Paragraph]: Paragraphs in document order
+        """
+        paragraphs = []
+        section_rank = 0
+
+        def add_body(lines: List[str]) -> None:
+            nonlocal section_rank
+            body = "\n".join(lines).strip()
+            if body:
+                paragraphs.append(Paragraph(len(paragraphs), body, self.count_tokens(body), section_rank))
+                section_rank += 1
+
+        for block in _PARAGRAPH_BREAK.split(text):
+            lines: List[str] = []
+            for line in block.strip().split("\n"):
+                if _SECTION_HEADER.match(line):
+                    add_body(lines)
+                    lines = []
+                    header = line.strip()
+                    paragraphs.append(Paragraph(len(paragraphs), header, self.count_tokens(header), 0, pinned=True))
+                    section_rank = 0
+                else:
+                    lines.append(line)
+            add_body(lines)
+        return paragraphs
+
+    def deduplicate(self, paragraphs: List[Paragraph]) -> List[Paragraph]:
+        """
+        Drop paragraphs that are near-duplicates of an earlier paragraph.
+
+        Candidate pairs are found through an inverted index on sketch values, so only
+        paragraphs sharing at least one sampled shingle are compared. Paragraphs with
+        fewer than min_shingles shingles are always kept.
+
+        Args:
+            paragraphs (List[Paragraph]): Paragraphs in document order
+
+        Returns:
+            List[Paragraph]: Paragraphs without near-duplicates
+        """
+        kept = []
+        sketches = {}
+        postings: Dict[int, List[int]] = {}
+        for paragraph in paragraphs:
+            if paragraph.pinned:
+                kept.append(paragraph)
+                continue
+            paragraph_shingles = shingles(paragraph.text, self.shingle_size)
+            if len(paragraph_shingles) < self.min_shingles:
+                kept.append(paragraph)
+                continue
+            sketch = minhash_sketch(paragraph_shingles, self.sketch_size)
+            candidates = {idx for h in sketch for idx in postings.get(h, ())}
+            if any(
+                sketch_similarity(sketch, sketches[idx], self.sketch_size) >= self.duplicate_threshold
+                for idx in candidates
+            ):
+                continue
+            sketches[paragraph.index] = sketch
+            for h in sketch:
+                postings.setdefault(h, []).append(paragraph.index)
+            kept.append(paragraph)
+        return kept
+
+    def score(self, paragraph: Paragraph) -> float:
+        """
+        Score a paragraph: leads of each newsletter first, figures and substance preferred.
+
+        Args:
+            paragraph (Paragraph): Paragraph to score
+
+        Returns:
+            float: Higher is more important
+        """
+        position = 1.0 / (1.0 + 0.15 * paragraph.section_rank)
+        figures = 1.3 if _NUMBER.search(paragraph.text) else 1.0
+        # Tiny fragments ("Go deeper", bylines) carry little news
+        substance = min(1.0, paragraph.tokens / 25)
+        return position * figures * substance
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Cut text to a token budget, at the last sentence end when there is one.
+
+        Args:
+            text (str): Text to cut
+            max_tokens (int): Token budget
+
+        Returns:
+            str: Truncated text
+        """
+        ratio = max_tokens / max(self.count_tokens(text), 1)
+        cut = text[:int(len(text) * ratio)]
+        ends = list(_SENTENCE_END.finditer(cut))
+        return cut[:ends[-1].end()].strip() if ends else cut.strip()
+
+    def compact(self, text: str) -> str:
+        """
+        Deduplicate and fit text into the token budget.
+
+        Args:
+            text (str): Combined input text
+
+        Returns:
+            str: Compacted text
+        """
+        paragraphs = self.deduplicate(self.split_paragraphs(text))
+
+        budget = self.max_input_tokens - sum(p.tokens for p in paragraphs if p.pinned)
+        selected = {p.index: p.text for p in paragraphs if p.pinned}
+        for paragraph in sorted(
+            (p for p in paragraphs if not p.pinned), key=self.score, reverse=True
+        ):
+            if budget <= 0:
+                break
+            if paragraph.tokens <= budget:
+                selected[paragraph.index] = paragraph.text
+                budget -= paragraph.tokens
+            elif budget >= 50:
+                selected[paragraph.index] = self.truncate(paragraph.text, budget)
+                budget = 0
+
+        compacted = "\n\n".join(selected[idx] for idx in sorted(selected))
+        logger.info(
+            f"Compacted input from {self.count_tokens(text)} to {self.count_tokens(compacted)} tokens "
+            f"({len(paragraphs)} unique paragraphs, {len(selected)} kept)"
+        )
+        return compacted
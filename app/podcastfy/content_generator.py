@@ -6,8 +6,10 @@ LangChain and various LLM backends. It handles the interaction with the AI model
 provides methods to generate and save the generated content.
 """
 
+import math
 import os
-from typing import Optional, Dict, Any, List
+import time
+from typing import Optional, Dict, Any, Iterator, List, Callable
 import re
 
 
@@ -16,9 +18,15 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_community.llms.llamafile import Llamafile
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda
 from langchain import hub
 from ..podcastfy.utils.config_conversation import load_conversation_config
 from ..podcastfy.utils.config import load_config
+from ..podcastfy.utils.chunking import SlidingContext, TextSource, chunk_text, length_function, source_length
+from ..podcastfy.assets import asset_settings
+from ..podcastfy.transcript import StreamingTurnParser, Transcript, Turn
+from ..podcastfy.utils.ratelimit import get_limiter
+from ..podcastfy.utils.tracing import estimate_tokens, span
 import logging
 from langchain.prompts import HumanMessagePromptTemplate
 from abc import ABC, abstractmethod
@@ -34,6 +42,7 @@ class LLMBackend:
         max_output_tokens: int,
         model_name: str,
         api_key_label: str = "GEMINI_API_KEY",
+        rate_limits: Optional[Dict[str, Any]] = None,
     ):
         """
         Initialize the LLMBackend.
@@ -43,6 +52,7 @@ class LLMBackend:
                 temperature (float): The temperature for text generation.
                 max_output_tokens (int): The maximum number of output tokens.
                 model_name (str): The name of the model to use.
+                rate_limits (Optional[Dict[str, Any]]): `rate_limits` conversation config section.
         """
         self.is_local = is_local
         self.temperature = temperature
@@ -75,6 +85,88 @@ class LLMBackend:
                 api_key=os.environ[api_key_label],
             )
 
+        # Route every invocation, from any chain, through the provider's shared limiter
+        if is_local:
+            provider = "local"
+        elif "gemini" in self.model_name.lower():
+            provider = "gemini"
+        else:
+            provider = "litellm"
+        self.limiter = get_limiter(f"llm:{provider}", rate_limits)
+        self.chat_model = self.llm
+        self.llm = RunnableLambda(self._invoke)
+
+    def _invoke(self, prompt: Any) -> Any:
+        """Invoke the model within its rate limits, tracing latency and token usage."""
+        with span("llm.invoke", model=self.model_name) as current:
+            response = self.limiter.call(self.chat_model.invoke, prompt)
+            usage = getattr(response, "usage_metadata", None) or {}
+            if usage:
+                current.set(input_tokens=usage.get("input_tokens", 0), output_tokens=usage.get("output_tokens", 0))
+            else:
+                prompt_text = prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+                output_text = getattr(response, "content", response)
+                current.set(
+                    input_tokens=estimate_tokens(prompt_text),
+                    output_tokens=estimate_tokens(str(output_text)),
+                    tokens_estimated=True,
+                )
+            return response
+
+    def stream(self, prompt: Any, on_text: Callable[[str], None]) -> str:
+        """
+        Stream a response within the model's rate limits, passing each piece of text on
+        as it arrives.
+
+        The stream holds a concurrency slot of the model's limiter until it is fully read
+        or fails. Only opening the stream is retried: once text has been handed to
+        on_text, a failure cannot be replayed and is raised.
+
+        Args:
+            prompt (Any): Prompt value, as produced by a prompt template
+            on_text (Callable[[str], None]): Called with every non-empty piece of text
+
+        Returns:
+            str: The complete response text
+        """
+        with span("llm.invoke", model=self.model_name, streamed=True) as current:
+            def open_stream():
+                chunks = iter(self.chat_model.stream(prompt))
+                return chunks, next(chunks, None)
+
+            start = time.perf_counter()
+            (chunks, chunk), token = self.limiter.hold(open_stream)
+            response = None
+            pieces = []
+            try:
+                while chunk is not None:
+                    # Chunks add up to the full message, usage metadata included
+                    response = chunk if response is None else response + chunk
+                    text = chunk.content if isinstance(getattr(chunk, "content", None), str) else str(chunk)
+                    if text:
+                        if not pieces:
+                            current.set(first_text_ms=round((time.perf_counter() - start) * 1000, 1))
+                        pieces.append(text)
+                        on_text(text)
+                    chunk = next(chunks, None)
+            except BaseException as e:
+                self.limiter.release(token, e)
+                raise
+            self.limiter.release(token)
+
+            output_text = "".join(pieces)
+            usage = getattr(response, "usage_metadata", None) or {}
+            if usage:
+                current.set(input_tokens=usage.get("input_tokens", 0), output_tokens=usage.get("output_tokens", 0))
+            else:
+                prompt_text = prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+                current.set(
+                    input_tokens=estimate_tokens(prompt_text),
+                    output_tokens=estimate_tokens(output_text),
+                    tokens_estimated=True,
+                )
+            return output_text
+
 
 class LongFormContentGenerator:
     """
@@ -111,13 +203,20 @@ class LongFormContentGenerator:
         self.llm = llm
         self.max_num_chunks = config_conversation.get("max_num_chunks", 10)  # Default if not in config
         self.min_chunk_size = config_conversation.get("min_chunk_size", 200)  # Default if not in config
-
-    def __calculate_chunk_size(self, input_content: str) -> int:
+        # Bounds on the input and the context of every round, whatever the size of the input,
+        # in tokens of token_length
+        self.max_chunk_tokens = config_conversation.get("max_chunk_tokens", 100000)
+        self.context_tokens = config_conversation.get("context_tokens", 8000)
+        self.count_tokens = length_function(config_conversation.get("token_length", "tokens"))
+        # Recorded intro and outro spliced in by TextToSpeech replace the spoken greetings
+        self.assets = asset_settings(config_conversation) or {}
+
+    def __calculate_chunk_size(self, input_length: int) -> int:
         """
         Calculate chunk size based on input content length.
         
         Args:
-            input_content: Input text content
+            input_length: Length of the input text content
                 
         Returns:
             Calculated chunk size that ensures:
@@ -125,7 +224,6 @@ class LongFormContentGenerator:
             - Each chunk has at least min_chunk_size characters
             - Number of chunks is at most max_num_chunks
         """
-        input_length = len(input_content)
         if input_length <= self.min_chunk_size:
             return input_length
         
@@ -136,6 +234,20 @@ class LongFormContentGenerator:
         # Calculate chunk size that maximizes size while maintaining minimum chunks
         return input_length // (input_length // self.min_chunk_size)
 
+    def __iter_chunks(self, input_content: TextSource, chunk_size: Optional[int]) -> Iterator[str]:
+        """
+        Stream the chunks of the input: chunk_size characters each when the input length
+        is known, and never more than max_chunk_tokens tokens.
+        """
+        if chunk_size is None:
+            yield from chunk_text(input_content, self.max_chunk_tokens, length=self.count_tokens)
+            return
+        for chunk in chunk_text(input_content, chunk_size):
+            if self.count_tokens(chunk) > self.max_chunk_tokens:
+                yield from chunk_text(chunk, self.max_chunk_tokens, length=self.count_tokens)
+            else:
+                yield chunk
+
     def chunk_content(self, input_content: str, chunk_size: int) -> List[str]:
         """
         Split input content into manageable chunks while preserving context.
@@ -147,23 +259,7 @@ class LongFormContentGenerator:
         Returns:
             List[str]: List of content chunks
         """
-        sentences = input_content.split('. ')
-        chunks = []
-        current_chunk = []
-        current_length = 0
-        
-        for sentence in sentences:
-            sentence_length = len(sentence)
-            if current_length + sentence_length > chunk_size and current_chunk:
-                chunks.append('. '.join(current_chunk) + '.')
-                current_chunk = []
-                current_length = 0
-            current_chunk.append(sentence)
-            current_length += sentence_length
-            
-        if current_chunk:
-            chunks.append('. '.join(current_chunk) + '.')
-        return chunks
+        return list(chunk_text(input_content, chunk_size))
 
     def enhance_prompt_params(self, prompt_params: Dict, 
                               part_idx: int, 
@@ -197,9 +293,18 @@ class LongFormContentGenerator:
         """ 
 
         # Add part-specific instructions
+        if self.assets.get("intro"):
+            greeting = f"""THE EPISODE OPENS WITH A RECORDED GREETING: {self.assets["intro"]} DO NOT GREET THE AUDIENCE OR NAME THE PODCAST AGAIN."""
+        else:
+            greeting = f"""ALWAYS START THE CONVERSATION GREETING THE AUDIENCE: Welcome to {enhanced_params["podcast_name"]} - {enhanced_params["podcast_tagline"]}."""
+        if self.assets.get("outro"):
+            farewell = "END THE CONVERSATION WITH PERSON1'S CONCLUDING REMARKS; A RECORDED GOOD BYE FOLLOWS, SO DO NOT SAY GOOD BYE"
+        else:
+            farewell = "END THE CONVERSATION GREETING THE AUDIENCE WITH PERSON1 ALSO SAYING A GOOD BYE MESSAGE"
+
         if part_idx == 0:
             enhanced_params["instruction"] = f"""
-            ALWAYS START THE CONVERSATION GREETING THE AUDIENCE: Welcome to {enhanced_params["podcast_name"]} - {enhanced_params["podcast_tagline"]}.
+            {greeting}
             You are generating the Introduction part of a long podcast conversation.
             Don't cover any topics yet, just introduce yourself and the topic. Leave the rest for later parts, following these guidelines:
             """
@@ -207,7 +312,7 @@ class LongFormContentGenerator:
             enhanced_params["instruction"] = f"""
             You are generating the last part of a long podcast conversation. 
             {COMMON_INSTRUCTIONS}
-            For this part, discuss the below INPUT and then make concluding remarks in a podcast conversation format and END THE CONVERSATION GREETING THE AUDIENCE WITH PERSON1 ALSO SAYING A GOOD BYE MESSAGE, following these guidelines:
+            For this part, discuss the below INPUT and then make concluding remarks in a podcast conversation format and {farewell}, following these guidelines:
             """
         else:
             enhanced_params["instruction"] = f"""
@@ -220,14 +325,18 @@ class LongFormContentGenerator:
 
     def generate_long_form(
         self, 
-        input_content: str, 
+        input_content: TextSource, 
         prompt_params: Dict
     ) -> str:
         """
         Generate a complete long-form conversation using chunked content.
+
+        The input is read one chunk at a time, and every round sees the most recent
+        context_tokens of the conversation, so memory does not grow with the input.
         
         Args:
-            input_content (str): Input text for conversation
+            input_content (TextSource): Input text for conversation, a file-like object
+                or an iterable of text pieces (e.g. PDFExtractor.iter_text)
             prompt_params (Dict): Base prompt parameters
             
         Returns:
@@ -237,32 +346,45 @@ class LongFormContentGenerator:
         prompt_params["user_instructions"] = prompt_params.get("user_instructions", "") + self.LONGFORM_INSTRUCTIONS
         
         # Get chunk size
-        chunk_size = self.__calculate_chunk_size(input_content)
+        input_length = source_length(input_content)
+        chunk_size = self.__calculate_chunk_size(input_length) if input_length is not None else None
 
-        chunks = self.chunk_content(input_content, chunk_size)
+        chunks = self.__iter_chunks(input_content, chunk_size)
         conversation_parts = []
-        chat_context = input_content
-        num_parts = len(chunks)
-        print(f"Generating {num_parts} parts")
-        
-        for i, chunk in enumerate(chunks):
+        chat_context = SlidingContext(self.context_tokens, self.count_tokens)
+        # Estimated until the chunker runs out; one chunk is read ahead to spot the last part
+        num_parts = max(1, math.ceil(input_length / chunk_size)) if input_length else None
+        print(f"Generating {num_parts or 'an unknown number of'} parts")
+
+        i = 0
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ValueError("Long-form generation requires non-empty input text")
+        while chunk is not None:
+            following = next(chunks, None)
+            total_parts = i + 1 if following is None else max(num_parts or 0, i + 2)
+            if i == 0:
+                # The introduction sees the start of the input as its context
+                chat_context.reset(chunk)
             enhanced_params = self.enhance_prompt_params(
                 prompt_params,
                 part_idx=i,
-                total_parts=num_parts,
-                chat_context=chat_context
+                total_parts=total_parts,
+                chat_context=str(chat_context)
             )
             enhanced_params["input_text"] = chunk
             response = self.llm_chain.invoke(enhanced_params)
             if i == 0:
-                chat_context = response
+                chat_context.reset(response)
             else:
-                chat_context = chat_context + response
-            print(f"Generated part {i+1}/{num_parts}: Size {len(chunk)} characters.")
+                chat_context.add(response)
+            print(f"Generated part {i+1}/{total_parts}: Size {len(chunk)} characters.")
             #print(f"[LLM-START] Step: {i+1} ##############################")
             #print(response)
             #print(f"[LLM-END] Step: {i+1} ##############################")
             conversation_parts.append(response)
+            chunk = following
+            i += 1
 
         return self.stitch_conversations(conversation_parts)
     
@@ -321,27 +443,31 @@ class ContentCleanerMixin:
             supported_tags = ["speak", "lang", "p", "phoneme", "s", "sub"]
             supported_tags.extend(additional_tags)
 
-            pattern = r"</?(?!(?:" + "|".join(supported_tags) + r")\b)[^>]+>"
+            pattern = r"<(?!/?(?:" + "|".join(supported_tags) + r")\b)[^>]+>"
             cleaned_text = re.sub(pattern, "", input_text)
-            cleaned_text = re.sub(r"\n\s*\n", "\n", cleaned_text)
-            cleaned_text = re.sub(r"\*", "", cleaned_text)
-
-            for tag in additional_tags:
-                cleaned_text = re.sub(
-                    f'<{tag}>(.*?)(?=<(?:{"|".join(additional_tags)})>|$)',
-                    f"<{tag}>\\1</{tag}>",
-                    cleaned_text,
-                    flags=re.DOTALL,
-                )
-            
-
-
-            return cleaned_text.strip()
+            cleaned_text = cleaned_text.replace("*", "")
+
+            # One pass over the text closes unclosed speaker tags and normalizes turns
+            transcript = Transcript.parse(cleaned_text)
+            if not transcript:
+                # No speaker tags at all: leave the text for the caller to inspect
+                return re.sub(r"\n\s*\n", "\n", cleaned_text).strip()
+            return transcript.to_markup()
             
         except Exception as e:
             logger.error(f"Error cleaning TSS markup: {str(e)}")
             return input_text
 
+    @staticmethod
+    def _clean_turn(turn: Turn) -> Optional[Turn]:
+        """
+        Clean a single streamed turn the way _clean_tss_markup cleans a whole transcript.
+
+        Returns None when nothing speakable is left.
+        """
+        cleaned = Transcript.parse(ContentCleanerMixin._clean_tss_markup(turn.to_markup()))
+        return cleaned.turns[0] if cleaned else None
+
 
 class ContentGenerationStrategy(ABC):
     """
@@ -475,19 +601,20 @@ class LongFormContentStrategy(ContentGenerationStrategy, ContentCleanerMixin):
         self.content_generator_config = content_generator_config
         self.config_conversation = config_conversation
     
-    def validate(self, input_texts: str, image_file_paths: List[str]) -> None:
+    def validate(self, input_texts: TextSource, image_file_paths: List[str]) -> None:
         """Validate inputs for long-form generation."""
-        if not input_texts.strip():
+        # A file or a stream of pieces is checked once it is read
+        if isinstance(input_texts, str) and not input_texts.strip():
             raise ValueError("Long-form generation requires non-empty input text")
         if image_file_paths:
             raise ValueError("Long-form generation is not available with image inputs")
             
     def generate(self, 
                 chain,
-                input_texts: str,
+                input_texts: TextSource,
                 prompt_params: Dict[str, Any],
                 **kwargs) -> str:
-        """Generate long-form content."""
+        """Generate long-form content, reading input_texts one chunk at a time."""
         generator = LongFormContentGenerator(chain, self.llm, self.config_conversation)
         return generator.generate_long_form(
             input_texts,
@@ -635,45 +762,7 @@ class LongFormContentStrategy(ContentGenerationStrategy, ContentCleanerMixin):
             Returns original transcript if cleaning fails
         """
         try:
-            # Split into individual tag blocks while preserving tags
-            pattern = r'(<Person[12]>.*?</Person[12]>)'
-            blocks = re.split(pattern, transcript, flags=re.DOTALL)
-            
-            # Filter out empty/whitespace blocks
-            blocks = [b.strip() for b in blocks if b.strip()]
-            
-            merged_blocks = []
-            current_content = []
-            current_person = None
-            
-            for block in blocks:
-                # Extract person number and content
-                match = re.match(r'<Person([12])>(.*?)</Person\1>', block, re.DOTALL)
-                if not match:
-                    continue
-                    
-                person_num, content = match.groups()
-                content = content.strip()
-                
-                if current_person == person_num:
-                    # Same person - append content
-                    current_content.append(content)
-                else:
-                    # Different person - flush current content if any
-                    if current_content:
-                        merged_text = " ".join(current_content)
-                        merged_blocks.append(f"<Person{current_person}>{merged_text}</Person{current_person}>")
-                    # Start new person
-                    current_person = person_num
-                    current_content = [content]
-            
-            # Flush final content
-            if current_content:
-                merged_text = " ".join(current_content)
-                merged_blocks.append(f"<Person{current_person}>{merged_text}</Person{current_person}>")
-                
-            return "\n".join(merged_blocks)
-            
+            return Transcript.parse(transcript).merged().to_markup()
         except Exception as e:
             logger.error(f"Error fixing alternating tags: {str(e)}")
             return transcript  # Return original if fixing fails
@@ -749,8 +838,10 @@ class ContentGenerator:
             ),
             model_name=model_name,
             api_key_label=api_key_label,
+            rate_limits=self.config_conversation.to_dict().get("rate_limits", {}),
         )
 
+        self.llm_backend = llm_backend
         self.llm = llm_backend.llm
 
 
@@ -812,6 +903,15 @@ class ContentGenerator:
             messages=[HumanMessagePromptTemplate.from_template(messages)]
         )
         user_instructions = self.config_conversation.get("user_instructions", "")
+        assets = asset_settings(self.config_conversation) or {}
+        if assets.get("intro") or assets.get("outro"):
+            # The recorded intro and outro are spliced in by TextToSpeech
+            user_instructions = list(user_instructions) if isinstance(user_instructions, (list, tuple)) else (
+                [user_instructions] if user_instructions else [])
+            if assets.get("intro"):
+                user_instructions.append(f"The episode opens with a recorded greeting ({assets['intro']}); do not greet the audience or name the podcast again")
+            if assets.get("outro"):
+                user_instructions.append("A recorded good bye closes the episode; do not say good bye")
 
         user_instructions = (
             "[[MAKE SURE TO FOLLOW THESE INSTRUCTIONS OVERRIDING THE PROMPT TEMPLATE IN CASE OF CONFLICT: "
@@ -836,22 +936,32 @@ class ContentGenerator:
 
     def generate_qa_content(
         self,
-        input_texts: str = "",
+        input_texts: TextSource = "",
         image_file_paths: List[str] = [],
         output_filepath: Optional[str] = None,
-        longform: bool = False
+        longform: bool = False,
+        on_turn: Optional[Callable[[Turn], None]] = None,
     ) -> str:
         """
         Generate Q&A content based on input texts.
 
+        With on_turn, the response is streamed and every cleaned turn is passed on as
+        soon as the LLM has finished writing it, so the next stage can start on the
+        first turns while the rest is still being generated.
+
         Args:
-            input_texts (str): Input texts to generate content from.
+            input_texts (TextSource): Input texts to generate content from. Long-form
+                generation also takes a file-like object or an iterable of text pieces,
+                read one chunk at a time.
             image_file_paths (List[str]): List of image file paths.
             output_filepath (Optional[str]): Filepath to save the response content.
             is_local (bool): Whether to use a local LLM or not.
             model_name (str): Model name to use for generation.
             api_key_label (str): Environment variable name for API key.
             longform (bool): Whether to generate long-form content. Defaults to False.
+            on_turn (Optional[Callable[[Turn], None]]): Called with each turn of the
+                transcript, in order. Long-form content is generated in several calls and
+                rewritten at the end, so its turns are passed on once it is complete.
 
         Returns:
             str: Generated conversation content
@@ -869,7 +979,8 @@ class ContentGenerator:
 
             # Setup chain
             num_images = 0 if self.is_local else len(image_file_paths)
-            self.prompt_template, image_path_keys = self.__compose_prompt(num_images, longform)
+            with span("llm.compose_prompt", images=num_images, longform=longform):
+                self.prompt_template, image_path_keys = self.__compose_prompt(num_images, longform)
             self.parser = StrOutputParser()
             self.chain = self.prompt_template | self.llm | self.parser
 
@@ -882,18 +993,24 @@ class ContentGenerator:
                 input_texts
             )
 
-            # Generate content using selected strategy
-            self.response = strategy.generate(
-                self.chain,
-                input_texts,
-                prompt_params
-            )
+            if on_turn is not None and not longform:
+                self.response = self.__stream_turns(prompt_params, on_turn)
+            else:
+                # Generate content using selected strategy
+                self.response = strategy.generate(
+                    self.chain,
+                    input_texts,
+                    prompt_params
+                )
 
-            # Clean response using the same strategy
-            self.response = strategy.clean(
-                self.response,
-                self.content_generator_config
-            )
+                # Clean response using the same strategy
+                self.response = strategy.clean(
+                    self.response,
+                    self.content_generator_config
+                )
+                if on_turn is not None:
+                    for turn in Transcript.parse(self.response):
+                        on_turn(turn)
                 
             logger.info(f"Content generated successfully")
 
@@ -909,3 +1026,29 @@ class ContentGenerator:
         except Exception as e:
             logger.error(f"Error generating content: {str(e)}")
             raise
+
+    def __stream_turns(self, prompt_params: Dict[str, Any], on_turn: Callable[[Turn], None]) -> str:
+        """
+        Stream the standard-length response, passing on each turn once it is complete.
+
+        Returns:
+            str: The transcript of the turns passed on, or the cleaned response when it
+                has no speaker tags at all
+        """
+        parser = StreamingTurnParser()
+        turns: List[Turn] = []
+
+        def emit(completed: List[Turn]) -> None:
+            for turn in completed:
+                cleaned = ContentCleanerMixin._clean_turn(turn)
+                if cleaned is not None:
+                    turns.append(cleaned)
+                    on_turn(cleaned)
+
+        prompt = self.prompt_template.invoke(prompt_params)
+        response = self.llm_backend.stream(prompt, lambda text: emit(parser.feed(text)))
+        emit(parser.close())
+        if not turns:
+            return ContentCleanerMixin._clean_tss_markup(response)
+        # The saved transcript is exactly what was voiced
+        return Transcript(turns).to_markup()
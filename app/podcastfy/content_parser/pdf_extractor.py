@@ -10,6 +10,7 @@ import pymupdf
 import logging
 import os
 import unicodedata
+from typing import Iterator
 
 logger = logging.getLogger(__name__)
 
@@ -25,15 +26,29 @@ class PDFExtractor:
 		Returns:
 			str: Extracted text content with accents removed and properly handled characters.
 		"""
+		return " ".join(self.iter_text(file_path))
+
+	def iter_text(self, file_path: str) -> Iterator[str]:
+		"""
+		Extract the text content of a PDF file page by page, normalized like extract_content.
+
+		Only one page is held at a time, so a book-length PDF can be streamed into
+		long-form generation.
+
+		Args:
+			file_path (str): Path to the PDF file.
+
+		Returns:
+			Iterator[str]: Normalized text of every page, in order.
+		"""
 		try:
 			doc = pymupdf.open(file_path)
-			content = " ".join(page.get_text() for page in doc)
-			doc.close()
-			
-			# Normalize the text to handle special characters and remove accents
-			normalized_content = unicodedata.normalize('NFKD', content)
-
-			return normalized_content
+			try:
+				for page in doc:
+					# Normalize the text to handle special characters and remove accents
+					yield unicodedata.normalize('NFKD', page.get_text())
+			finally:
+				doc.close()
 		except Exception as e:
 			logger.error(f"Error extracting PDF content: {str(e)}")
 			raise
@@ -0,0 +1,163 @@
+"""
+HLS Module
+
+Writes an episode as HTTP Live Streaming output: fixed-duration MPEG-TS segments plus an
+.m3u8 playlist. Audio is appended in speaking order while it is synthesized; every full
+segment is encoded and published at once, and the playlist is republished after it, so a
+player can start the episode long before the last chunk exists.
+
+The playlist is an EVENT playlist, which players reload until #EXT-X-ENDLIST appears.
+Segments are numbered from the start of the episode, so re-rendering a section rewrites
+only its own segments as long as the audio before it keeps its length; an upload that
+skips unchanged objects then publishes just those.
+"""
+
+import logging
+import math
+import os
+import sys
+import threading
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from .audio_encoding import decode_audio
+
+logger = logging.getLogger(__name__)
+
+PLAYLIST_NAME = "episode.m3u8"
+
+# Content types to serve the published files with
+CONTENT_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+}
+
+
+class SegmentedEpisode:
+    """
+    An episode written as HLS segments and a playlist while its audio arrives.
+
+    append() is safe to call from several threads; the caller is responsible for
+    appending audio in speaking order.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        segment_seconds: float = 6.0,
+        export_params: Optional[Dict[str, Any]] = None,
+        publish: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        Args:
+            output_dir (str): Directory for the segments and the playlist
+            segment_seconds (float): Duration of every segment but the last
+            export_params (Optional[Dict[str, Any]]): Segment encoding: codec, bitrate,
+                channels, sample_rate. Defaults to 64k AAC.
+            publish (Optional[Callable[[str], None]]): Called with the path of every
+                segment and playlist once it is written, e.g. to upload it
+        """
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self.segment_seconds = segment_seconds
+        self.export_params = dict(export_params or {"codec": "aac", "bitrate": "64k"})
+        self.publish = publish
+        # Duration in seconds of every segment written so far
+        self.durations: List[float] = []
+        self._buffer = None
+        self._lock = threading.Lock()
+
+    @property
+    def playlist_path(self) -> str:
+        return os.path.join(self.output_dir, PLAYLIST_NAME)
+
+    def append(self, audio: Union[bytes, str], input_format: Optional[str] = None) -> None:
+        """
+        Add the next piece of audio, writing every segment it completes.
+
+        Args:
+            audio (Union[bytes, str]): Encoded audio data or the path of an audio file
+            input_format (Optional[str]): Format of the audio; None lets ffmpeg probe it
+        """
+        segment = decode_audio(audio, input_format)
+        # Every segment of the playlist shares one channel layout and sample rate
+        if self.export_params.get("channels"):
+            segment = segment.set_channels(self.export_params["channels"])
+        if self.export_params.get("sample_rate"):
+            segment = segment.set_frame_rate(self.export_params["sample_rate"])
+
+        segment_ms = int(self.segment_seconds * 1000)
+        with self._lock:
+            self._buffer = segment if self._buffer is None else self._buffer + segment
+            written = False
+            while len(self._buffer) >= segment_ms:
+                self._write_segment(self._buffer[:segment_ms])
+                self._buffer = self._buffer[segment_ms:]
+                written = True
+            if written:
+                self._write_playlist(ended=False)
+
+    def finish(self) -> str:
+        """
+        Write the remaining audio as a last, shorter segment and end the playlist.
+
+        Returns:
+            str: Path of the playlist
+        """
+        with self._lock:
+            if self._buffer is not None and len(self._buffer) > 0:
+                self._write_segment(self._buffer)
+            self._buffer = None
+            self._write_playlist(ended=True)
+        logger.info(f"HLS playlist with {len(self.durations)} segments saved to {self.playlist_path}")
+        return self.playlist_path
+
+    def _write_segment(self, audio) -> None:
+        start = sum(self.durations)
+        path = os.path.join(self.output_dir, f"segment_{len(self.durations):05d}.ts")
+        params = {k: v for k, v in self.export_params.items() if k in ("codec", "bitrate")}
+        # Timestamps continue from the previous segment, so players see one timeline
+        audio.export(path, format="mpegts", parameters=["-output_ts_offset", f"{start:.3f}"], **params)
+        self.durations.append(len(audio) / 1000)
+        self._publish(path)
+
+    def _write_playlist(self, ended: bool) -> None:
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            # Every segment is at most segment_seconds long, so the target never changes
+            f"#EXT-X-TARGETDURATION:{math.ceil(self.segment_seconds)}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+        ]
+        for index, duration in enumerate(self.durations):
+            lines += [f"#EXTINF:{duration:.3f},", f"segment_{index:05d}.ts"]
+        if ended:
+            lines.append("#EXT-X-ENDLIST")
+
+        # Replaced atomically so a player reading the directory never sees half a playlist
+        temp_path = self.playlist_path + ".tmp"
+        with open(temp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, self.playlist_path)
+        self._publish(self.playlist_path)
+
+    def _publish(self, path: str) -> None:
+        if self.publish is not None:
+            self.publish(path)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Segment an existing episode: python -m app.podcastfy.hls EPISODE OUTPUT_DIR [SECONDS]
+    """
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) < 2:
+        print(main.__doc__.strip())
+        return
+    episode = SegmentedEpisode(args[1], segment_seconds=float(args[2]) if len(args) > 2 else 6.0)
+    episode.append(args[0])
+    print(f"{len(episode.durations)} segments, playlist {episode.finish()}")
+
+
+if __name__ == "__main__":
+    main()
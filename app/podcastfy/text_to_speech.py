@@ -6,17 +6,27 @@ It supports ElevenLabs, Google, OpenAI and Edge TTS services and handles the con
 including cleaning of input text and merging of audio files.
 """
 
-import io
+import concurrent.futures
+import contextvars
+import json
 import logging
 import os
-import re
+import shutil
 import tempfile
-from typing import List, Tuple, Optional, Dict, Any
-from pydub import AudioSegment
+import threading
+from typing import Callable, List, Tuple, Optional, Dict, Any, Union
 
+from .assets import AssetLibrary, asset_settings
+from .audio_encoding import OutputProfile, get_encoder
+from .checkpoint import CheckpointStore
+from .hls import SegmentedEpisode
 from .tts.factory import TTSProviderFactory
+from .transcript import SPEAKER_TAGS, Transcript, Turn
 from .utils.config import load_config
 from .utils.config_conversation import load_conversation_config
+from .utils.hedging import get_hedger
+from .utils.ratelimit import get_limiter
+from .utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -27,33 +37,80 @@ class TextToSpeech:
         model: str = None,
         api_key: Optional[str] = None,
         conversation_config: Optional[Dict[str, Any]] = None,
+        checkpoints: Optional[CheckpointStore] = None,
     ):
         """
         Initialize the TextToSpeech class.
 
         Args:
                         model (str): The model to use for text-to-speech conversion.
-                                                Options are 'elevenlabs', 'gemini', 'openai', 'edge' or 'geminimulti'. Defaults to 'openai'.
+                                                Options are 'elevenlabs', 'gemini', 'openai', 'edge', 'geminimulti' or 'composite'
+                                                (the weighted pool in text_to_speech.composite). Defaults to 'openai'.
                         api_key (Optional[str]): API key for the selected text-to-speech service.
                         conversation_config (Optional[Dict]): Configuration for conversation settings.
+                        checkpoints (Optional[CheckpointStore]): Store for synthesized chunks and the
+                                                assembled episode, so a retry only synthesizes what is missing.
         """
         self.config = load_config()
         self.conversation_config = load_conversation_config(conversation_config)
         self.tts_config = self.conversation_config.get("text_to_speech", {})
-
-        # Get API key from config if not provided
-        if not api_key:
-            api_key = getattr(self.config, f"{model.upper().replace('MULTI', '')}_API_KEY", None)
-
-        # Initialize provider using factory
-        self.provider = TTSProviderFactory.create(
-            provider_name=model, api_key=api_key, model=model
-        )
+        conversation = self.conversation_config.to_dict()
+
+        if model.lower() == "composite":
+            # Spread turns over several providers, each with its own key and quota
+            pool = conversation.get("text_to_speech", {}).get("composite", {}).get("pool", [])
+            self.provider = TTSProviderFactory.create_composite(
+                pool,
+                api_keys={entry["provider"].lower(): self._api_key(entry["provider"]) for entry in pool},
+                rate_limits=conversation.get("rate_limits", {}),
+            )
+        else:
+            # Get API key from config if not provided
+            if not api_key:
+                api_key = self._api_key(model)
+
+            # Initialize provider using factory
+            self.provider = TTSProviderFactory.create(
+                provider_name=model, api_key=api_key, model=model
+            )
 
         # Setup directories and config
         self._setup_directories()
-        self.audio_format = self.tts_config.get("audio_format", "mp3")
+        # Request the episode's codec from the provider when it can produce it, so the
+        # chunks need no transcode
+        self.output_profile = OutputProfile.from_config(conversation.get("text_to_speech", {}))
+        native_format = self.provider.NATIVE_ENCODINGS.get(self.output_profile.codec)
+        if native_format is not None:
+            self.provider.output_codec = self.output_profile.codec
+        self.chunk_format = self.provider.NATIVE_ENCODINGS[self.provider.output_codec]
+        # Level matching, silence trimming and crossfades need the decoded audio
+        postprocess = conversation.get("audio_postprocess") or {}
+        self.postprocess = postprocess if postprocess.get("enabled", False) else None
+        # Intro, outro and music bed recorded once and spliced into every episode
+        assets = asset_settings(conversation)
+        self.assets = AssetLibrary(self, assets) if assets is not None else None
+        self.stream_copy = (
+            self.output_profile.passthrough and native_format is not None and self.postprocess is None
+            and not (assets and assets["music_bed"])
+        )
+        # Optional HLS output written alongside the episode file
+        self.hls_settings = conversation.get("text_to_speech", {}).get("hls") or {}
         self.ending_message = self.tts_config.get("ending_message", "")
+        if assets and assets["outro"]:
+            # The recorded outro closes every episode instead
+            self.ending_message = ""
+        self.checkpoints = checkpoints
+        # Every synthesis request of this provider, from any thread, shares one quota
+        self.limiter = get_limiter(f"tts:{model.lower()}", conversation.get("rate_limits", {}))
+        # Deadlines and hedged duplicates against the provider's latency tail
+        self.hedger = get_hedger(f"tts:{model.lower()}", conversation.get("hedging", {}), self.limiter)
+        self.provider.request_timeout = self.hedger.timeout
+        # Worker processes shared by every episode for decoding and encoding
+        self.encoder = get_encoder(conversation.get("audio_encoding", {}))
+
+    def _api_key(self, model: str) -> Optional[str]:
+        """API key of a provider from the environment config."""
+        return getattr(self.config, f"{model.upper().replace('MULTI', '')}_API_KEY", None)
 
     def _get_provider_config(self) -> Dict[str, Any]:
         """Get provider-specific configuration."""
@@ -76,105 +133,249 @@ class TextToSpeech:
         logger.debug(f"Using provider config: {provider_config}")
         return provider_config
 
-    def convert_to_speech(self, text: str, output_file: str) -> None:
+    def convert_to_speech(self, text: Union[str, Transcript], output_file: str,
+                          publish: Optional[Callable[[str], None]] = None) -> None:
         """
         Convert input text to speech and save as an audio file.
 
+        With the text_to_speech.hls config enabled, the episode is also written as HLS
+        segments and a playlist in an hls directory next to output_file, segment by
+        segment as the audio is synthesized.
+
         Args:
-                text (str): Input text to convert to speech.
+                text (Union[str, Transcript]): Tagged transcript text or a parsed Transcript.
                 output_file (str): Path to save the output audio file.
+                publish (Optional[Callable[[str], None]]): Called with the path of every HLS
+                        segment and playlist once it is written.
 
         Raises:
             ValueError: If the input text is not properly formatted
         """
-        # Validate transcript format
-        # self._validate_transcript_format(text)
+        # Parsed once; every stage below works on the turns
+        cleaned_text = Transcript.parse(text)
+        segments = self._open_segments(output_file, publish)
+
+        assemble_key = None
+        if self.checkpoints is not None:
+            assemble_key = self._assemble_key(cleaned_text)
+            episode = self.checkpoints.get(assemble_key)
+            if episode is not None:
+                logger.info(f"Resuming from checkpoint {assemble_key}")
+                os.makedirs(os.path.dirname(output_file), exist_ok=True)
+                with open(output_file, "wb") as f:
+                    f.write(episode)
+                if segments is not None:
+                    segments.append(episode)
+                    segments.finish()
+                return
+
+        if segments is not None:
+            self._segment_asset(segments, "intro")
 
-        cleaned_text = text
+        # Validate transcript format
+        # self._validate_transcript_format(cleaned_text)
 
         try:
 
-            if (
-                "multi" in self.provider.model.lower()
-            ):  # refactor: We should have instead MultiSpeakerTTS and SingleSpeakerTTS classes
-                provider_config = self._get_provider_config()
-                voice = provider_config.get("default_voices", {}).get("question")
-                voice2 = provider_config.get("default_voices", {}).get("answer")
-                model = provider_config.get("model")
-                audio_data_list = self.provider.generate_audio(
-                    cleaned_text,
-                    voice="S",
-                    model="en-US-Studio-MultiSpeaker",
-                    voice2="R",
-                    ending_message=self.ending_message,
-                )
-
-                try:
-                    # First verify we have data
-                    if not audio_data_list:
-                        raise ValueError("No audio data chunks provided")
-
-                    logger.info(f"Starting audio processing with {len(audio_data_list)} chunks")
-                    combined = AudioSegment.empty()
-                    
-                    for i, chunk in enumerate(audio_data_list):
-                        # Save chunk to temporary file
-                        #temp_file = "./tmp.mp3"
-                        #with open(temp_file, "wb") as f:
-                        #    f.write(chunk)
-                        
-                        segment = AudioSegment.from_file(io.BytesIO(chunk))
-                        logger.info(f"################### Loaded chunk {i}, duration: {len(segment)}ms")
-                        
-                        combined += segment
-                    
-                    # Export with high quality settings
-                    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-                    combined.export(
-                        output_file, 
-                        format=self.audio_format,
-                        codec="libmp3lame",
-                        bitrate="320k"
-                    )
-                    
-                except Exception as e:
-                    logger.error(f"Error during audio processing: {str(e)}")
-                    raise
+            if self.provider.multi_speaker:
+                # One request per chunk, so a failed chunk is all a retry has to redo
+                chunks = self.provider.prepare_chunks(cleaned_text, self.ending_message)
+                audio_data_list = []
+                for chunk in chunks:
+                    audio_data_list.append(self._synthesize_chunk(chunk))
+                    if segments is not None:
+                        segments.append(audio_data_list[-1], self.chunk_format)
+
+                with span("audio.merge", chunks=len(audio_data_list)):
+                    self._merge_audio_chunks(audio_data_list, output_file)
             else:
                 with tempfile.TemporaryDirectory(dir=self.temp_audio_dir) as temp_dir:
                     audio_segments = self._generate_audio_segments(
-                        cleaned_text, temp_dir
+                        cleaned_text, temp_dir, segments
                     )
-                    self._merge_audio_files(audio_segments, output_file)
+                    with span("audio.merge", chunks=len(audio_segments)):
+                        self._merge_audio_files(audio_segments, output_file)
                     logger.info(f"Audio saved to {output_file}")
 
+            if segments is not None:
+                self._segment_asset(segments, "outro")
+                segments.finish()
+
+            if assemble_key is not None:
+                with open(output_file, "rb") as f:
+                    self.checkpoints.put(assemble_key, f.read())
+
         except Exception as e:
             logger.error(f"Error converting text to speech: {str(e)}")
             raise
 
-    def _generate_audio_segments(self, text: str, temp_dir: str) -> List[str]:
+    def open_stream(self, output_file: str, max_workers: int = 4,
+                    publish: Optional[Callable[[str], None]] = None) -> "SpeechStream":
+        """
+        Start synthesizing a transcript that is still being written.
+
+        Args:
+            output_file (str): Path to save the output audio file once the stream is finished
+            max_workers (int): Synthesis requests in flight at once
+            publish (Optional[Callable[[str], None]]): Called with the path of every HLS
+                segment and playlist once it is written, see convert_to_speech
+
+        Returns:
+            SpeechStream: Stream to add turns to as they are completed
+        """
+        return SpeechStream(self, output_file, max_workers, publish)
+
+    def _open_segments(self, output_file: str,
+                       publish: Optional[Callable[[str], None]]) -> Optional[SegmentedEpisode]:
+        """HLS output of an episode, when the hls config enables it."""
+        if not self.hls_settings.get("enabled", False):
+            return None
+        return SegmentedEpisode(
+            os.path.join(os.path.dirname(output_file), "hls"),
+            segment_seconds=self.hls_settings.get("segment_seconds", 6),
+            export_params={
+                k: self.hls_settings[k] for k in ("codec", "bitrate", "channels", "sample_rate")
+                if self.hls_settings.get(k)
+            },
+            publish=publish,
+        )
+
+    def _segment_asset(self, segments: SegmentedEpisode, name: str) -> None:
+        """Add the intro or outro asset, if there is one, to the HLS segments."""
+        audio = self.assets.get(name) if self.assets is not None else None
+        if audio:
+            segments.append(audio, self.chunk_format)
+
+    def _encode_episode(self, inputs: List[Union[bytes, str]], output_file: str) -> None:
+        """Splice in the assets, then decode, concatenate and export the episode on the encoding pool."""
+        music_bed = None
+        if self.assets is not None:
+            inputs = self.assets.splice(inputs)
+            music_bed = self.assets.music_bed()
+        self.encoder.encode(
+            inputs,
+            output_file,
+            input_format=self.chunk_format,
+            stream_copy=self.stream_copy,
+            postprocess=self.postprocess,
+            music_bed=music_bed,
+            **self.output_profile.export_params()
+        )
+
+    def _merge_audio_chunks(self, audio_data_list: List[bytes], output_file: str) -> None:
+        """Concatenate the multi-speaker chunks, in order, into the output file."""
+        try:
+            # First verify we have data
+            if not audio_data_list:
+                raise ValueError("No audio data chunks provided")
+
+            logger.info(f"Starting audio processing with {len(audio_data_list)} chunks")
+            # Decoding and the export run on the encoding pool, off this thread
+            self._encode_episode(audio_data_list, output_file)
+        
+        except Exception as e:
+            logger.error(f"Error during audio processing: {str(e)}")
+            raise
+
+    def _generate_audio_segments(self, text: Union[str, Transcript], temp_dir: str,
+                                 segments: Optional[SegmentedEpisode] = None) -> List[str]:
         """Generate audio segments for each Q&A pair."""
         qa_pairs = self.provider.split_qa(
             text, self.ending_message, self.provider.get_supported_tags()
         )
         audio_files = []
-        provider_config = self._get_provider_config()
 
         for idx, (question, answer) in enumerate(qa_pairs, 1):
             for speaker_type, content in [("question", question), ("answer", answer)]:
+                if not content:
+                    # An empty ending message: the recorded outro answers instead
+                    continue
                 temp_file = os.path.join(
-                    temp_dir, f"{idx}_{speaker_type}.{self.audio_format}"
+                    temp_dir, f"{idx}_{speaker_type}.{self.chunk_format}"
                 )
-                voice = provider_config.get("default_voices", {}).get(speaker_type)
-                model = provider_config.get("model")
-
-                audio_data = self.provider.generate_audio(content, voice, model)
+                audio_data = self._synthesize_turn(content, speaker_type)
                 with open(temp_file, "wb") as f:
                     f.write(audio_data)
                 audio_files.append(temp_file)
+                if segments is not None:
+                    segments.append(temp_file, self.chunk_format)
 
         return audio_files
 
+    def _synthesize_turn(self, content: str, speaker_type: str) -> bytes:
+        """Synthesize one turn with the question or answer voice of a single-speaker provider."""
+        provider_config = self._get_provider_config()
+        voice = provider_config.get("default_voices", {}).get(speaker_type)
+        model = provider_config.get("model")
+        return self._synthesize(
+            lambda: self.provider.generate_audio(content, voice, model),
+            voice, model, content,
+        )
+
+    def _synthesize_chunk(self, chunk: Transcript) -> bytes:
+        """Synthesize one chunk of a multi-speaker provider in a single request."""
+        return self._synthesize(
+            lambda: self.provider.synthesize_chunk(
+                chunk, voice="S", model="en-US-Studio-MultiSpeaker", voice2="R"
+            ),
+            "S", "R", "en-US-Studio-MultiSpeaker", chunk.to_markup(),
+        )
+
+    def _assemble_key(self, transcript: Transcript) -> str:
+        """Checkpoint key of the episode assembled from a transcript."""
+        return CheckpointStore.key(
+            "assemble",
+            self._checkpoint_scope(),
+            self.ending_message,
+            self.chunk_format,
+            repr(self.output_profile),
+            json.dumps(self.postprocess, sort_keys=True),
+            json.dumps(self.assets.settings if self.assets is not None else None, sort_keys=True),
+            transcript.to_markup(),
+        )
+
+    def _checkpoint_scope(self) -> str:
+        """Provider settings that, with the transcript, determine the synthesized audio."""
+        provider_config = self._get_provider_config()
+        # A NestedConfig would be serialized by its repr, which differs between instances
+        if hasattr(provider_config, "to_dict"):
+            provider_config = provider_config.to_dict()
+        return json.dumps(
+            [self.provider.__class__.__name__, self.provider.model, provider_config],
+            sort_keys=True,
+            default=str,
+        )
+
+    def _synthesize(self, produce: Callable[[], bytes], *key_parts: str) -> bytes:
+        """
+        Run one synthesis request within the provider rate limits and deadline, hedged
+        when it is slow, reusing its checkpointed audio when there is one.
+
+        Args:
+            produce (Callable[[], bytes]): Calls the provider
+            *key_parts (str): Voices, model and, last, the text of the request
+
+        Returns:
+            bytes: Audio data
+        """
+        with span("tts.synthesize", provider=self.provider.model, chars=len(key_parts[-1])) as current:
+            def limited() -> bytes:
+                current.set(resumed=False)
+                # Every attempt, hedged duplicates included, runs within the provider's
+                # limiter; the histogram sees provider latency only
+                return self.hedger.call(produce)
+
+            if self.checkpoints is None:
+                audio = limited()
+            else:
+                current.set(resumed=True)
+                key = CheckpointStore.key(
+                    "synthesize", self.provider.__class__.__name__, self.chunk_format, *key_parts
+                )
+                audio = self.checkpoints.cached(key, limited)
+            current.set(bytes=len(audio))
+            return audio
+
     def _merge_audio_files(self, audio_files: List[str], output_file: str) -> None:
         """
         Merge the provided audio files sequentially, ensuring questions come before answers.
@@ -202,18 +403,8 @@ class TextToSpeech:
             # Sort files by index and type (question/answer)
             audio_files.sort(key=get_sort_key)
 
-            # Create empty audio segment
-            combined = AudioSegment.empty()
-
-            # Add each audio file to the combined segment
-            for file_path in audio_files:
-                combined += AudioSegment.from_file(file_path, format=self.audio_format)
-
-            # Ensure output directory exists
-            os.makedirs(os.path.dirname(output_file), exist_ok=True)
-
-            # Export the combined audio
-            combined.export(output_file, format=self.audio_format)
+            # Decode, concatenate and export on the encoding pool
+            self._encode_episode(audio_files, output_file)
             logger.info(f"Merged audio saved to {output_file}")
 
         except Exception as e:
@@ -239,12 +430,12 @@ class TextToSpeech:
             if dir_path and not os.path.exists(dir_path):
                 os.makedirs(dir_path)
 
-    def _validate_transcript_format(self, text: str) -> None:
+    def _validate_transcript_format(self, text: Union[str, Transcript]) -> None:
         """
         Validate that the input text follows the correct transcript format.
 
         Args:
-            text (str): Input text to validate
+            text (Union[str, Transcript]): Input text or parsed Transcript to validate
 
         Raises:
             ValueError: If the text is not properly formatted
@@ -252,54 +443,20 @@ class TextToSpeech:
         The text should:
         1. Have alternating Person1 and Person2 tags
         2. Each opening tag should have a closing tag
-        3. Tags should be properly nested
         """
         try:
-            # Check for empty text
-            if not text.strip():
-                raise ValueError("Input text is empty")
-
-            # Check for matching opening and closing tags
-            person1_open = text.count("<Person1>")
-            person1_close = text.count("</Person1>")
-            person2_open = text.count("<Person2>")
-            person2_close = text.count("</Person2>")
-
-            if person1_open != person1_close:
-                raise ValueError(
-                    f"Mismatched Person1 tags: {person1_open} opening tags and {person1_close} closing tags"
-                )
-            if person2_open != person2_close:
-                raise ValueError(
-                    f"Mismatched Person2 tags: {person2_open} opening tags and {person2_close} closing tags"
-                )
-
-            # Check for alternating pattern using regex
-            pattern = r"<Person1>.*?</Person1>\s*<Person2>.*?</Person2>"
-            matches = re.findall(pattern, text, re.DOTALL)
-
-            # Calculate expected number of pairs
-            expected_pairs = min(person1_open, person2_open)
-
-            if len(matches) != expected_pairs:
-                raise ValueError(
-                    "Tags are not properly alternating between Person1 and Person2. "
-                    "Each Person1 section should be followed by a Person2 section."
-                )
-
-                # Check for malformed tags (unclosed or improperly nested)
-                stack = []
-                for match in re.finditer(r"<(/?)Person([12])>", text):
-                    tag = match.group(0)
-                    if tag.startswith("</"):
-                        if not stack or stack[-1] != tag[2:-1]:
-                            raise ValueError(f"Improperly nested tags near: {tag}")
-                        stack.pop()
-                    else:
-                        stack.append(tag[1:-1])
-
-                if stack:
-                    raise ValueError(f"Unclosed tags: {', '.join(stack)}")
+            if isinstance(text, str):
+                # Check for matching opening and closing tags
+                for tag in ("Person1", "Person2"):
+                    opened = text.count(f"<{tag}>")
+                    closed = text.count(f"</{tag}>")
+                    if opened != closed:
+                        raise ValueError(
+                            f"Mismatched {tag} tags: {opened} opening tags and {closed} closing tags"
+                        )
+
+            # Check for empty text and alternating speakers
+            Transcript.parse(text).validate()
 
             logger.debug("Transcript format validation passed")
 
@@ -311,6 +468,151 @@ class TextToSpeech:
             raise ValueError(f"Invalid transcript format: {str(e)}")
 
 
+class SpeechStream:
+    """
+    Synthesizes a transcript while the LLM is still writing it.
+
+    Each request whose text can no longer change is dispatched to a worker pool as soon
+    as it is known: for single-speaker providers a speaker's turn once the other speaker
+    starts (consecutive turns of one speaker are voiced together), for multi-speaker
+    providers a chunk once the next turn no longer fits into it. finish() dispatches the
+    rest, waits for every request and assembles the same episode convert_to_speech
+    renders from the complete transcript.
+    """
+
+    def __init__(self, tts: TextToSpeech, output_file: str, max_workers: int = 4,
+                 publish: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            tts (TextToSpeech): Provider, voices, limits and checkpoints to synthesize with
+            output_file (str): Path to save the assembled episode
+            max_workers (int): Synthesis requests in flight at once
+            publish (Optional[Callable[[str], None]]): Called with every HLS segment and
+                playlist written while the requests complete
+        """
+        self.tts = tts
+        self.output_file = output_file
+        self.turns: List[Turn] = []
+        # Turns that may still change: the open chunk, or the current speaker's turn
+        self._pending: List[Turn] = []
+        self._requests: List[concurrent.futures.Future] = []
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        # Spans of the requests belong to the episode that opened the stream
+        self._context = contextvars.copy_context()
+        self._multi_speaker = tts.provider.multi_speaker
+        self._tags = tuple(tts.provider.get_supported_tags()) + SPEAKER_TAGS
+        self._temp_dir = None if self._multi_speaker else tempfile.mkdtemp(dir=tts.temp_audio_dir)
+        self._segments = tts._open_segments(output_file, publish)
+        # Requests whose audio has joined the HLS segments; they are added in speaking order
+        self._segmented = 0
+        self._segment_lock = threading.Lock()
+        if self._segments is not None:
+            tts._segment_asset(self._segments, "intro")
+
+    def add(self, turn: Turn) -> None:
+        """
+        Add the next completed turn of the transcript.
+
+        Args:
+            turn (Turn): Cleaned turn, in speaking order
+        """
+        self.turns.append(turn)
+        if self._multi_speaker:
+            self._pending.append(turn)
+            chunks = self.tts.provider.prepare_chunks(Transcript(self._pending))
+            # Every chunk but the last is full; the next turn may still join the last one
+            for chunk in chunks[:-1]:
+                self._submit(lambda chunk=chunk: self.tts._synthesize_chunk(chunk))
+            self._pending = list(chunks[-1].turns) if chunks else []
+            return
+
+        turn = turn.strip_markup(self._tags)
+        if self._pending and self._pending[-1].speaker == turn.speaker:
+            self._pending[-1] = Turn(turn.speaker, f"{self._pending[-1].text} {turn.text}")
+            return
+        if self._pending:
+            self._submit_turn(self._pending.pop())
+        elif not self._requests and turn.speaker == 2:
+            # As in Transcript.qa_pairs, a placeholder question when Person2 speaks first
+            self._submit_turn(Turn(1, "Humm..."))
+        self._pending = [turn]
+
+    def finish(self) -> None:
+        """
+        Synthesize the remaining turns, wait for every request and save the episode.
+
+        Raises:
+            Exception: The first failed synthesis request, or a failed merge
+        """
+        try:
+            if self._multi_speaker:
+                for chunk in self.tts.provider.prepare_chunks(Transcript(self._pending), self.tts.ending_message):
+                    self._submit(lambda chunk=chunk: self.tts._synthesize_chunk(chunk))
+            elif self._pending:
+                last = self._pending.pop()
+                self._submit_turn(last)
+                if last.speaker == 1 and self.tts.ending_message:
+                    self._submit_turn(Turn(2, self.tts.ending_message))
+            self._pending = []
+
+            results = [request.result() for request in self._requests]
+            if self._segments is not None:
+                self._extend_segments()
+                self.tts._segment_asset(self._segments, "outro")
+                self._segments.finish()
+            with span("audio.merge", chunks=len(results)):
+                if self._multi_speaker:
+                    self.tts._merge_audio_chunks(results, self.output_file)
+                else:
+                    self.tts._merge_audio_files(results, self.output_file)
+            logger.info(f"Audio saved to {self.output_file}")
+
+            if self.tts.checkpoints is not None:
+                with open(self.output_file, "rb") as f:
+                    self.tts.checkpoints.put(self.tts._assemble_key(Transcript(self.turns)), f.read())
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Cancel requests not yet started and remove temporary files."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        if self._temp_dir is not None:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            self._temp_dir = None
+
+    def _submit_turn(self, turn: Turn) -> None:
+        # Files are named like _generate_audio_segments' so _merge_audio_files orders them
+        speaker_type = "question" if turn.speaker == 1 else "answer"
+        path = os.path.join(
+            self._temp_dir, f"{len(self._requests) // 2 + 1}_{speaker_type}.{self.tts.chunk_format}"
+        )
+
+        def synthesize() -> str:
+            audio_data = self.tts._synthesize_turn(turn.text, speaker_type)
+            with open(path, "wb") as f:
+                f.write(audio_data)
+            return path
+
+        self._submit(synthesize)
+
+    def _submit(self, request: Callable[[], Any]) -> None:
+        future = self._pool.submit(self._context.copy().run, request)
+        self._requests.append(future)
+        if self._segments is not None:
+            future.add_done_callback(lambda _: self._extend_segments())
+
+    def _extend_segments(self) -> None:
+        """Add the audio of the leading completed requests to the HLS segments."""
+        # Requests complete out of order; the segments follow the speaking order
+        with self._segment_lock:
+            while self._segmented < len(self._requests):
+                request = self._requests[self._segmented]
+                if not request.done() or request.cancelled() or request.exception() is not None:
+                    return
+                self._segments.append(request.result(), self.tts.chunk_format)
+                self._segmented += 1
+
+
 def main(seed: int = 42) -> None:
     """
     Main function to test the TextToSpeech class.
@@ -0,0 +1,309 @@
+"""
+Transcript Module
+
+This module provides the structured transcript passed between the content generation
+and text-to-speech stages. A transcript is parsed once from the <Person1>/<Person2>
+tag format produced by the LLM into a list of speaker turns; downstream stages work
+on the turns directly instead of re-scanning the string with their own regexes.
+"""
+
+import functools
+import re
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+# A turn runs from its opening tag to its closing tag, or, when the LLM forgot to
+# close it, up to the next opening tag or the end of the text.
+_TURN = re.compile(r"<Person([12])>(.*?)(?:</Person\1>|(?=<Person[12]>)|$)", re.DOTALL)
+_STRAY_PERSON_TAG = re.compile(r"</?Person[12]>")
+_OPENING_TAG = re.compile(r"<Person([12])>")
+# Where a turn opened by each speaker ends, as in _TURN
+_TURN_END = {speaker: re.compile(rf"</Person{speaker}>|(?=<Person[12]>)") for speaker in "12"}
+
+SPEAKER_TAGS = ("Person1", "Person2")
+
+
+@functools.lru_cache(maxsize=32)
+def _unsupported_tag_pattern(supported_tags: Tuple[str, ...]) -> "re.Pattern[str]":
+    # The optional slash sits inside the lookahead so closing tags of supported
+    # elements (</s>) are kept along with their opening tags
+    return re.compile(r"<(?!/?(?:" + "|".join(supported_tags) + r")\b)[^>]+>")
+
+
+def _turn_text(raw: str) -> str:
+    """Turn text with stray speaker tags removed and whitespace collapsed."""
+    return " ".join(_STRAY_PERSON_TAG.sub(" ", raw).split())
+
+
+@dataclass(frozen=True)
+class Turn:
+    """
+    A single speaker turn.
+
+    Attributes:
+        speaker (int): 1 for Person1 (question voice), 2 for Person2 (answer voice)
+        text (str): Spoken text, possibly with inline SSML elements
+    """
+    speaker: int
+    text: str
+
+    @property
+    def tag(self) -> str:
+        return f"Person{self.speaker}"
+
+    def to_markup(self) -> str:
+        return f"<{self.tag}>{self.text}</{self.tag}>"
+
+    def strip_markup(self, supported_tags: Sequence[str]) -> "Turn":
+        """
+        Remove SSML tags not in supported_tags from the turn text.
+
+        Args:
+            supported_tags (Sequence[str]): SSML tag names to keep
+
+        Returns:
+            Turn: Turn with unsupported tags removed
+        """
+        if "<" not in self.text:
+            return self
+        pattern = _unsupported_tag_pattern(tuple(supported_tags))
+        return Turn(self.speaker, pattern.sub("", self.text).strip())
+
+
+@dataclass
+class Transcript:
+    """
+    An ordered list of speaker turns.
+
+    Attributes:
+        turns (List[Turn]): Turns in speaking order
+    """
+    turns: List[Turn] = field(default_factory=list)
+
+    @classmethod
+    def parse(cls, text: Union[str, "Transcript"]) -> "Transcript":
+        """
+        Parse the <Person1>/<Person2> tag format in a single pass.
+
+        Unclosed tags are closed at the next opening tag; text outside of tags is
+        ignored; whitespace inside a turn is collapsed.
+
+        Args:
+            text (Union[str, Transcript]): Tagged transcript text. A Transcript is
+                returned unchanged.
+
+        Returns:
+            Transcript: Parsed transcript
+        """
+        if isinstance(text, Transcript):
+            return text
+        turns = []
+        for match in _TURN.finditer(text):
+            content = _turn_text(match.group(2))
+            if content:
+                turns.append(Turn(int(match.group(1)), content))
+        return cls(turns)
+
+    def __iter__(self) -> Iterator[Turn]:
+        return iter(self.turns)
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def __bool__(self) -> bool:
+        return bool(self.turns)
+
+    def to_markup(self, separator: str = "\n") -> str:
+        """
+        Serialize back to the <Person1>/<Person2> tag format.
+
+        Args:
+            separator (str): String placed between turns
+
+        Returns:
+            str: Tagged transcript text
+        """
+        return separator.join(turn.to_markup() for turn in self.turns)
+
+    def strip_markup(self, supported_tags: Optional[Sequence[str]] = None) -> "Transcript":
+        """
+        Remove SSML tags a provider does not support from every turn.
+
+        Args:
+            supported_tags (Optional[Sequence[str]]): SSML tag names to keep
+
+        Returns:
+            Transcript: Transcript with unsupported tags removed
+        """
+        tags = tuple(supported_tags or ()) + SPEAKER_TAGS
+        return Transcript([turn.strip_markup(tags) for turn in self.turns])
+
+    def merged(self) -> "Transcript":
+        """
+        Merge consecutive turns by the same speaker so speakers strictly alternate.
+
+        Returns:
+            Transcript: Transcript with alternating speakers
+        """
+        merged: List[Turn] = []
+        for turn in self.turns:
+            if merged and merged[-1].speaker == turn.speaker:
+                merged[-1] = Turn(turn.speaker, f"{merged[-1].text} {turn.text}")
+            else:
+                merged.append(turn)
+        return Transcript(merged)
+
+    def qa_pairs(self, ending_message: str = "") -> List[Tuple[str, str]]:
+        """
+        Pair Person1 and Person2 turns into (question, answer) tuples.
+
+        A placeholder question is added when Person2 speaks first, and the ending
+        message answers a trailing Person1 turn.
+
+        Args:
+            ending_message (str): Answer for a trailing unanswered Person1 turn
+
+        Returns:
+            List[Tuple[str, str]]: (Person1, Person2) dialogues
+        """
+        turns = self.merged().turns
+        if not turns:
+            return []
+        if turns[0].speaker == 2:
+            turns = [Turn(1, "Humm...")] + turns
+        if turns[-1].speaker == 1:
+            turns = turns + [Turn(2, ending_message)]
+        return [(turns[i].text, turns[i + 1].text) for i in range(0, len(turns) - 1, 2)]
+
+    def chunks(self, max_bytes: int) -> List["Transcript"]:
+        """
+        Group consecutive turns into transcripts whose tagged form fits max_bytes of
+        UTF-8.
+
+        A turn that does not fit into the rest of a chunk is split at sentence
+        boundaries: its first sentences fill the chunk and the rest continue in the
+        next ones, so every chunk but the last is close to max_bytes. Turns with
+        inline markup are never split, and one larger than max_bytes forms a chunk of
+        its own.
+
+        Args:
+            max_bytes (int): Maximum UTF-8 size of each chunk's markup
+
+        Returns:
+            List[Transcript]: Chunks in order
+        """
+        from .utils.chunking import iter_chunks, split_sentences, utf8_length
+
+        chunks: List[Transcript] = []
+        current: List[Turn] = []
+        size = 0
+        for turn in self.turns:
+            turn_size = utf8_length(turn.to_markup())
+            if size + turn_size <= max_bytes:
+                current.append(turn)
+                size += turn_size
+                continue
+            if "<" in turn.text:
+                # SSML elements may span sentences; such a turn stays whole
+                if current:
+                    chunks.append(Transcript(current))
+                current, size = [turn], turn_size
+                continue
+
+            tags_size = turn_size - utf8_length(turn.text)
+            sentences = split_sentences(turn.text)
+            # The first sentences that fit complete the open chunk
+            head: List[str] = []
+            head_size = 0
+            available = max_bytes - size - tags_size
+            for sentence in sentences:
+                sentence_size = utf8_length(sentence) + (1 if head else 0)
+                if head_size + sentence_size > available:
+                    break
+                head.append(sentence)
+                head_size += sentence_size
+            if head:
+                current.append(Turn(turn.speaker, " ".join(head)))
+            if current:
+                chunks.append(Transcript(current))
+            current, size = [], 0
+            # The rest fills whole chunks; its last piece stays open for the next turns
+            pieces = list(iter_chunks(sentences[len(head):], max_bytes - tags_size, utf8_length))
+            for piece in pieces[:-1]:
+                chunks.append(Transcript([Turn(turn.speaker, piece)]))
+            if pieces:
+                current = [Turn(turn.speaker, pieces[-1])]
+                size = tags_size + utf8_length(pieces[-1])
+        if current:
+            chunks.append(Transcript(current))
+        return chunks
+
+    def validate(self) -> None:
+        """
+        Check that the transcript is non-empty and alternates between speakers.
+
+        Raises:
+            ValueError: If the transcript is empty or two consecutive turns share a speaker
+        """
+        if not self.turns:
+            raise ValueError("Input text is empty")
+        for previous, turn in zip(self.turns, self.turns[1:]):
+            if previous.speaker == turn.speaker:
+                raise ValueError(
+                    "Tags are not properly alternating between Person1 and Person2. "
+                    f"Consecutive {turn.tag} turns near: {turn.text[:50]!r}"
+                )
+
+
+class StreamingTurnParser:
+    """
+    Incremental parser for a transcript that arrives in pieces, e.g. from an LLM stream.
+
+    A turn is complete once its closing tag, or the next opening tag, has arrived; the
+    turns returned by feed() and close() together equal Transcript.parse of the whole text.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, piece: str) -> List[Turn]:
+        """
+        Add the next piece of text.
+
+        Args:
+            piece (str): Text following everything fed so far
+
+        Returns:
+            List[Turn]: Turns completed by this piece, in order
+        """
+        self._buffer += piece
+        turns = []
+        while True:
+            opening = _OPENING_TAG.search(self._buffer)
+            if opening is None:
+                # Text outside of tags is ignored, but a tag may be split across pieces
+                cut = self._buffer.rfind("<")
+                self._buffer = self._buffer[cut:] if cut != -1 else ""
+                break
+            speaker = opening.group(1)
+            end = _TURN_END[speaker].search(self._buffer, opening.end())
+            if end is None:
+                self._buffer = self._buffer[opening.start():]
+                break
+            content = _turn_text(self._buffer[opening.end():end.start()])
+            if content:
+                turns.append(Turn(int(speaker), content))
+            # A closing tag is consumed; the next opening tag is left to start the next turn
+            self._buffer = self._buffer[end.end():]
+        return turns
+
+    def close(self) -> List[Turn]:
+        """
+        End the stream, completing a turn whose closing tag never came.
+
+        Returns:
+            List[Turn]: The unclosed last turn, if any
+        """
+        turns = Transcript.parse(self._buffer).turns
+        self._buffer = ""
+        return turns
@@ -1,8 +1,9 @@
 """Abstract base class for Text-to-Speech providers."""
 
 from abc import ABC, abstractmethod
-from typing import List, ClassVar, Tuple
-import re
+from typing import Dict, List, ClassVar, Optional, Tuple, Union
+
+from ..transcript import SPEAKER_TAGS, Transcript
 
 class TTSProvider(ABC):
     """Abstract base class that defines the interface for TTS providers."""
@@ -11,6 +12,18 @@ class TTSProvider(ABC):
     COMMON_SSML_TAGS: ClassVar[List[str]] = [
         'lang', 'p', 'phoneme', 's', 'sub'
     ]
+
+    # Seconds before the provider client gives up on a request; None uses the client default
+    request_timeout: Optional[float] = None
+
+    # Multi-speaker providers synthesize whole dialogue chunks via prepare_chunks/synthesize_chunk
+    multi_speaker: ClassVar[bool] = False
+
+    # ffmpeg codecs the provider can return, mapped to the format of the audio it returns
+    NATIVE_ENCODINGS: ClassVar[Dict[str, str]] = {'libmp3lame': 'mp3'}
+
+    # Codec requested from the provider, one of NATIVE_ENCODINGS
+    output_codec: str = 'libmp3lame'
     
     @abstractmethod
     def generate_audio(self, text: str, voice: str, model: str, voice2: str) -> bytes:
@@ -54,39 +67,21 @@ class TTSProvider(ABC):
         if not model:
             raise ValueError("Model must be specified")
         
-    def split_qa(self, input_text: str, ending_message: str, supported_tags: List[str] = None) -> List[Tuple[str, str]]:
+    def split_qa(self, input_text: Union[str, Transcript], ending_message: str, supported_tags: List[str] = None) -> List[Tuple[str, str]]:
         """
         Split the input text into question-answer pairs.
 
         Args:
-            input_text (str): The input text containing Person1 and Person2 dialogues.
+            input_text (Union[str, Transcript]): The Person1/Person2 dialogue, as tagged text or a parsed Transcript.
             ending_message (str): The ending message to add to the end of the input text.
 
         Returns:
                 List[Tuple[str, str]]: A list of tuples containing (Person1, Person2) dialogues.
         """
-        input_text = self.clean_tss_markup(input_text, supported_tags=supported_tags)
-        
-        # Add placeholder if input_text starts with <Person2>
-        if input_text.strip().startswith("<Person2>"):
-            input_text = "<Person1> Humm... </Person1>" + input_text
-
-        # Add ending message to the end of input_text
-        if input_text.strip().endswith("</Person1>"):
-            input_text += f"<Person2>{ending_message}</Person2>"
-
-        # Regular expression pattern to match Person1 and Person2 dialogues
-        pattern = r"<Person1>(.*?)</Person1>\s*<Person2>(.*?)</Person2>"
-
-        # Find all matches in the input text
-        matches = re.findall(pattern, input_text, re.DOTALL)
-
-        # Process the matches to remove extra whitespace and newlines
-        processed_matches = [
-            (" ".join(person1.split()).strip(), " ".join(person2.split()).strip())
-            for person1, person2 in matches
-        ]
-        return processed_matches
+        if supported_tags is None:
+            supported_tags = self.COMMON_SSML_TAGS
+        transcript = Transcript.parse(input_text).strip_markup(supported_tags)
+        return transcript.qa_pairs(ending_message)
 
     def clean_tss_markup(self, input_text: str, additional_tags: List[str] = ["Person1", "Person2"], supported_tags: List[str] = None) -> str:
         """
@@ -100,25 +95,7 @@ class TTSProvider(ABC):
             str: Cleaned text with unsupported TSS markup tags removed.
         """
         if supported_tags is None:
-            supported_tags = self.COMMON_SSML_TAGS.copy()
-
-        # Append additional tags to the supported tags list
-        supported_tags.extend(additional_tags)
-
-        # Create a pattern that matches any tag not in the supported list
-        pattern = r'</?(?!(?:' + '|'.join(supported_tags) + r')\b)[^>]+>'
-
-        # Remove unsupported tags
-        cleaned_text = re.sub(pattern, '', input_text)
-
-        # Remove any leftover empty lines
-        cleaned_text = re.sub(r'\n\s*\n', '\n', cleaned_text)
-
-        # Ensure closing tags for additional tags are preserved
-        for tag in additional_tags:
-            cleaned_text = re.sub(f'<{tag}>(.*?)(?=<(?:{"|".join(additional_tags)})>|$)', 
-                                f'<{tag}>\\1</{tag}>', 
-                                cleaned_text, 
-                                flags=re.DOTALL)
-
-        return cleaned_text.strip()
\ No newline at end of file
+            supported_tags = self.COMMON_SSML_TAGS
+        # Copy rather than extend: callers pass class-level tag lists
+        tags = list(supported_tags) + [t for t in additional_tags if t not in SPEAKER_TAGS]
+        return Transcript.parse(input_text).strip_markup(tags).to_markup()
@@ -1,12 +1,13 @@
 """Factory for creating TTS providers."""
 
-from typing import Dict, Type, Optional
+from typing import Any, Dict, List, Type, Optional
 from .base import TTSProvider
 from .providers.elevenlabs import ElevenLabsTTS
 from .providers.openai import OpenAITTS
 from .providers.edge import EdgeTTS
 from .providers.gemini import GeminiTTS
 from .providers.geminimulti import GeminiMultiTTS
+from .providers.composite import CompositeTTS, PoolMember
 class TTSProviderFactory:
     """Factory class for creating TTS providers."""
     
@@ -41,6 +42,40 @@ class TTSProviderFactory:
                            
         return provider_class(api_key, model) if api_key else provider_class(model=model)
     
+    @classmethod
+    def create_composite(
+        cls,
+        pool: List[Dict[str, Any]],
+        api_keys: Optional[Dict[str, str]] = None,
+        rate_limits: Optional[Dict[str, Any]] = None,
+    ) -> CompositeTTS:
+        """
+        Create a composite provider over a weighted pool of providers.
+
+        Args:
+            pool: Entries with `provider`, and optional `weight`, `model` and `voices`
+                (logical voice to provider voice)
+            api_keys: API key by provider name
+            rate_limits: `rate_limits` config section, for each member's own quota
+
+        Returns:
+            CompositeTTS instance
+        """
+        api_keys = api_keys or {}
+        members = []
+        for entry in pool:
+            name = entry["provider"].lower()
+            provider = cls.create(name, api_key=api_keys.get(name), model=entry.get("model") or name)
+            members.append(PoolMember(
+                name,
+                provider,
+                weight=entry.get("weight", 1.0),
+                voices=entry.get("voices"),
+                model=entry.get("model"),
+                rate_limits=rate_limits,
+            ))
+        return CompositeTTS(members)
+
     @classmethod
     def register_provider(cls, name: str, provider_class: Type[TTSProvider]) -> None:
         """Register a new provider class."""
@@ -0,0 +1,223 @@
+"""Composite TTS provider that spreads turns across a weighted pool of providers."""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from ..base import TTSProvider
+from ...transcript import Transcript, Turn
+from ...utils.ratelimit import get_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Stops routing to a provider after consecutive failures.
+
+    After `failure_threshold` failures in a row the circuit opens and the provider is
+    skipped for `reset_timeout` seconds; then a single trial request is let through
+    (half-open), and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a request may be sent to the provider now."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class PoolMember:
+    """A provider in the pool, with its routing weight, voice mapping and health."""
+
+    def __init__(self, name: str, provider: TTSProvider, weight: float = 1.0,
+                 voices: Optional[Dict[str, str]] = None, model: Optional[str] = None,
+                 breaker: Optional[CircuitBreaker] = None, rate_limits: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the PoolMember.
+
+        Args:
+            name (str): Provider name, as registered in TTSProviderFactory
+            provider (TTSProvider): Provider instance
+            weight (float): Share of turns routed to this provider
+            voices (Optional[Dict[str, str]]): Logical voice ("question", "answer") to provider voice
+            model (Optional[str]): Model passed to the provider. Defaults to the provider's model.
+            breaker (Optional[CircuitBreaker]): Circuit breaker. Defaults to a new one.
+            rate_limits (Optional[Dict[str, Any]]): `rate_limits` config section
+        """
+        self.name = name
+        self.provider = provider
+        self.weight = weight
+        self.voices = voices or {}
+        self.model = model or provider.model
+        self.breaker = breaker or CircuitBreaker()
+        # Each member spends its own provider's quota
+        self.limiter = get_limiter(f"tts:{name}", rate_limits)
+        self.current_weight = 0.0
+        self.successes = 0
+        self.failures = 0
+
+    def synthesize(self, text: str, voice: str) -> bytes:
+        """
+        Synthesize one turn with this provider's voice for the logical voice.
+
+        Args:
+            text (str): Turn text
+            voice (str): Logical voice, or a provider voice passed through unmapped
+
+        Returns:
+            bytes: Audio data
+        """
+        mapped = self.voices.get(voice, voice)
+        if self.provider.multi_speaker:
+            # A multi-speaker provider voices a single turn as a one-turn dialogue
+            return self.limiter.call(
+                self.provider.synthesize_chunk, Transcript([Turn(1, text)]),
+                voice=mapped, model=self.model, voice2=mapped,
+            )
+        return self.limiter.call(self.provider.generate_audio, text, mapped, self.model)
+
+
+class CompositeTTS(TTSProvider):
+    """
+    Routes each turn to one provider of a weighted pool and fails over on errors.
+
+    Turns are spread by smooth weighted round-robin over providers whose circuit is
+    closed, so throughput adds up across providers' quotas. A failed turn is retried on
+    the next provider; it only fails once every provider has failed it.
+    """
+
+    def __init__(self, members: List[PoolMember]):
+        """
+        Initialize the CompositeTTS provider.
+
+        Args:
+            members (List[PoolMember]): Pool members in preference order
+        """
+        if not members:
+            raise ValueError("CompositeTTS needs at least one provider")
+        self.members = members
+        self.model = "composite"
+        self._lock = threading.Lock()
+
+    @property
+    def request_timeout(self) -> Optional[float]:
+        return self.members[0].provider.request_timeout
+
+    @request_timeout.setter
+    def request_timeout(self, value: Optional[float]) -> None:
+        for member in self.members:
+            member.provider.request_timeout = value
+
+    def _choose(self, tried: Set[int]) -> Optional[PoolMember]:
+        # Members are told apart by index: a pool may list one provider twice, e.g. with
+        # two models, and each entry deserves its own try
+        untried = [m for i, m in enumerate(self.members) if i not in tried]
+        if not untried:
+            return None
+        with self._lock:
+            # A recovering provider gets a single trial turn before it rejoins the rotation
+            for member in untried:
+                if member.breaker.state == "half-open" and member.breaker.allow():
+                    return member
+            candidates = [m for m in untried if m.breaker.state == "closed"]
+            if not candidates:
+                # Every remaining circuit is open: try them anyway rather than drop the turn
+                candidates = untried
+            total = sum(m.weight for m in candidates)
+            for member in candidates:
+                member.current_weight += member.weight
+            chosen = max(candidates, key=lambda m: m.current_weight)
+            chosen.current_weight -= total
+            return chosen
+
+    def generate_audio(self, text: str, voice: str, model: str = None, voice2: str = None) -> bytes:
+        """
+        Synthesize a turn on the next healthy provider, failing over to the others.
+
+        Args:
+            text (str): Turn text
+            voice (str): Logical voice ("question" or "answer")
+            model (str): Ignored; each member uses its configured model
+
+        Returns:
+            bytes: Audio data
+
+        Raises:
+            RuntimeError: If every provider failed the turn
+        """
+        tried: Set[int] = set()
+        last_error = None
+        while True:
+            member = self._choose(tried)
+            if member is None:
+                raise RuntimeError(f"All TTS providers failed: {last_error}") from last_error
+            tried.add(self.members.index(member))
+            try:
+                audio = member.synthesize(text, voice)
+            except Exception as e:
+                member.failures += 1
+                member.breaker.record_failure()
+                logger.warning(f"{member.name} failed ({str(e)}); rerouting turn")
+                last_error = e
+                continue
+            member.successes += 1
+            member.breaker.record_success()
+            return audio
+
+    def get_supported_tags(self) -> List[str]:
+        """SSML tags every provider in the pool supports, so no turn depends on its route."""
+        tags = set(self.members[0].provider.get_supported_tags())
+        for member in self.members[1:]:
+            tags &= set(member.provider.get_supported_tags())
+        return sorted(tags)
+
+    def health(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Routing and health statistics per provider.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Circuit state, successes and failures by provider;
+                a provider listed more than once is keyed "name#index"
+        """
+        names = [m.name for m in self.members]
+        return {
+            (m.name if names.count(m.name) == 1 else f"{m.name}#{i}"):
+                {"state": m.breaker.state, "successes": m.successes, "failures": m.failures}
+            for i, m in enumerate(self.members)
+        }
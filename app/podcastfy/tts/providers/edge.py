@@ -43,7 +43,12 @@ class EdgeTTS(TTSProvider):
                     os.remove(temp_path)
 
         # Use nest_asyncio to handle nested event loops
-        loop = asyncio.get_event_loop()
+        try:
+            loop = asyncio.get_event_loop()
+        except RuntimeError:
+            # Worker threads (hedged calls) have no event loop of their own
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
         return loop.run_until_complete(_generate())
         
     def get_supported_tags(self) -> List[str]:
@@ -9,6 +9,13 @@ logger = logging.getLogger(__name__)
 
 class GeminiTTS(TTSProvider):
     """Google Cloud Text-to-Speech provider for single speaker."""
+
+    NATIVE_ENCODINGS = {'libmp3lame': 'mp3', 'libopus': 'ogg'}
+    # Google encoding of each native codec
+    AUDIO_ENCODINGS = {
+        'libmp3lame': texttospeech_v1beta1.AudioEncoding.MP3,
+        'libopus': texttospeech_v1beta1.AudioEncoding.OGG_OPUS,
+    }
     
     def __init__(self, api_key: str = None, model: str = "gemini-2.5-flash-preview"):
         """
@@ -61,14 +68,15 @@ class GeminiTTS(TTSProvider):
             
             # Set audio config
             audio_config = texttospeech_v1beta1.AudioConfig(
-                audio_encoding=texttospeech_v1beta1.AudioEncoding.MP3
+                audio_encoding=self.AUDIO_ENCODINGS[self.output_codec]
             )
             
             # Generate speech
             response = self.client.synthesize_speech(
                 input=synthesis_input,
                 voice=voice_params,
-                audio_config=audio_config
+                audio_config=audio_config,
+                timeout=self.request_timeout
             )
             
             return response.audio_content
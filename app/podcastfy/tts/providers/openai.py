@@ -9,6 +9,11 @@ class OpenAITTS(TTSProvider):
     
     # Provider-specific SSML tags
     PROVIDER_SSML_TAGS: List[str] = ['break', 'emphasis']
+
+    # Opus comes in Ogg, AAC as raw ADTS
+    NATIVE_ENCODINGS = {'libmp3lame': 'mp3', 'libopus': 'ogg', 'aac': 'aac'}
+    # response_format of each native codec
+    RESPONSE_FORMATS = {'libmp3lame': 'mp3', 'libopus': 'opus', 'aac': 'aac'}
     
     def __init__(self, api_key: Optional[str] = None, model: str = "tts-1-hd"):
         """
@@ -36,7 +41,9 @@ class OpenAITTS(TTSProvider):
             response = openai.audio.speech.create(
                 model=model,
                 voice=voice,
-                input=text
+                input=text,
+                response_format=self.RESPONSE_FORMATS[self.output_codec],
+                timeout=self.request_timeout
             )
             return response.content
         except Exception as e:
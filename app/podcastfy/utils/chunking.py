@@ -0,0 +1,336 @@
+"""
+Text Chunking Module
+
+The one chunker of the LLM and TTS stages. Sentences are segmented with a regex scan
+for sentence-final punctuation plus a few checks on each candidate boundary, so
+abbreviations (Dr., U.S., e.g.), initials, decimals and URLs do not end a sentence.
+Sentences are then packed greedily into chunks up to a limit measured by a pluggable
+length function: characters, UTF-8 bytes or model tokens.
+
+Everything streams: sentences are read from a string, a file-like object or an
+iterable of text pieces (e.g. the pages of a PDF) and packed into chunks as they
+arrive; only the sentence being read and the chunk being filled are kept.
+
+SlidingContext keeps the most recent part of a conversation within a token budget, so
+the context passed to every long-form round stops growing with the number of rounds.
+"""
+
+import re
+from collections import deque
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+from .tokens import TokenCounter
+
+# A string, a file-like object, or an iterable of consecutive text pieces
+TextSource = Union[str, TextIO, Iterable[str]]
+
+READ_SIZE = 1 << 16
+
+# Candidate boundaries: sentence-final punctuation with closing quotes or brackets and
+# the whitespace after it, not followed by a lowercase letter ("approx. five"); or a
+# blank line. Decimals (3.5) and URLs (axios.com/a.b) have no whitespace after their
+# dots and are never candidates.
+_BOUNDARY = re.compile(r"([.!?]+[\"')\]\u201d\u2019]*)(\s+)(?![a-z\s])|\n[^\S\n]*\n\s*")
+_TURN_START = re.compile(r"<Person[12]>")
+# U.S., U.K.; a lowercase "a.m." may end a sentence
+_DOTTED_ACRONYM = re.compile(r"^(?:[A-Z]\.)+[A-Z]$")
+_NEXT_WORD = re.compile(r"[\w.]*")
+# A decision needs at most this many characters after a candidate boundary
+_LOOKAHEAD = 16
+
+# Words that are followed by a period but do not end a sentence, lowercase, without the
+# final period
+ABBREVIATIONS = frozenset("""
+    mr mrs ms dr prof sr jr st mt ft gen gov sen rep rev hon capt col cmdr lt sgt pres
+    vs e.g i.e cf al approx est no nos vol vols fig figs dept univ assn bros inc corp ltd co
+    jan feb mar apr jun jul aug sep sept oct nov dec
+    u.s u.k u.n u.s.a e.u
+""".split())
+
+# "9 a.m. Eastern" continues the sentence; "9 a.m. The" does not
+TIME_ZONES = frozenset("et est edt ct cst cdt mt mst mdt pt pst pdt gmt utc bst cet eastern central mountain pacific".split())
+
+
+def utf8_length(text: str) -> int:
+    """Size of text in UTF-8 bytes."""
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def length_function(length: Union[str, Callable[[str], int]]) -> Callable[[str], int]:
+    """
+    Resolve a length function.
+
+    Args:
+        length (Union[str, Callable[[str], int]]): "chars", "bytes" (UTF-8), "tokens"
+            (4 characters per token estimate), "tiktoken:<encoding>" (requires
+            tiktoken), or a callable such as a model's token counter
+
+    Returns:
+        Callable[[str], int]: Length of a text
+
+    Raises:
+        ValueError: If the name is not known
+    """
+    if callable(length):
+        return length
+    if length == "chars":
+        return len
+    if length == "bytes":
+        return utf8_length
+    if length == "tokens":
+        return TokenCounter()
+    if length.startswith("tiktoken:"):
+        import tiktoken
+
+        encoding = tiktoken.get_encoding(length.partition(":")[2])
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    raise ValueError(f"Unknown length function {length!r}; use chars, bytes, tokens or tiktoken:<encoding>")
+
+
+def iter_pieces(source: TextSource, read_size: int = READ_SIZE) -> Iterator[str]:
+    """
+    Read a text source in pieces.
+
+    Args:
+        source (TextSource): Text, file-like object or iterable of text pieces
+        read_size (int): Characters per piece read from a string or file
+
+    Returns:
+        Iterator[str]: Consecutive pieces of the text
+    """
+    if isinstance(source, str):
+        for start in range(0, len(source), read_size):
+            yield source[start:start + read_size]
+    elif hasattr(source, "read"):
+        while True:
+            piece = source.read(read_size)
+            if not piece:
+                return
+            yield piece
+    else:
+        yield from source
+
+
+def _ends_sentence(text: str, match: "re.Match[str]") -> bool:
+    """Whether a candidate boundary of _BOUNDARY after a single period really ends a sentence."""
+    if match.group(2).count("\n") > 1:
+        # A blank line always ends one
+        return True
+    if text[match.end():match.end() + 1].islower():
+        # Non-ASCII lowercase: "approx. élan"
+        return False
+    start = match.start()
+    lookback = max(0, start - 32)
+    word_start = max(text.rfind(" ", lookback, start), text.rfind("\n", lookback, start), lookback - 1) + 1
+    word = text[word_start:start].lstrip("\"'([\u201c\u2018")
+    if len(word) == 1 and word.isalpha():
+        # An initial: "J. Smith"
+        return False
+    lower = word.lower()
+    if lower in ("a.m", "p.m"):
+        return _NEXT_WORD.match(text, match.end()).group().lower().rstrip(".") not in TIME_ZONES
+    return lower not in ABBREVIATIONS and not _DOTTED_ACRONYM.match(word)
+
+
+def _split(text: str, final: bool) -> Tuple[List[str], str]:
+    """Sentences of text, and the unfinished rest when more text may follow."""
+    sentences = []
+    start = 0
+    for match in _BOUNDARY.finditer(text):
+        if not final and match.end() + _LOOKAHEAD > len(text):
+            # The text after the whitespace decides; wait for it
+            break
+        if match.group(1) == "." and not _ends_sentence(text, match):
+            continue
+        end = match.end(1) if match.group(1) is not None else match.start()
+        sentence = text[start:end].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    if final:
+        rest = text[start:].strip()
+        return sentences + ([rest] if rest else []), ""
+    return sentences, text[start:]
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split text into sentences.
+
+    Args:
+        text (str): Text
+
+    Returns:
+        List[str]: Stripped, non-empty sentences in order
+    """
+    return _split(text, final=True)[0]
+
+
+def iter_sentences(source: TextSource, read_size: int = READ_SIZE,
+                   max_sentence: int = 4 * READ_SIZE) -> Iterator[str]:
+    """
+    Stream the sentences of a text source, see split_sentences.
+
+    Args:
+        source (TextSource): Text, file-like object or iterable of text pieces
+        read_size (int): Characters per piece read from a string or file
+        max_sentence (int): Text without a sentence boundary is cut at the last
+            whitespace once it is this long, so memory stays bounded
+
+    Returns:
+        Iterator[str]: Stripped, non-empty sentences in order
+    """
+    tail = ""
+    for piece in iter_pieces(source, read_size):
+        sentences, tail = _split(tail + piece, final=False)
+        yield from sentences
+        while len(tail) > max_sentence:
+            cut = tail.rfind(" ", 0, max_sentence)
+            cut = max_sentence if cut <= 0 else cut
+            if tail[:cut].strip():
+                yield tail[:cut].strip()
+            tail = tail[cut:]
+    yield from _split(tail, final=True)[0]
+
+
+def _split_words(sentence: str, max_length: int, length: Callable[[str], int]) -> Iterator[str]:
+    """Pieces of a sentence longer than max_length, cut between words."""
+    current = ""
+    for word in sentence.split():
+        candidate = f"{current} {word}" if current else word
+        if current and length(candidate) > max_length:
+            yield current
+            current = word
+        else:
+            current = candidate
+    if current:
+        yield current
+
+
+def iter_chunks(sentences: Iterable[str], max_length: int,
+                length: Callable[[str], int] = len, separator: str = " ",
+                split_long: bool = True) -> Iterator[str]:
+    """
+    Greedily pack consecutive sentences into chunks of at most max_length.
+
+    Args:
+        sentences (Iterable[str]): Sentences in order
+        max_length (int): Largest chunk length, separators included
+        length (Callable[[str], int]): Length of a text, see length_function
+        separator (str): Joins the sentences of a chunk
+        split_long (bool): Cut a sentence longer than max_length between words; when
+            False it becomes a chunk of its own. A single word longer than max_length
+            always does.
+
+    Returns:
+        Iterator[str]: Chunks in order
+    """
+    separator_length = length(separator)
+    current: List[str] = []
+    current_length = 0
+    for sentence in sentences:
+        sentence_length = length(sentence)
+        if sentence_length > max_length and split_long:
+            pieces = list(_split_words(sentence, max_length, length))
+        else:
+            pieces = [sentence]
+        for piece in pieces:
+            piece_length = sentence_length if len(pieces) == 1 else length(piece)
+            if current and current_length + separator_length + piece_length > max_length:
+                yield separator.join(current)
+                current = []
+                current_length = 0
+            current_length += piece_length + (separator_length if current else 0)
+            current.append(piece)
+    if current:
+        yield separator.join(current)
+
+
+def chunk_text(source: TextSource, max_length: int,
+               length: Union[str, Callable[[str], int]] = "chars") -> Iterator[str]:
+    """
+    Stream a text source as chunks of whole sentences.
+
+    Args:
+        source (TextSource): Text, file-like object or iterable of text pieces
+        max_length (int): Largest chunk length
+        length (Union[str, Callable[[str], int]]): Length function, see length_function
+
+    Returns:
+        Iterator[str]: Chunks in order
+    """
+    return iter_chunks(iter_sentences(source), max_length, length_function(length))
+
+
+def source_length(source: TextSource) -> Optional[int]:
+    """
+    Size of a text source without reading it, when it can be known.
+
+    Args:
+        source (TextSource): Text, file-like object or iterable of text pieces
+
+    Returns:
+        Optional[int]: Characters of a string, bytes of a regular file from its current
+            position, or None
+    """
+    if isinstance(source, str):
+        return len(source)
+    try:
+        position = source.tell()
+        end = source.seek(0, 2)
+        source.seek(position)
+        return end - position
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class SlidingContext:
+    """
+    The most recent text of a conversation within a token budget.
+
+    Text is added in parts (the responses of the rounds). The oldest parts are dropped
+    once the budget is exceeded; a single part larger than the budget keeps its end,
+    starting at a speaker tag when there is one.
+    """
+
+    def __init__(self, max_tokens: int, count_tokens: Optional[Callable[[str], int]] = None):
+        """
+        Args:
+            max_tokens (int): Token budget of the context
+            count_tokens (Optional[Callable[[str], int]]): Token count of a text;
+                defaults to a 4 characters per token estimate
+        """
+        self.max_tokens = max_tokens
+        self.count_tokens = count_tokens or TokenCounter()
+        self._parts: Deque[str] = deque()
+        self._tokens: Deque[int] = deque()
+
+    @property
+    def tokens(self) -> int:
+        return sum(self._tokens)
+
+    def add(self, text: str) -> None:
+        """Append text, dropping the oldest text beyond the budget."""
+        tokens = self.count_tokens(text)
+        if tokens > self.max_tokens:
+            # Keep the end, proportionally sized, from the first speaker tag on
+            text = text[len(text) - len(text) * self.max_tokens // tokens:]
+            turn = _TURN_START.search(text)
+            if turn is not None:
+                text = text[turn.start():]
+            tokens = self.count_tokens(text)
+        self._parts.append(text)
+        self._tokens.append(tokens)
+        while len(self._parts) > 1 and sum(self._tokens) > self.max_tokens:
+            self._parts.popleft()
+            self._tokens.popleft()
+
+    def reset(self, text: str = "") -> None:
+        """Replace the context with text."""
+        self._parts.clear()
+        self._tokens.clear()
+        if text:
+            self.add(text)
+
+    def __str__(self) -> str:
+        return "".join(self._parts)
@@ -0,0 +1,267 @@
+"""
+Request Hedging Module
+
+This module bounds the tail latency of TTS requests. Every call gets a deadline, and
+once a call has been running longer than the provider's recent p95 latency a duplicate
+request is issued; whichever finishes first wins. Duplicates are capped at a fraction
+of all calls so hedging cannot double the load on a provider that is slow across the
+board, and every attempt runs within the provider's rate limits.
+"""
+
+import bisect
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from .ratelimit import ProviderLimiter, provider_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when no attempt of a call finished before its deadline."""
+
+
+class LatencyHistogram:
+    """Latencies of the most recent calls to one provider."""
+
+    def __init__(self, window: int = 200):
+        """
+        Initialize the LatencyHistogram.
+
+        Args:
+            window (int): Number of recent latencies kept
+        """
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Latency below which a fraction q of recent calls finished.
+
+        Args:
+            q (float): Quantile in [0, 1]
+
+        Returns:
+            Optional[float]: Latency in seconds, or None without samples
+        """
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HedgedExecutor:
+    """Runs provider calls with a deadline and a budgeted duplicate for slow calls."""
+
+    def __init__(
+        self,
+        name: str,
+        enabled: bool = True,
+        timeout: Optional[float] = 120.0,
+        quantile: float = 0.95,
+        min_samples: int = 20,
+        max_extra_ratio: float = 0.1,
+        max_workers: int = 16,
+        limiter: Optional[ProviderLimiter] = None,
+    ):
+        """
+        Initialize the HedgedExecutor.
+
+        Args:
+            name (str): Provider name, for logs
+            enabled (bool): Issue duplicate requests. Deadlines apply either way.
+            timeout (Optional[float]): Seconds before a call fails with DeadlineExceeded
+            quantile (float): Latency quantile after which a duplicate is issued
+            min_samples (int): Calls observed before hedging starts
+            max_extra_ratio (float): Most duplicate requests, as a fraction of all calls
+            max_workers (int): Threads running attempts
+            limiter (Optional[ProviderLimiter]): Provider limiter every attempt runs
+                within, duplicates and abandoned attempts included
+        """
+        self.name = name
+        self.enabled = enabled
+        self.timeout = timeout
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.max_extra_ratio = max_extra_ratio
+        self.limiter = limiter
+        self.latencies = LatencyHistogram()
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"hedge-{name}")
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before a duplicate request, or None while hedging is off."""
+        if not self.enabled or len(self.latencies) < self.min_samples:
+            return None
+        return self.latencies.percentile(self.quantile)
+
+    def _reserve_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.max_extra_ratio * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Call fn with a deadline, hedging it once it runs longer than the latency quantile.
+
+        Each attempt takes its own slot of the limiter and holds it until it ends, so a
+        duplicate counts against the provider's limits like any request. The deadline and
+        the hedge delay run from when the first attempt starts, not while it waits for a
+        worker thread or a slot. The losing attempt is not cancelled (threads cannot be);
+        providers also pass the deadline to their client so an abandoned request ends on
+        its own.
+
+        Args:
+            fn (Callable[..., T]): Provider call; must be safe to run twice
+            *args (Any): Positional arguments for fn
+            **kwargs (Any): Keyword arguments for fn
+
+        Returns:
+            T: Result of the first attempt to succeed
+
+        Raises:
+            DeadlineExceeded: If no attempt finished before the deadline
+            Exception: The error of the last attempt when every attempt failed
+        """
+        with self._lock:
+            self.calls += 1
+        starts: List[float] = []
+        started = threading.Event()
+
+        def timed() -> T:
+            starts.append(time.monotonic())
+            started.set()
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            self.latencies.record(time.perf_counter() - start)
+            return result
+
+        attempt = (lambda: self.limiter.call(timed)) if self.limiter else timed
+        primary = self._pool.submit(attempt)
+        pending = {primary}
+        # An attempt that fails before it starts still ends the wait
+        primary.add_done_callback(lambda _: started.set())
+        started.wait()
+        start = starts[0] if starts else time.monotonic()
+        deadline = start + self.timeout if self.timeout else None
+
+        delay = self.hedge_delay()
+        if delay is not None:
+            if deadline is not None:
+                delay = min(delay, deadline - start)
+            done, _ = wait(pending, timeout=max(0.0, start + delay - time.monotonic()))
+            if not done and self._reserve_hedge():
+                logger.debug(f"{self.name} call exceeded p{int(self.quantile * 100)} ({delay:.2f}s); hedging")
+                pending.add(self._pool.submit(attempt))
+
+        error = None
+        while pending:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(f"{self.name} call did not finish within {self.timeout}s")
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+
+_executors: Dict[str, HedgedExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_hedger(
+    name: str, hedging: Optional[Dict[str, Any]] = None, limiter: Optional[ProviderLimiter] = None
+) -> HedgedExecutor:
+    """
+    Get the process-wide hedged executor of a provider, creating it on first use.
+
+    Settings come from the `hedging` conversation config section, resolved like
+    `rate_limits`. The first configuration seen for a provider wins.
+
+    Args:
+        name (str): "tts:<provider>"
+        hedging (Optional[Dict[str, Any]]): `hedging` config section
+        limiter (Optional[ProviderLimiter]): The provider's limiter, for every attempt
+
+    Returns:
+        HedgedExecutor: Shared executor
+    """
+    with _executors_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = _executors[name] = HedgedExecutor(name, limiter=limiter, **provider_settings(hedging, name))
+        return executor
+
+
+class LatencyStub:
+    """Local stand-in for a provider whose calls are usually fast and sometimes stall."""
+
+    def __init__(self, latency: float = 0.02, slow_latency: float = 0.5, slow_fraction: float = 0.02, seed: int = 42):
+        self.latency = latency
+        self.slow_latency = slow_latency
+        self.slow_fraction = slow_fraction
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, payload: str) -> bytes:
+        with self._lock:
+            self.requests += 1
+            slow = self._random.random() < self.slow_fraction
+        time.sleep(self.slow_latency if slow else self.latency)
+        return payload.encode("utf-8")
+
+
+def main(calls: int = 200) -> None:
+    """
+    Compare latency percentiles against a stub with injected stalls, with and without hedging.
+
+    Args:
+        calls (int): Calls per run
+    """
+    for enabled in (False, True):
+        stub = LatencyStub()
+        executor = HedgedExecutor("stub", enabled=enabled, timeout=5.0)
+        observed = []
+        start = time.perf_counter()
+        for i in range(calls):
+            call_start = time.perf_counter()
+            executor.call(stub, f"chunk {i}")
+            bisect.insort(observed, time.perf_counter() - call_start)
+        elapsed = time.perf_counter() - start
+        p50 = observed[len(observed) // 2]
+        p99 = observed[int(len(observed) * 0.99)]
+        print(
+            f"hedging {'on ' if enabled else 'off'}: total {elapsed:.2f}s, p50 {p50 * 1000:.0f}ms, "
+            f"p99 {p99 * 1000:.0f}ms, max {observed[-1] * 1000:.0f}ms, "
+            f"{stub.requests - calls} extra requests ({executor.hedge_wins} hedges won)"
+        )
+
+
+if __name__ == "__main__":
+    main()
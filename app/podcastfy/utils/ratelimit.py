@@ -0,0 +1,464 @@
+"""
+Rate Limiting Module
+
+This module keeps TTS and LLM calls within provider quotas once requests run in
+parallel. Each provider gets one process-wide ProviderLimiter that combines a token
+bucket (requests per minute), an AIMD concurrency limit that halves on a 429 /
+RESOURCE_EXHAUSTED response and grows back slowly on success, and a backoff window
+shared by every thread, so one throttled request pauses all callers of that provider
+instead of each thread hammering the quota on its own retry schedule.
+"""
+
+import logging
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_RATE_LIMIT_STATUS = {429, "429", "RESOURCE_EXHAUSTED", "TOO_MANY_REQUESTS"}
+_RATE_LIMIT_CLASSES = {"ResourceExhausted", "RateLimitError", "TooManyRequests", "RateLimitExceeded"}
+# Only for errors without a status: a bare substring would match "14290 characters"
+_RATE_LIMIT_MESSAGE = re.compile(r"\b(?:429|too many requests|resource[_ ]exhausted)\b", re.IGNORECASE)
+
+
+def _exception_chain(exc: BaseException):
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc = exc.__cause__ or exc.__context__
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    """
+    Recognize quota errors from Google (gRPC and REST), OpenAI, ElevenLabs and LiteLLM.
+
+    Providers wrap their client errors in RuntimeError, so the cause chain is checked too.
+    Exception types and status codes decide first; the message is only read when no
+    error of the chain carries an HTTP status.
+
+    Args:
+        exc (BaseException): Raised exception
+
+    Returns:
+        bool: True if the exception reports a 429 / RESOURCE_EXHAUSTED response
+    """
+    chain = list(_exception_chain(exc))
+    has_status = False
+    for error in chain:
+        if type(error).__name__ in _RATE_LIMIT_CLASSES:
+            return True
+        for attr in ("status_code", "code", "status"):
+            value = getattr(error, attr, None)
+            value = value() if callable(value) else value
+            # gRPC status codes are enums; compare by name
+            value = getattr(value, "name", value)
+            if value in _RATE_LIMIT_STATUS:
+                return True
+            if isinstance(value, int) and 100 <= value < 600:
+                has_status = True
+    if has_status:
+        return False
+    return any(_RATE_LIMIT_MESSAGE.search(str(error)) for error in chain)
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    """Server-suggested delay in seconds from a Retry-After header, if any."""
+    for error in _exception_chain(exc):
+        value = getattr(error, "retry_after", None)
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if value is None and headers is not None:
+            value = headers.get("retry-after")
+        try:
+            if value is not None:
+                return float(value)
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at a fixed rate."""
+
+    def __init__(self, requests_per_minute: Optional[float] = None, burst: Optional[float] = None):
+        """
+        Initialize the TokenBucket.
+
+        Args:
+            requests_per_minute (Optional[float]): Refill rate. None disables the bucket.
+            burst (Optional[float]): Bucket capacity. Defaults to one second of requests.
+        """
+        self.rate = requests_per_minute / 60.0 if requests_per_minute else None
+        self.capacity = burst or max(1.0, self.rate or 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> None:
+        """Take one token, blocking until one is available."""
+        if self.rate is None:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def drain(self) -> None:
+        """Empty the bucket so no burst follows a throttled response."""
+        if self.rate is None:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0)
+
+
+class AdaptiveConcurrency:
+    """
+    Additive-increase / multiplicative-decrease limit on requests in flight.
+
+    The limit grows by `increase` per window of successful requests and is multiplied by
+    `decrease` on a throttled one. Throttles of requests that started before the last
+    decrease belong to the same congestion event and do not decrease the limit again.
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 8,
+                 increase: float = 1.0, decrease: float = 0.5):
+        """
+        Initialize the AdaptiveConcurrency limit.
+
+        Args:
+            initial (int): Starting limit
+            minimum (int): Lowest limit
+            maximum (int): Highest limit
+            increase (float): Additive increase per window of successes
+            decrease (float): Multiplicative decrease factor on a throttle
+        """
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.in_flight = 0
+        self._epoch = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> int:
+        """
+        Wait for a free slot.
+
+        Returns:
+            int: Token to pass to release()
+        """
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+            return self._epoch
+
+    def release(self, token: int, outcome: str = "ok") -> None:
+        """
+        Free a slot and adapt the limit.
+
+        Args:
+            token (int): Value returned by acquire()
+            outcome (str): "ok", "throttled" or "error" (no adaptation)
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == "throttled":
+                if token == self._epoch:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._epoch += 1
+                    logger.info(f"Throttled: concurrency limit lowered to {int(self.limit)}")
+            elif outcome == "ok":
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            self._cond.notify_all()
+
+
+class ProviderLimiter:
+    """Rate, concurrency and shared backoff for every call to one provider."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_concurrency: int = 8,
+        initial_concurrency: Optional[int] = None,
+        max_retries: int = 5,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        """
+        Initialize the ProviderLimiter.
+
+        Args:
+            name (str): Provider name, for logs
+            requests_per_minute (Optional[float]): Request quota. None means no rate limit.
+            burst (Optional[float]): Requests allowed at once after an idle period
+            max_concurrency (int): Most requests in flight
+            initial_concurrency (Optional[int]): Starting concurrency. Defaults to half the maximum.
+            max_retries (int): Retries of a throttled call before the error is raised
+            base_backoff (float): First backoff delay in seconds; doubles on each retry
+            max_backoff (float): Longest backoff delay in seconds
+        """
+        self.name = name
+        self.bucket = TokenBucket(requests_per_minute, burst)
+        self.concurrency = AdaptiveConcurrency(
+            initial=initial_concurrency or max(1, max_concurrency // 2), maximum=max_concurrency
+        )
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.calls = 0
+        self.throttles = 0
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def _wait_backoff(self) -> None:
+        while True:
+            with self._lock:
+                delay = self._resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def _backoff(self, attempt: int, exc: BaseException) -> None:
+        delay = _retry_after(exc)
+        if delay is None:
+            delay = min(self.max_backoff, self.base_backoff * 2 ** (attempt - 1))
+            delay *= random.uniform(0.5, 1.0)
+        with self._lock:
+            self.throttles += 1
+            # Pause every caller, not only the one that was throttled
+            self._resume_at = max(self._resume_at, time.monotonic() + delay)
+        self.bucket.drain()
+        logger.warning(f"{self.name} rate limited (attempt {attempt}); backing off {delay:.2f}s")
+
+    def acquire(self) -> int:
+        """
+        Wait out a shared backoff, then take a concurrency slot and a rate token.
+
+        Returns:
+            int: Token to pass to release() once the request is done
+        """
+        self._wait_backoff()
+        token = self.concurrency.acquire()
+        self.bucket.acquire()
+        with self._lock:
+            self.calls += 1
+        return token
+
+    def release(self, token: int, error: Optional[BaseException] = None, attempt: int = 1) -> bool:
+        """
+        Free a slot taken by acquire() and report how the request ended.
+
+        Args:
+            token (int): Value returned by acquire()
+            error (Optional[BaseException]): What the request raised, None on success
+            attempt (int): Throttled attempts of the request so far, for the backoff delay
+
+        Returns:
+            bool: True if the request was throttled; every caller then backs off
+        """
+        throttled = isinstance(error, Exception) and is_rate_limit_error(error)
+        self.concurrency.release(token, "ok" if error is None else "throttled" if throttled else "error")
+        if throttled:
+            self._backoff(attempt, error)
+        return throttled
+
+    def hold(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> Tuple[T, int]:
+        """
+        Call fn like call(), but keep its slot when it succeeds.
+
+        For requests whose work goes on after fn returns, such as reading a stream that
+        fn opened: the slot is only freed by release(), so the requests in flight stay
+        bounded and the outcome of the whole request adapts the limit.
+
+        Args:
+            fn (Callable[..., T]): Provider call
+            *args (Any): Positional arguments for fn
+            **kwargs (Any): Keyword arguments for fn
+
+        Returns:
+            Tuple[T, int]: Result of fn, and the token to pass to release()
+
+        Raises:
+            Exception: Errors from fn other than rate limiting, or a rate limit error once
+                max_retries is exhausted
+        """
+        attempt = 0
+        while True:
+            token = self.acquire()
+            try:
+                return fn(*args, **kwargs), token
+            except BaseException as e:
+                if self.release(token, e, attempt + 1) and attempt < self.max_retries:
+                    attempt += 1
+                    continue
+                raise
+
+    def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Call fn within the provider limits, retrying throttled calls.
+
+        Args:
+            fn (Callable[..., T]): Provider call
+            *args (Any): Positional arguments for fn
+            **kwargs (Any): Keyword arguments for fn
+
+        Returns:
+            T: Result of fn
+
+        Raises:
+            Exception: Errors from fn other than rate limiting, or a rate limit error once
+                max_retries is exhausted
+        """
+        result, token = self.hold(fn, *args, **kwargs)
+        self.release(token)
+        return result
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def provider_settings(section: Optional[Dict[str, Any]], name: str) -> Dict[str, Any]:
+    """
+    Resolve the settings of a provider from a per-provider config section.
+
+    The section's `default` entry is overridden by `<kind>.<provider>` for a name of
+    the form "<kind>:<provider>" (e.g. "tts:gemini").
+
+    Args:
+        section (Optional[Dict[str, Any]]): Config section such as `rate_limits`
+        name (str): "<kind>:<provider>"
+
+    Returns:
+        Dict[str, Any]: Merged settings
+    """
+    section = section or {}
+    kind, _, provider = name.partition(":")
+    settings = dict(section.get("default") or {})
+    settings.update((section.get(kind) or {}).get(provider) or {})
+    return settings
+
+
+def get_limiter(name: str, rate_limits: Optional[Dict[str, Any]] = None) -> ProviderLimiter:
+    """
+    Get the process-wide limiter of a provider, creating it on first use.
+
+    Settings come from the `rate_limits` conversation config section (see
+    provider_settings). The first configuration seen for a provider wins.
+
+    Args:
+        name (str): Limiter name, "tts:<provider>" or "llm:<provider>"
+        rate_limits (Optional[Dict[str, Any]]): `rate_limits` config section
+
+    Returns:
+        ProviderLimiter: Shared limiter
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            settings = provider_settings(rate_limits, name)
+            limiter = _limiters[name] = ProviderLimiter(name, **settings)
+        return limiter
+
+
+class FakeQuotaError(Exception):
+    """429 raised by FakeQuotaProvider."""
+
+    status_code = 429
+
+
+class FakeQuotaProvider:
+    """
+    Local stand-in for a quota-limited API: a sliding one-second window of requests and
+    a cap on concurrent requests, each exceeded request answered with a 429.
+    """
+
+    def __init__(self, requests_per_second: int = 20, max_concurrency: int = 4, latency: float = 0.05):
+        self.requests_per_second = requests_per_second
+        self.max_concurrency = max_concurrency
+        self.latency = latency
+        self.in_flight = 0
+        self.recent = []
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, payload: str) -> bytes:
+        with self._lock:
+            now = time.monotonic()
+            self.recent = [t for t in self.recent if now - t < 1.0]
+            if len(self.recent) >= self.requests_per_second or self.in_flight >= self.max_concurrency:
+                self.rejected += 1
+                raise FakeQuotaError("429 RESOURCE_EXHAUSTED: quota exceeded")
+            self.recent.append(now)
+            self.in_flight += 1
+        try:
+            time.sleep(self.latency)
+            return payload.encode("utf-8")
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def _naive_call(provider: FakeQuotaProvider, payload: str, max_retries: int = 20) -> Optional[bytes]:
+    # Per-thread retry with a fixed delay: what each worker would do on its own
+    for _ in range(max_retries + 1):
+        try:
+            return provider(payload)
+        except FakeQuotaError:
+            time.sleep(0.05)
+    return None
+
+
+def main(requests: int = 200, workers: int = 16) -> None:
+    """
+    Compare throughput against a fake quota with and without the shared limiter.
+
+    Args:
+        requests (int): Requests per run
+        workers (int): Threads issuing requests
+    """
+    payloads = [f"chunk {i}" for i in range(requests)]
+    for label in ("per-thread retry", "shared limiter"):
+        provider = FakeQuotaProvider()
+        limiter = ProviderLimiter(
+            "fake", requests_per_minute=provider.requests_per_second * 60,
+            max_concurrency=workers, base_backoff=0.05, max_backoff=1.0, max_retries=20,
+        )
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            if label == "shared limiter":
+                results = list(pool.map(lambda p: limiter.call(provider, p), payloads))
+            else:
+                results = list(pool.map(lambda p: _naive_call(provider, p), payloads))
+        elapsed = time.perf_counter() - start
+        completed = sum(1 for r in results if r is not None)
+        print(
+            f"{label:>16}: {completed}/{requests} completed in {elapsed:.1f}s "
+            f"({completed / elapsed:.1f} req/s), {provider.rejected} requests rejected with 429"
+        )
+    print(f"Shared limiter settled at {int(limiter.concurrency.limit)} concurrent requests")
+
+
+if __name__ == "__main__":
+    main()
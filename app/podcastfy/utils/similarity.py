@@ -0,0 +1,82 @@
+"""
+Text Similarity Module
+
+This module provides cheap near-duplicate detection for passages of text using
+word shingles and bottom-k MinHash sketches. Sketches are small fixed-size sets,
+so comparing two passages costs the same regardless of their length.
+"""
+
+import hashlib
+import heapq
+import re
+from typing import FrozenSet, Iterable, List, Set
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase word tokens.
+
+    Args:
+        text (str): Input text
+
+    Returns:
+        List[str]: Lowercase word tokens
+    """
+    return _WORD.findall(text.lower())
+
+
+def shingles(text: str, size: int = 5) -> Set[str]:
+    """
+    Compute the set of word n-grams (shingles) of a text.
+
+    Args:
+        text (str): Input text
+        size (int): Number of words per shingle
+
+    Returns:
+        Set[str]: Shingles; texts shorter than `size` words yield a single shingle
+    """
+    words = tokenize(text)
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _hash(value: str) -> int:
+    # Stable across processes, unlike the built-in hash() of str
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def minhash_sketch(items: Iterable[str], k: int = 64) -> FrozenSet[int]:
+    """
+    Compute a bottom-k MinHash sketch: the k smallest hash values of the items.
+
+    Args:
+        items (Iterable[str]): Set elements, typically shingles
+        k (int): Sketch size
+
+    Returns:
+        FrozenSet[int]: Sketch of at most k hash values
+    """
+    return frozenset(heapq.nsmallest(k, {_hash(item) for item in items}))
+
+
+def sketch_similarity(a: FrozenSet[int], b: FrozenSet[int], k: int = 64) -> float:
+    """
+    Estimate the Jaccard similarity of two sets from their bottom-k sketches.
+
+    Args:
+        a (FrozenSet[int]): Sketch of the first set
+        b (FrozenSet[int]): Sketch of the second set
+        k (int): Sketch size used to build both sketches
+
+    Returns:
+        float: Estimated Jaccard similarity in [0, 1]
+    """
+    if not a or not b:
+        return 0.0
+    union_sketch = heapq.nsmallest(k, a | b)
+    shared = sum(1 for h in union_sketch if h in a and h in b)
+    return shared / len(union_sketch)
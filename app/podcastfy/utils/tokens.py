@@ -0,0 +1,24 @@
+"""
+Token Estimation Module
+
+Token counts for budgets and reports where the model's tokenizer is not at hand: input
+compaction, long-form chunks and context, and usage of providers that report none.
+"""
+
+import math
+
+
+class TokenCounter:
+    """Approximate token counter based on a characters-per-token ratio."""
+
+    def __init__(self, chars_per_token: float = 4.0):
+        """
+        Initialize the TokenCounter.
+
+        Args:
+            chars_per_token (float): Average characters per model token
+        """
+        self.chars_per_token = chars_per_token
+
+    def __call__(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
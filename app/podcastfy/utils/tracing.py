@@ -0,0 +1,205 @@
+"""
+Tracing Module
+
+This module provides lightweight spans for timing the stages of an episode: Gmail
+fetches, HTML cleaning, prompt composition, LLM and TTS calls, audio assembly and
+uploads. Every finished span is written as one JSON log line, recorded by the active
+TraceCollector (which builds the per-episode timing report) and, when the
+opentelemetry package is installed and enabled, mirrored as an OpenTelemetry span.
+
+Output is controlled by the PODCASTFY_TRACING environment variable: a comma-separated
+list of "json" (default) and "otel", or "off".
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from .tokens import TokenCounter
+
+logger = logging.getLogger("podcastfy.trace")
+
+T = TypeVar("T")
+
+_outputs = {o.strip() for o in os.getenv("PODCASTFY_TRACING", "json").lower().split(",")}
+
+try:
+    from opentelemetry import trace as _otel_trace
+except ImportError:  # optional dependency
+    _otel_trace = None
+
+_otel_tracer = _otel_trace.get_tracer("podcastfy") if _otel_trace and "otel" in _outputs else None
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("podcastfy_span", default=None)
+_current_collector: contextvars.ContextVar[Optional["TraceCollector"]] = contextvars.ContextVar(
+    "podcastfy_trace_collector", default=None
+)
+
+
+class Span:
+    """A timed operation with attributes such as token counts or byte sizes."""
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes)
+        self.status = "ok"
+        self.start = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self._otel_span = None
+
+    def set(self, **attributes: Any) -> None:
+        """Add attributes to the span, e.g. output sizes known once the call returns."""
+        self.attributes.update(attributes)
+        if self._otel_span is not None:
+            for key, value in attributes.items():
+                if isinstance(value, (str, bool, int, float)):
+                    self._otel_span.set_attribute(key, value)
+
+    def finish(self) -> None:
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": round(self.duration_ms or 0.0, 3),
+            "status": self.status,
+            **self.attributes,
+        }
+
+
+class TraceCollector:
+    """Collects the spans of one episode and summarizes them into a timing report."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Summarize the spans per stage.
+
+        Returns:
+            Dict[str, Any]: Wall time of the episode and, per span name, the call count,
+                total and max duration, errors and the sums of numeric attributes
+                (tokens, chars, bytes)
+        """
+        stages: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            stage = stages.setdefault(span.name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0})
+            stage["count"] += 1
+            stage["total_ms"] += span.duration_ms or 0.0
+            stage["max_ms"] = max(stage["max_ms"], span.duration_ms or 0.0)
+            stage["errors"] += span.status != "ok"
+            for key, value in span.attributes.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    stage[key] = stage.get(key, 0) + value
+        for stage in stages.values():
+            stage["total_ms"] = round(stage["total_ms"], 1)
+            stage["max_ms"] = round(stage["max_ms"], 1)
+        return {
+            "wall_ms": round((time.perf_counter() - self._start) * 1000, 1),
+            "stages": dict(sorted(stages.items(), key=lambda item: item[1]["total_ms"], reverse=True)),
+        }
+
+
+def _emit(span: Span) -> None:
+    collector = _current_collector.get()
+    if collector is not None:
+        collector.add(span)
+    if "json" in _outputs:
+        logger.info(json.dumps(span.to_dict(), default=str))
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Time a block of code as a span nested under the current one.
+
+    Args:
+        name (str): Stage name, e.g. "tts.synthesize"
+        **attributes (Any): Initial attributes
+
+    Yields:
+        Span: The span, to add attributes with set()
+    """
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    otel_context = (
+        _otel_tracer.start_as_current_span(name, attributes=attributes) if _otel_tracer else contextlib.nullcontext()
+    )
+    try:
+        with otel_context as otel_span:
+            current._otel_span = otel_span
+            try:
+                yield current
+            except BaseException as e:
+                current.status = "error"
+                current.attributes["error"] = type(e).__name__
+                raise
+    finally:
+        current.finish()
+        _current_span.reset(token)
+        _emit(current)
+
+
+@contextlib.contextmanager
+def collect() -> Iterator[TraceCollector]:
+    """
+    Collect every span finished in this context, e.g. for one episode.
+
+    Yields:
+        TraceCollector: Collector whose report() summarizes the spans
+    """
+    collector = TraceCollector()
+    token = _current_collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _current_collector.reset(token)
+
+
+def run_collected(collector: TraceCollector, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Call fn with its spans recorded by an existing collector, e.g. one stage of an
+    episode that moves between worker threads.
+
+    Args:
+        collector (TraceCollector): Collector of the episode
+        fn (Callable[..., T]): Function to call
+        *args (Any): Positional arguments of fn
+        **kwargs (Any): Keyword arguments of fn
+
+    Returns:
+        T: Result of fn
+    """
+    token = _current_collector.set(collector)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _current_collector.reset(token)
+
+
+def estimate_tokens(text: str, chars_per_token: int = 4) -> int:
+    """Rough token count for providers that do not report usage."""
+    return TokenCounter(chars_per_token)(text)
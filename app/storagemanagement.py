@@ -1,9 +1,44 @@
+import base64
+import hashlib
+import os
+
+import google_crc32c
 from google.cloud import storage
 
+from .podcastfy.utils.tracing import span
+
 PROJECT_ID = "quiknews-470023"
 
-def upload_blob(bucket_name, source_file_name, destination_blob_name):
-    """Uploads a file to the bucket."""
+def _local_checksums(source_file_name, chunk_size=1024 * 1024):
+    """Returns the base64 MD5 and CRC32C of a local file, in the format GCS reports them."""
+    md5 = hashlib.md5()
+    crc32c = google_crc32c.Checksum()
+    with open(source_file_name, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            md5.update(chunk)
+            crc32c.update(chunk)
+    return (
+        base64.b64encode(md5.digest()).decode("utf-8"),
+        base64.b64encode(crc32c.digest()).decode("utf-8"),
+    )
+
+def _is_unchanged(blob, source_file_name):
+    """Checks whether an existing blob already holds the same bytes as the local file."""
+    md5_hash, crc32c_hash = _local_checksums(source_file_name)
+    # Composite objects have no MD5, so fall back to CRC32C which GCS always reports
+    if blob.md5_hash:
+        return blob.md5_hash == md5_hash
+    return blob.crc32c == crc32c_hash
+
+def upload_blob(bucket_name, source_file_name, destination_blob_name, content_type=None, cache_control=None):
+    """
+    Uploads a file to the bucket, skipping the upload if the object is unchanged.
+    Without a content_type, GCS guesses it from the file name; without a cache_control,
+    public objects may be cached for an hour.
+
+    Returns:
+        bool: True if the file was uploaded, False if the existing object already matched.
+    """
     # The ID of your GCS bucket
     # bucket_name = "your-bucket-name"
     # The path to your file to upload
@@ -11,22 +46,52 @@ def upload_blob(bucket_name, source_file_name, destination_blob_name):
     # The ID of your GCS object
     # destination_blob_name = "storage-object-name"
 
+    with span("gcs.upload", blob=destination_blob_name, bytes=os.path.getsize(source_file_name)) as current:
+        uploaded = _upload_if_changed(
+            bucket_name, source_file_name, destination_blob_name, content_type, cache_control
+        )
+        current.set(uploaded=uploaded)
+    return uploaded
+
+def _upload_if_changed(bucket_name, source_file_name, destination_blob_name, content_type=None,
+                       cache_control=None):
     storage_client = storage.Client()
     bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(destination_blob_name)
 
-    # Optional: set a generation-match precondition to avoid potential race conditions
-    # and data corruptions. The request to upload is aborted if the object's
-    # generation number does not match your precondition. For a destination
-    # object that does not yet exist, set the if_generation_match precondition to 0.
-    # If the destination object already exists in your bucket, set instead a
-    # generation-match precondition using its generation number.
+    # get_blob fetches the object's metadata (checksums, generation) or None if it is missing
+    existing = bucket.get_blob(destination_blob_name)
+    if existing is not None and _is_unchanged(existing, source_file_name):
+        print(f"File {source_file_name} unchanged, skipping upload to {destination_blob_name}.")
+        return False
 
-    blob.upload_from_filename(source_file_name)
+    # Generation-match precondition: the upload is aborted if another writer replaced the
+    # object since we read its metadata. For an object that does not yet exist, 0 means
+    # "only create".
+    generation = existing.generation if existing is not None else 0
+    blob = bucket.blob(destination_blob_name)
+    blob.cache_control = cache_control
+    blob.upload_from_filename(source_file_name, content_type=content_type, if_generation_match=generation)
 
     print(
         f"File {source_file_name} uploaded to {destination_blob_name}."
     )
+    return True
+
+def download_blob(bucket_name, source_blob_name, destination_file_name):
+    """
+    Downloads a blob from the bucket.
+
+    Returns:
+        bool: True if the blob was downloaded, False if it does not exist.
+    """
+    storage_client = storage.Client()
+    bucket = storage_client.bucket(bucket_name)
+    blob = bucket.get_blob(source_blob_name)
+    if blob is None:
+        return False
+    blob.download_to_filename(destination_file_name)
+    print(f"Downloaded {source_blob_name} to {destination_file_name}.")
+    return True
 
 def generate_signed_url(bucket_name, blob_name, expiration=3600):
     storage_client = storage.Client()
@@ -36,4 +101,4 @@ def generate_signed_url(bucket_name, blob_name, expiration=3600):
     return url
 
 if __name__ == "__main__":
-    upload_blob("newsletter_content", "./tmp/podcast.mp3", "static/podcast.mp3")
\ No newline at end of file
+    upload_blob("newsletter_content", "./tmp/podcast.mp3", "static/podcast.mp3")
@@ -0,0 +1,166 @@
+import math
+import re
+from collections import Counter
+from email.utils import parseaddr
+
+from .podcastfy.utils.similarity import tokenize
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+# "Axios AM: Grid under strain" -> "Axios AM"
+_SUBJECT_TOPIC = re.compile(r'\s*[:|\u2013\u2014]\s*|\s+-\s+')
+
+# Stories shorter than this are headlines or links, too short to compare reliably
+MIN_STORY_WORDS = 25
+# Cosine similarity of TF-IDF vectors above which two stories are the same story
+SIMILARITY_THRESHOLD = 0.4
+# Terms per story used to find candidate pairs
+CANDIDATE_TERMS = 12
+
+def source_name(newsletter):
+    """Short human name of a newsletter: the From display name, else its subject."""
+    name, address = parseaddr(newsletter.get('from', ''))
+    return name or newsletter.get('subject') or address
+
+def issue_name(newsletter):
+    """Name of a newsletter from its subject, without the issue's topic."""
+    subject = newsletter.get('subject') or ''
+    return _SUBJECT_TOPIC.split(subject.strip(), maxsplit=1)[0] or source_name(newsletter)
+
+def source_names(newsletters):
+    """
+    Distinct names of the newsletters that covered a story, in order.
+
+    Newsletters from one sender share a From name (Axios AM, PM and Pro are all "Axios"),
+    so those are named by subject instead.
+
+    Args:
+        newsletters (list): Distinct newsletter dicts with 'subject' and 'from'.
+
+    Returns:
+        list: Names without repeats.
+    """
+    senders = Counter(source_name(item) for item in newsletters)
+    names = []
+    for item in newsletters:
+        name = source_name(item)
+        if senders[name] > 1:
+            name = issue_name(item)
+        if name not in names:
+            names.append(name)
+    return names
+
+def _tfidf_vectors(token_lists):
+    """L2-normalized sparse TF-IDF vectors (term -> weight) for each token list."""
+    df = Counter()
+    for tokens in token_lists:
+        df.update(set(tokens))
+    n = len(token_lists)
+    vectors = []
+    for tokens in token_lists:
+        tf = Counter(tokens)
+        vec = {t: c * math.log((1 + n) / (1 + df[t])) for t, c in tf.items()}
+        norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+        vectors.append({t: w / norm for t, w in vec.items() if w > 0})
+    return vectors
+
+def _cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(w * b.get(t, 0.0) for t, w in a.items())
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+def cluster_stories(stories):
+    """
+    Groups near-duplicate stories from different newsletters.
+
+    Args:
+        stories (list): (newsletter_index, text) tuples.
+
+    Returns:
+        list: Clusters of story indexes with more than one member.
+    """
+    token_lists = [tokenize(text) for _, text in stories]
+    eligible = [i for i, tokens in enumerate(token_lists) if len(tokens) >= MIN_STORY_WORDS]
+    vectors = _tfidf_vectors([token_lists[i] for i in eligible])
+
+    # Inverted index on each story's heaviest terms: only stories sharing one are compared
+    postings = {}
+    for pos, vec in enumerate(vectors):
+        for term in sorted(vec, key=vec.get, reverse=True)[:CANDIDATE_TERMS]:
+            postings.setdefault(term, []).append(pos)
+
+    compared = set()
+    similar = []
+    for members in postings.values():
+        for x in range(len(members)):
+            for y in range(x + 1, len(members)):
+                a, b = members[x], members[y]
+                # Only merge across newsletters; one newsletter never repeats a story
+                if (a, b) in compared or stories[eligible[a]][0] == stories[eligible[b]][0]:
+                    continue
+                compared.add((a, b))
+                similarity = _cosine(vectors[a], vectors[b])
+                if similarity >= SIMILARITY_THRESHOLD:
+                    similar.append((similarity, a, b))
+
+    # Closest pairs merge first. A cluster holds at most one story per newsletter, so a
+    # chain of similar pairs cannot join two stories of one issue through a third
+    parent = list(range(len(stories)))
+    issues = {i: {stories[i][0]} for i in eligible}
+    for _, a, b in sorted(similar, reverse=True):
+        root_a, root_b = _find(parent, eligible[a]), _find(parent, eligible[b])
+        if root_a == root_b or issues[root_a] & issues[root_b]:
+            continue
+        parent[root_b] = root_a
+        issues[root_a] |= issues.pop(root_b)
+
+    groups = {}
+    for i in eligible:
+        groups.setdefault(_find(parent, i), []).append(i)
+    return [sorted(g) for g in groups.values() if len(g) > 1]
+
+def merge_duplicate_stories(news):
+    """
+    Replaces stories covered by several newsletters with one consolidated block.
+
+    The longest telling is kept at the position of the first occurrence, annotated with
+    every newsletter that covered it when they have distinct names; the other tellings
+    are removed.
+
+    Args:
+        news (list): Newsletter dicts with 'subject', 'from' and 'body', as returned by
+            access.get_content.
+
+    Returns:
+        list: Newsletter dicts with merged bodies.
+    """
+    paragraphs = [[p for p in _PARAGRAPH_BREAK.split(item['body']) if p.strip()] for item in news]
+    stories = [(n, text) for n, paras in enumerate(paragraphs) for text in paras]
+    locations = [(n, k) for n, paras in enumerate(paragraphs) for k in range(len(paras))]
+
+    clusters = cluster_stories(stories)
+    for cluster in clusters:
+        longest = max(cluster, key=lambda i: len(stories[i][1]))
+        covering = sorted({stories[i][0] for i in cluster})
+        sources = source_names([news[n] for n in covering])
+        merged = stories[longest][1]
+        # A single name tells the listener nothing
+        if len(sources) > 1:
+            merged += f"\n(Covered by: {', '.join(sources)})"
+        first_n, first_k = locations[cluster[0]]
+        paragraphs[first_n][first_k] = merged
+        for i in cluster[1:]:
+            n, k = locations[i]
+            paragraphs[n][k] = None
+
+    if clusters:
+        print(f"Merged {sum(len(c) for c in clusters)} stories into {len(clusters)} consolidated stories")
+    return [
+        dict(item, body="\n\n".join(p for p in paras if p is not None))
+        for item, paras in zip(news, paragraphs)
+    ]
@@ -0,0 +1,190 @@
+"""
+Chunker benchmark: the shared sentence chunker against the three splitters it replaced.
+
+    python -m benchmarks.chunking --megabytes 5
+
+Three comparisons on synthetic news text with abbreviations, initials, decimals, URLs
+and quotes, whose true sentence boundaries are known:
+
+- segmentation: sentences recovered exactly by each segmenter
+- long-form input (characters): the former LongFormContentGenerator.chunk_content
+- multi-speaker requests (UTF-8 bytes): the former turn-level Transcript.chunks
+- turn pieces (characters): the former GeminiMultiTTS.split_turn_text
+
+For the chunkers, the number of chunks (LLM or TTS calls), the mean fill of the limit
+over every chunk but the last, the largest chunk and the throughput are reported.
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from app.podcastfy.transcript import Transcript, Turn
+from app.podcastfy.utils.chunking import chunk_text, split_sentences, utf8_length
+
+NAMES = ("Dr. Lee", "Mr. Alvarez", "Sen. Warren", "J. K. Rowling", "Prof. Okafor", "Gov. Newsom")
+SUBJECTS = ("the U.S. Senate", "Apple Inc.", "the Fed", "investors", "the U.K. government", "regulators")
+VERBS = ("said", "warned", "announced", "reported", "argued", "estimated")
+OBJECTS = ("growth of 3.5% this quarter", "a $1.2 billion deal", "prices up approx. 4 percent",
+           "details at https://www.axios.com/2025/07/28/markets.html", "delays in the café supply chain",
+           "risks, e.g. tariffs and rates", "a vote on Jan. 5 at 9 a.m. Eastern")
+
+
+def news_sentences(count: int, seed: int = 0) -> List[str]:
+    """Sentences of news prose, each ending with its own punctuation."""
+    rng = random.Random(seed)
+    sentences = []
+    for _ in range(count):
+        sentence = f"{rng.choice(NAMES + SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)}"
+        if rng.random() < 0.3:
+            sentence += f" while {rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)}"
+        ending = rng.choice(".....?!")
+        sentence = sentence[0].upper() + sentence[1:] + ending
+        if rng.random() < 0.1:
+            sentence = f'"{sentence}"'
+        sentences.append(sentence)
+    return sentences
+
+
+def legacy_chunk_content(input_content: str, chunk_size: int) -> List[str]:
+    """The former LongFormContentGenerator.chunk_content."""
+    sentences = input_content.split('. ')
+    chunks = []
+    current_chunk: List[str] = []
+    current_length = 0
+    for sentence in sentences:
+        sentence_length = len(sentence)
+        if current_length + sentence_length > chunk_size and current_chunk:
+            chunks.append('. '.join(current_chunk) + '.')
+            current_chunk = []
+            current_length = 0
+        current_chunk.append(sentence)
+        current_length += sentence_length
+    if current_chunk:
+        chunks.append('. '.join(current_chunk) + '.')
+    return chunks
+
+
+def legacy_split_turn_text(text: str, max_chars: int = 500) -> List[str]:
+    """The former GeminiMultiTTS.split_turn_text."""
+    if len(text) <= max_chars:
+        return [text]
+    chunks = []
+    sentences = [s for s in re.split(r'([.!?]+(?:\s+|$))', text) if s]
+    current_chunk = ""
+    for i in range(0, len(sentences), 2):
+        complete_sentence = sentences[i] + (sentences[i + 1] if i + 1 < len(sentences) else "")
+        if len(current_chunk) + len(complete_sentence) > max_chars:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+                current_chunk = complete_sentence
+            else:
+                temp_chunk = ""
+                for word in complete_sentence.split():
+                    if len(temp_chunk) + len(word) + 1 > max_chars:
+                        chunks.append(temp_chunk.strip())
+                        temp_chunk = word
+                    else:
+                        temp_chunk += " " + word if temp_chunk else word
+                current_chunk = temp_chunk
+        else:
+            current_chunk += complete_sentence
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+    return chunks
+
+
+def legacy_transcript_chunks(transcript: Transcript, max_bytes: int) -> List[Transcript]:
+    """The former Transcript.chunks: whole turns only."""
+    chunks: List[Transcript] = []
+    current: List[Turn] = []
+    size = 0
+    for turn in transcript.turns:
+        turn_size = len(turn.to_markup().encode("utf-8"))
+        if current and size + turn_size > max_bytes:
+            chunks.append(Transcript(current))
+            current, size = [], 0
+        current.append(turn)
+        size += turn_size
+    if current:
+        chunks.append(Transcript(current))
+    return chunks
+
+
+def sentence_accuracy(truth: Sequence[str], found: Sequence[str]) -> float:
+    """Share of the true sentences a segmenter recovered exactly."""
+    found_set = {" ".join(s.split()) for s in found}
+    return sum(1 for s in truth if " ".join(s.split()) in found_set) / len(truth)
+
+
+def report(name: str, chunks: Sequence[str], limit: int, length: Callable[[str], int], seconds: float,
+           megabytes: float) -> None:
+    sizes = [length(chunk) for chunk in chunks]
+    full = sizes[:-1] or sizes
+    print(f"  {name:8s} {len(chunks):8d} chunks  fill {sum(full) / len(full) / limit:6.1%}  "
+          f"largest {max(sizes) / limit:6.1%} of limit  {megabytes / seconds:7.1f} MB/s")
+
+
+def timed(run: Callable[[], List]) -> Tuple[List, float]:
+    start = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - start
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=float, default=5.0, help="size of the long-form input")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="long-form chunk size in characters")
+    parser.add_argument("--max-bytes", type=int, default=1300, help="multi-speaker request size in bytes")
+    parser.add_argument("--max-chars", type=int, default=500, help="turn piece size in characters")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    truth = news_sentences(5000, args.seed)
+    text = " ".join(truth)
+    print("segmentation, sentences recovered exactly")
+    print(f"  {'new':8s} {sentence_accuracy(truth, split_sentences(text)):6.1%}")
+    print(f"  {'. ':8s} {sentence_accuracy(truth, [s + '.' for s in text.split('. ')]):6.1%}")
+    regex_sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+', text)]
+    print(f"  {'[.!?]+':8s} {sentence_accuracy(truth, regex_sentences):6.1%}")
+
+    sentences = news_sentences(int(args.megabytes * 1024 * 1024 / 80) + 1, args.seed + 1)
+    long_text = " ".join(sentences)
+    megabytes = len(long_text) / 1024 / 1024
+    print(f"\nlong-form input, {megabytes:.1f} MB in chunks of {args.chunk_size} characters")
+    chunks, seconds = timed(lambda: legacy_chunk_content(long_text, args.chunk_size))
+    report("legacy", chunks, args.chunk_size, len, seconds, megabytes)
+    chunks, seconds = timed(lambda: list(chunk_text(long_text, args.chunk_size)))
+    report("new", chunks, args.chunk_size, len, seconds, megabytes)
+
+    rng = random.Random(args.seed)
+    turns, position = [], 0
+    while position < len(sentences) // 20:
+        count = rng.choice((1, 2, 3, 5, 8, 13))
+        turns.append(Turn(len(turns) % 2 + 1, " ".join(sentences[position:position + count])))
+        position += count
+    transcript = Transcript(turns)
+    markup_megabytes = utf8_length(transcript.to_markup(separator="")) / 1024 / 1024
+    print(f"\nmulti-speaker requests, {len(turns)} turns in chunks of {args.max_bytes} bytes")
+    chunks, seconds = timed(lambda: legacy_transcript_chunks(transcript, args.max_bytes))
+    report("legacy", [c.to_markup(separator="") for c in chunks], args.max_bytes, utf8_length, seconds,
+           markup_megabytes)
+    chunks, seconds = timed(lambda: transcript.chunks(args.max_bytes))
+    report("new", [c.to_markup(separator="") for c in chunks], args.max_bytes, utf8_length, seconds,
+           markup_megabytes)
+
+    long_turns = [turn.text for turn in turns if len(turn.text) > args.max_chars]
+    turn_megabytes = sum(len(t) for t in long_turns) / 1024 / 1024
+    print(f"\nturn pieces, {len(long_turns)} turns longer than {args.max_chars} characters")
+    pieces, seconds = timed(lambda: [p for t in long_turns for p in legacy_split_turn_text(t, args.max_chars)])
+    report("legacy", pieces, args.max_chars, len, seconds, turn_megabytes)
+    pieces, seconds = timed(lambda: [p for t in long_turns for p in chunk_text(t, args.max_chars)])
+    report("new", pieces, args.max_chars, len, seconds, turn_megabytes)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
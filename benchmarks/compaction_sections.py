@@ -0,0 +1,75 @@
+"""
+Compaction section check on the real digest input.
+
+Builds the newsletter content with access.create_podcast_content over the recorded
+Gmail corpus, as the digest does, and checks that ContentCompactor sees every
+"NEWSLETTER N" header as its own pinned paragraph that restarts the section ranking,
+and that a tight budget still keeps every header and every newsletter's lead: its first
+paragraph of LEAD_TOKENS or more (titles and labels before it rank low by design).
+
+    python -m benchmarks.compaction_sections --max-input-tokens 600
+
+Exits non-zero when a header is missed or a header or lead is dropped.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+from typing import List, Optional
+
+from app import access, boilerplate
+from app.podcastfy.compaction import ContentCompactor
+
+from . import fakes
+
+LEAD_TOKENS = 25
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-input-tokens", type=int, default=600, help="compaction budget")
+    parser.add_argument("--data-dir", default=fakes.DATA_DIR, help="fixture directory")
+    args = parser.parse_args(argv)
+
+    latency = fakes.Latency.load(os.path.join(args.data_dir, "backends.yaml"), time_scale=0)
+    service = fakes.FakeGmailService(fakes.load_newsletters(args.data_dir), latency)
+    # The digest's progress prints are not part of the check
+    with contextlib.redirect_stdout(io.StringIO()):
+        content = access.create_podcast_content(service, boilerplate.BoilerplateIndex())
+    newsletters = content.count("NEWSLETTER ")
+
+    compactor = ContentCompactor(max_input_tokens=args.max_input_tokens)
+    paragraphs = compactor.split_paragraphs(content)
+    headers = [p for p in paragraphs if p.pinned]
+    leads = []
+    for header in headers:
+        section = []
+        for p in paragraphs[header.index + 1:]:
+            if p.pinned:
+                break
+            section.append(p)
+        leads += [p.text for p in section if p.tokens >= LEAD_TOKENS][:1]
+    compacted = compactor.compact(content)
+
+    failures = []
+    if len(headers) != newsletters:
+        failures.append(f"{len(headers)} pinned headers for {newsletters} newsletters")
+    failures += [f"header inside a paragraph: {p.text[:60]!r}" for p in paragraphs
+                 if not p.pinned and "NEWSLETTER " in p.text]
+    failures += [f"lead of a newsletter ranked {paragraphs[p.index + 1].section_rank}"
+                 for p in headers if paragraphs[p.index + 1].section_rank != 0]
+    failures += [f"header dropped: {p.text}" for p in headers if p.text not in compacted.split("\n")]
+    failures += [f"lead dropped: {lead[:60]!r}" for lead in leads if lead[:40] not in compacted]
+
+    print(f"{newsletters} newsletters, {len(paragraphs)} paragraphs, "
+          f"{compactor.count_tokens(content)} -> {compactor.count_tokens(compacted)} tokens")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("ok" if not failures else f"{len(failures)} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Concurrent render check: several episodes assembled at once in one process.
+
+Every episode gets a transcript of a different length and must come out with exactly its
+own audio: a render that picked up another episode's chunks (shared temporary files,
+shared buffers) ends up with the wrong duration. Both assembly paths are covered:
+TextToSpeech.convert_to_speech over the recorded providers, and GeminiMultiTTS.merge_audio
+called directly from several threads.
+
+    python -m benchmarks.concurrent_render --episodes 8 --tts-model geminimulti
+
+Exits non-zero when an episode does not match or a render left files in the working
+directory.
+"""
+
+import argparse
+import concurrent.futures
+import glob
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.podcastfy.audio_encoding import decode_audio
+from app.podcastfy.transcript import Transcript
+
+from . import fakes
+
+# Decoded MP3 frames round every chunk to whole frames
+TOLERANCE_MS_PER_CHUNK = 60
+
+
+def episode_transcripts(transcripts: List[str], episodes: int) -> List[Transcript]:
+    """A transcript of a different number of turns for every episode."""
+    turns = [turn for text in transcripts for turn in Transcript.parse(text)]
+    step = max(1, (len(turns) - 2) // episodes)
+    return [Transcript(turns[: 2 + step * (i + 1)]) for i in range(episodes)]
+
+
+def render(tts: Any, transcript: Transcript, work_dir: str, index: int) -> Tuple[str, float]:
+    """Render one episode; returns its path and wall time."""
+    output_file = os.path.join(work_dir, f"episode{index}", f"podcast.{tts.output_profile.extension}")
+    start = time.perf_counter()
+    tts.convert_to_speech(transcript, output_file)
+    return output_file, time.perf_counter() - start
+
+
+def expected_ms(tts: Any, transcript: Transcript) -> Tuple[float, int]:
+    """Duration of the recorded audio of a transcript, and the number of chunks it is made of."""
+    if tts.provider.multi_speaker:
+        pieces = [sum(len(turn.text) for turn in chunk)
+                  for chunk in tts.provider.prepare_chunks(transcript, tts.ending_message)]
+    else:
+        pairs = tts.provider.split_qa(transcript, tts.ending_message, tts.provider.get_supported_tags())
+        pieces = [len(text) for pair in pairs for text in pair]
+    seconds = [fakes.silent_seconds(chars / fakes.CHARS_PER_SECOND) for chars in pieces]
+    return sum(seconds) * 1000, len(pieces)
+
+
+def check_merge_audio(episodes: int) -> List[str]:
+    """Merge chunk sets of different lengths with GeminiMultiTTS.merge_audio from several threads."""
+    from app.podcastfy.tts.providers.geminimulti import GeminiMultiTTS
+
+    # merge_audio needs no API client
+    provider = GeminiMultiTTS.__new__(GeminiMultiTTS)
+    chunk_sets = [[fakes.silent_mp3(1.0 + 0.5 * i)] * (2 + i) for i in range(episodes)]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=episodes) as pool:
+        merged = list(pool.map(provider.merge_audio, chunk_sets))
+
+    failures = []
+    for i, (chunks, audio) in enumerate(zip(chunk_sets, merged)):
+        expected = sum(len(decode_audio(chunk, "mp3")) for chunk in chunks)
+        actual = len(decode_audio(audio, "mp3"))
+        if abs(actual - expected) > TOLERANCE_MS_PER_CHUNK * len(chunks):
+            failures.append(f"merge_audio set {i}: {actual} ms, expected {expected:.0f} ms")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--episodes", type=int, default=6, help="episodes rendered at once")
+    parser.add_argument("--tts-model", default="geminimulti", choices=("gemini", "geminimulti", "openai", "elevenlabs"),
+                        help="recorded TTS provider")
+    parser.add_argument("--time-scale", type=float, default=0.0,
+                        help="multiplier for the recorded latencies; 0 renders as fast as possible")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the latency samples")
+    parser.add_argument("--data-dir", default=fakes.DATA_DIR, help="fixture directory")
+    args = parser.parse_args(argv)
+
+    from app.podcastfy.text_to_speech import TextToSpeech
+
+    latency = fakes.Latency.load(os.path.join(args.data_dir, "backends.yaml"),
+                                 time_scale=args.time_scale, seed=args.seed)
+    transcripts = episode_transcripts(fakes.load_transcripts(args.data_dir), args.episodes)
+    before = set(glob.glob("*"))
+
+    failures: List[str] = []
+    with tempfile.TemporaryDirectory() as work_dir, \
+            fakes.installed(latency, [], llm=False, tts=True):
+        # Exact chunk durations: no trimming, levelling or HLS output
+        config: Dict[str, Any] = {"audio_postprocess": {"enabled": False}, "text_to_speech": {"hls": {"enabled": False}}}
+        tts = TextToSpeech(model=args.tts_model, api_key="recorded", conversation_config=config)
+
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=args.episodes) as pool:
+            futures = [pool.submit(render, tts, transcript, work_dir, i) for i, transcript in enumerate(transcripts)]
+            results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+
+        for i, ((path, seconds), transcript) in enumerate(zip(results, transcripts)):
+            expected, chunks = expected_ms(tts, transcript)
+            actual = len(decode_audio(path))
+            ok = abs(actual - expected) <= TOLERANCE_MS_PER_CHUNK * chunks
+            print(f"episode {i}: {len(transcript):3d} turns, {chunks:3d} chunks, {actual / 1000:7.1f} s "
+                  f"(expected {expected / 1000:7.1f} s), rendered in {seconds:.2f} s {'ok' if ok else 'MISMATCH'}")
+            if not ok:
+                failures.append(f"episode {i}: {actual} ms, expected {expected:.0f} ms")
+
+    failures += check_merge_audio(args.episodes)
+    leftovers = sorted(set(glob.glob("*")) - before)
+    if leftovers:
+        failures.append(f"files left in {os.getcwd()}: {', '.join(leftovers)}")
+
+    print(f"{args.episodes} episodes in {elapsed:.2f} s, merge_audio from {args.episodes} threads")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("ok" if not failures else f"{len(failures)} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,353 @@
+"""
+Recorded backends for the digest benchmark.
+
+Every external service the digest touches (Gmail, the Gemini chat model and its prompt
+hub, the Google, OpenAI and ElevenLabs TTS APIs and the GCS upload) is replaced by a
+fake that replays fixtures from benchmarks/data and sleeps for a latency sampled from
+the recorded profiles in backends.yaml. The pipeline code itself runs unchanged, so a
+benchmark run measures our code plus realistic waiting, without keys or network.
+"""
+
+import base64
+import contextlib
+import functools
+import hashlib
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from unittest import mock
+
+import yaml
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# From header per newsletter fixture; access.create_podcast_content queries these senders
+SENDERS = {
+    "axios": "Axios <mike@axios.com>",
+    "morning_brew": "Morning Brew <crew@morningbrew.com>",
+}
+
+# Speaking rate used to size the synthesized audio
+CHARS_PER_SECOND = 15
+
+# One silent MPEG-1 Layer III frame: 128 kbps, 44.1 kHz, mono, 417 bytes, ~26 ms
+_SILENT_FRAME = b"\xff\xfb\x90\xc4" + bytes(413)
+_FRAME_SECONDS = 1152 / 44100
+
+# z-score of the 95th percentile of a standard normal distribution
+_Z95 = 1.645
+
+
+def silent_mp3(seconds: float) -> bytes:
+    """MP3 bytes of the given duration of silence, decodable by ffmpeg and pydub."""
+    return _SILENT_FRAME * max(1, int(seconds / _FRAME_SECONDS))
+
+
+def silent_seconds(seconds: float) -> float:
+    """Exact duration of silent_mp3(seconds)."""
+    return max(1, int(seconds / _FRAME_SECONDS)) * _FRAME_SECONDS
+
+
+class Latency:
+    """Samples per-backend latencies from lognormal profiles and sleeps for them."""
+
+    def __init__(self, profiles: Dict[str, Dict[str, float]], time_scale: float = 1.0, seed: int = 0):
+        """
+        Args:
+            profiles (Dict[str, Dict[str, float]]): Backend name to median_ms, p95_ms and
+                optional per_kchar_ms (added per 1000 characters or bytes of the request)
+            time_scale (float): Multiplier for every sleep; 0 measures CPU time only
+            seed (int): Seed of the latency samples
+        """
+        self.profiles = profiles
+        self.time_scale = time_scale
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str = os.path.join(DATA_DIR, "backends.yaml"), **kwargs: Any) -> "Latency":
+        with open(path, "r") as f:
+            return cls(yaml.safe_load(f), **kwargs)
+
+    def sample(self, backend: str, size: int = 0) -> float:
+        """Latency of one call in seconds, before time scaling."""
+        profile = self.profiles.get(backend)
+        if not profile:
+            return 0.0
+        median = profile["median_ms"] / 1000
+        sigma = math.log(profile.get("p95_ms", profile["median_ms"]) / profile["median_ms"]) / _Z95
+        with self._lock:
+            seconds = self._random.lognormvariate(math.log(median), sigma)
+        return seconds + profile.get("per_kchar_ms", 0.0) * size / 1000 / 1000
+
+    def wait(self, backend: str, size: int = 0) -> None:
+        if self.time_scale > 0:
+            time.sleep(self.sample(backend, size) * self.time_scale)
+
+
+def _read(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _b64(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii")
+
+
+def load_newsletters(data_dir: str = DATA_DIR) -> List[Dict[str, str]]:
+    """
+    Load the newsletter corpus.
+
+    Returns:
+        List[Dict[str, str]]: One entry per file with name, subject, sender and html
+    """
+    newsletters_dir = os.path.join(data_dir, "newsletters")
+    newsletters = []
+    for name in sorted(os.listdir(newsletters_dir)):
+        if not name.endswith(".html"):
+            continue
+        html = _read(os.path.join(newsletters_dir, name))
+        title = re.search(r"<title>(.*?)</title>", html, re.IGNORECASE | re.DOTALL)
+        sender = next(
+            (value for prefix, value in SENDERS.items() if name.startswith(prefix)),
+            "Newsletter <newsletter@example.com>",
+        )
+        newsletters.append({
+            "name": name,
+            "subject": title.group(1).strip() if title else name,
+            "sender": sender,
+            "html": html,
+        })
+    return newsletters
+
+
+def load_transcripts(data_dir: str = DATA_DIR) -> List[str]:
+    """Load the recorded Person1/Person2 transcripts."""
+    transcripts_dir = os.path.join(data_dir, "transcripts")
+    return [_read(os.path.join(transcripts_dir, name)) for name in sorted(os.listdir(transcripts_dir))
+            if name.endswith(".txt")]
+
+
+class _Request:
+    """A prepared API call; execute() waits out the latency and returns the response."""
+
+    def __init__(self, latency: Latency, backend: str, response: Dict[str, Any]):
+        self._latency = latency
+        self._backend = backend
+        self._response = response
+
+    def execute(self) -> Dict[str, Any]:
+        self._latency.wait(self._backend)
+        return self._response
+
+
+class FakeGmailService:
+    """
+    Replays the newsletter corpus through the subset of the Gmail API the digest uses:
+    users().messages().list(...) and users().messages().get(...), each returning a
+    request whose execute() yields a recorded response.
+    """
+
+    def __init__(self, newsletters: List[Dict[str, str]], latency: Latency):
+        self._latency = latency
+        self._messages = {}
+        for i, newsletter in enumerate(newsletters):
+            msg_id = f"{i + 1:016x}"
+            # Real issues are multipart/alternative with a plain-text copy of the HTML
+            plain = re.sub(r"<[^>]+>", " ", newsletter["html"])
+            self._messages[msg_id] = {
+                "id": msg_id,
+                "threadId": msg_id,
+                "payload": {
+                    "mimeType": "multipart/alternative",
+                    "headers": [
+                        {"name": "Subject", "value": newsletter["subject"]},
+                        {"name": "From", "value": newsletter["sender"]},
+                    ],
+                    "parts": [
+                        {"mimeType": "text/plain", "body": {"data": _b64(plain)}},
+                        {"mimeType": "text/html", "body": {"data": _b64(newsletter["html"])}},
+                    ],
+                },
+            }
+
+    def users(self) -> "FakeGmailService":
+        return self
+
+    def messages(self) -> "FakeGmailService":
+        return self
+
+    def list(self, userId: str, q: str = "", **kwargs: Any) -> _Request:
+        listing = [{"id": m["id"], "threadId": m["threadId"]} for m in self._messages.values()]
+        return _Request(self._latency, "gmail.list", {"messages": listing, "resultSizeEstimate": len(listing)})
+
+    def get(self, userId: str, id: str, format: str = "full", **kwargs: Any) -> _Request:
+        return _Request(self._latency, "gmail.get", self._messages[id])
+
+
+class RecordedChatModel:
+    """
+    Stands in for ChatGoogleGenerativeAI: every prompt is answered with one of the
+    recorded transcripts, chosen by a hash of the prompt so a run is deterministic.
+    """
+
+    # Characters per streamed chunk
+    STREAM_PIECE_CHARS = 64
+
+    def __init__(self, transcripts: List[str], latency: Latency, model: str = "gemini", **kwargs: Any):
+        self.transcripts = transcripts
+        self.latency = latency
+        self.model = model
+
+    def _respond(self, prompt: Any) -> Tuple[str, Dict[str, int]]:
+        prompt_text = prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+        digest = int(hashlib.sha1(prompt_text.encode("utf-8")).hexdigest(), 16)
+        transcript = self.transcripts[digest % len(self.transcripts)]
+        input_tokens, output_tokens = len(prompt_text) // 4, len(transcript) // 4
+        usage = {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+        return transcript, usage
+
+    def invoke(self, prompt: Any, *args: Any, **kwargs: Any) -> Any:
+        from langchain_core.messages import AIMessage
+
+        transcript, usage = self._respond(prompt)
+        self.latency.wait("llm.gemini", len(transcript))
+        return AIMessage(content=transcript, usage_metadata=usage)
+
+    def stream(self, prompt: Any, *args: Any, **kwargs: Any) -> Iterator[Any]:
+        """Yield the response in pieces spread evenly over the sampled latency."""
+        from langchain_core.messages import AIMessageChunk
+
+        transcript, usage = self._respond(prompt)
+        pieces = [transcript[i:i + self.STREAM_PIECE_CHARS]
+                  for i in range(0, len(transcript), self.STREAM_PIECE_CHARS)]
+        delay = self.latency.sample("llm.gemini", len(transcript)) * self.latency.time_scale / max(1, len(pieces))
+        for i, piece in enumerate(pieces):
+            time.sleep(delay)
+            # Usage arrives with the last chunk, as with the Gemini API
+            yield AIMessageChunk(content=piece, usage_metadata=usage if i == len(pieces) - 1 else None)
+
+
+def recorded_prompt(ref: str, data_dir: str = DATA_DIR) -> Any:
+    """
+    Stands in for langchain hub.pull: the recorded system prompt of a template.
+
+    Args:
+        ref (str): "owner/template:commit"; templates without a recording fall back to
+            the standard podcastfy prompt
+    """
+    from langchain_core.prompts import ChatPromptTemplate
+
+    prompts_dir = os.path.join(data_dir, "prompts")
+    name = ref.split(":")[0].split("/")[-1]
+    path = os.path.join(prompts_dir, f"{name}.txt")
+    if not os.path.exists(path):
+        path = os.path.join(prompts_dir, "podcastfy_multimodal_cleanmarkup.txt")
+    return ChatPromptTemplate.from_messages([("system", _read(path))])
+
+
+def _recorded_providers(latency: Latency) -> Dict[str, type]:
+    """TTS provider classes that sleep like the real API and return silence of the right length."""
+    from app.podcastfy.transcript import Transcript, Turn
+    from app.podcastfy.tts.base import TTSProvider
+
+    class RecordedTTS(TTSProvider):
+        backend = "tts.gemini"
+
+        def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+            self.model = model
+
+        def generate_audio(self, text: Any, voice: str = "voice", model: Optional[str] = None,
+                           voice2: Optional[str] = None, **kwargs: Any) -> bytes:
+            text = str(text)
+            self.validate_parameters(text, voice, model or self.model)
+            latency.wait(self.backend, len(text))
+            return silent_mp3(len(text) / CHARS_PER_SECOND)
+
+    # Class names match the real providers, which TextToSpeech uses to find their config
+    class GeminiTTS(RecordedTTS):
+        backend = "tts.gemini"
+
+    class OpenAITTS(RecordedTTS):
+        backend = "tts.openai"
+
+        def get_supported_tags(self) -> List[str]:
+            return ["break", "emphasis"]
+
+    class ElevenLabsTTS(RecordedTTS):
+        backend = "tts.elevenlabs"
+
+        def get_supported_tags(self) -> List[str]:
+            return ["lang", "p", "phoneme", "s", "sub"]
+
+    class GeminiMultiTTS(RecordedTTS):
+        backend = "tts.geminimulti"
+        multi_speaker = True
+        MAX_CHUNK_BYTES = 1300
+
+        def prepare_chunks(self, text: Any, ending_message: str = "") -> List[Any]:
+            transcript = Transcript.parse(text).strip_markup(self.get_supported_tags())
+            if ending_message and transcript and transcript.turns[-1].speaker == 1:
+                transcript = Transcript(transcript.turns + [Turn(2, ending_message)])
+            return transcript.chunks(self.MAX_CHUNK_BYTES)
+
+        def synthesize_chunk(self, chunk: Any, voice: str = "R", model: str = "en-US-Studio-MultiSpeaker",
+                             voice2: str = "S") -> bytes:
+            chars = sum(len(turn.text) for turn in chunk)
+            latency.wait(self.backend, chars)
+            return silent_mp3(chars / CHARS_PER_SECOND)
+
+    return {
+        "gemini": GeminiTTS,
+        "geminimulti": GeminiMultiTTS,
+        "openai": OpenAITTS,
+        "elevenlabs": ElevenLabsTTS,
+    }
+
+
+def _recorded_upload(latency: Latency):
+    def upload(bucket_name: str, source_file_name: str, destination_blob_name: str,
+               content_type: Optional[str] = None, cache_control: Optional[str] = None) -> bool:
+        latency.wait("gcs.upload", os.path.getsize(source_file_name))
+        return True
+    return upload
+
+
+@contextlib.contextmanager
+def installed(latency: Latency, transcripts: List[str], llm: bool = True, tts: bool = True):
+    """
+    Route the pipeline's external calls to the recorded backends for the duration of the block.
+
+    Gmail needs no patching: FakeGmailService is passed wherever a service is expected.
+
+    Args:
+        latency (Latency): Latency profiles shared by every fake
+        transcripts (List[str]): Recorded LLM responses
+        llm (bool): Replace the Gemini chat model and the prompt hub
+        tts (bool): Replace the TTS providers and the GCS upload
+    """
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(mock.patch.dict(os.environ, {
+            "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "recorded"),
+            "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "recorded"),
+            "ELEVENLABS_API_KEY": os.environ.get("ELEVENLABS_API_KEY", "recorded"),
+        }))
+        if llm:
+            from app.podcastfy import content_generator
+
+            stack.enter_context(mock.patch.object(
+                content_generator, "ChatGoogleGenerativeAI",
+                functools.partial(RecordedChatModel, transcripts, latency),
+            ))
+            stack.enter_context(mock.patch.object(content_generator.hub, "pull", recorded_prompt))
+        if tts:
+            from app import storagemanagement
+            from app.podcastfy.tts.factory import TTSProviderFactory
+
+            stack.enter_context(mock.patch.dict(TTSProviderFactory._providers, _recorded_providers(latency)))
+            stack.enter_context(mock.patch.object(storagemanagement, "_upload_if_changed", _recorded_upload(latency)))
+        yield
@@ -0,0 +1,71 @@
+"""
+Footer filter check: newsletter chrome is dropped, news about the same terms is kept.
+
+Adds a last story whose headlines mention a privacy policy and unsubscribing to every
+newsletter of the corpus, extracts the body as the digest does (HTML and plain-text
+renderings), and checks that the story survives while every other line matching
+access.FOOTER_LINE (footer, "View in browser") does not.
+
+    python -m benchmarks.footer_lines
+
+Exits non-zero when a news line is dropped or a footer line is kept.
+"""
+
+import argparse
+import re
+import sys
+from typing import List, Optional
+
+from app import access, htmltext
+
+from . import fakes
+
+STORY = [
+    "1 big thing: Meta rewrites its privacy policy for AI training",
+    "The company will use public posts to train its models unless users opt out by August.",
+    "FTC says 40% of people unsubscribe",
+    "A new survey found most consumers drop a newsletter within a year of signing up.",
+]
+
+# The footer is the last row of the layout table
+FOOTER_ROW = re.compile(r'</td></tr>\s*<tr><td[^>]*>(?!.*<tr><td)', re.DOTALL)
+
+
+def with_story(html: str) -> str:
+    story = "".join(f"<h2>{line}</h2>" if i % 2 == 0 else f"<p>{line}</p>" for i, line in enumerate(STORY))
+    return FOOTER_ROW.sub(lambda m: f'<div class="story">{story}</div>\n{m.group()}', html, count=1)
+
+
+def payload(mime_type: str, text: str) -> dict:
+    return {"mimeType": mime_type, "body": {"data": fakes._b64(text)}}
+
+
+def check(name: str, body: str) -> List[str]:
+    lines = [line.strip() for line in body.split("\n")]
+    failures = [f"{name}: news line dropped: {line!r}" for line in STORY if line not in lines]
+    failures += [f"{name}: footer line kept: {line!r}" for line in lines
+                 if line not in STORY and access.FOOTER_LINE.search(line)]
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=fakes.DATA_DIR, help="fixture directory")
+    args = parser.parse_args(argv)
+
+    failures: List[str] = []
+    for newsletter in fakes.load_newsletters(args.data_dir):
+        html = with_story(newsletter["html"])
+        plain = htmltext.html_to_text(html, strip_hidden=True)
+        for mime_type, data in (("text/html", html), ("text/plain", plain)):
+            body = access.extract_parts([payload(mime_type, data)])
+            failures += check(f"{newsletter['name']} {mime_type}", body)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("ok" if not failures else f"{len(failures)} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Long-form generation memory benchmark on very large inputs.
+
+Runs LongFormContentGenerator over synthetic inputs of growing size with an LLM that
+answers instantly, and reports the peak RSS of every run next to the former approach:
+the whole input read into a string, split into a list of sentences, and every response
+appended to a context that started as the full input.
+
+    python -m benchmarks.longform_memory --sizes 1,10,100
+
+Every run is a separate process, so the peaks do not mask each other. Besides the peak,
+the RSS after imports and the largest CONTEXT and INPUT passed to one round are reported.
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+VARIANTS = ("legacy", "streaming")
+
+WORDS = ("the market rally continued as investors weighed new data on inflation and rates "
+         "while officials in several capitals signaled caution about the outlook for growth").split()
+
+
+class InstantChain:
+    """An LLM chain that answers every round at once with a fixed-size conversation part."""
+
+    def __init__(self, response_chars: int = 4000):
+        self.response = ("<Person1>" + "So what happened next? " * (response_chars // 50) + "</Person1>"
+                         "<Person2>" + "Here is the short version. " * (response_chars // 50) + "</Person2>")
+        self.rounds = 0
+        self.max_context = 0
+        self.max_input = 0
+
+    def invoke(self, params: Dict[str, Any]) -> str:
+        self.rounds += 1
+        self.max_context = max(self.max_context, len(params.get("context", "")))
+        self.max_input = max(self.max_input, len(params.get("input_text", "")))
+        return self.response
+
+
+def write_input(path: str, megabytes: int, seed: int = 0) -> None:
+    """Write megabytes of sentences, some with abbreviations and decimals, to path."""
+    rng = random.Random(seed)
+    target = megabytes * 1024 * 1024
+    written = 0
+    with open(path, "w") as f:
+        while written < target:
+            sentences = []
+            for _ in range(200):
+                words = rng.choices(WORDS, k=rng.randint(8, 30))
+                if rng.random() < 0.1:
+                    words.insert(rng.randrange(len(words)), f"{rng.randint(1, 99)}.{rng.randint(0, 9)}%")
+                sentences.append(" ".join(words).capitalize() + rng.choice((".", ".", ".", "?", "!")))
+            block = " ".join(sentences) + ("\n\n" if rng.random() < 0.3 else " ")
+            f.write(block)
+            written += len(block)
+
+
+def legacy_generate_long_form(path: str, chain: InstantChain, max_num_chunks: int, min_chunk_size: int) -> str:
+    """The former LongFormContentGenerator.generate_long_form, reading the whole input."""
+    with open(path) as f:
+        input_content = f.read()
+    input_length = len(input_content)
+    if input_length <= min_chunk_size:
+        chunk_size = input_length
+    elif input_length // max_num_chunks >= min_chunk_size:
+        chunk_size = input_length // max_num_chunks
+    else:
+        chunk_size = input_length // (input_length // min_chunk_size)
+
+    sentences = input_content.split('. ')
+    chunks = []
+    current_chunk: List[str] = []
+    current_length = 0
+    for sentence in sentences:
+        if current_length + len(sentence) > chunk_size and current_chunk:
+            chunks.append('. '.join(current_chunk) + '.')
+            current_chunk = []
+            current_length = 0
+        current_chunk.append(sentence)
+        current_length += len(sentence)
+    if current_chunk:
+        chunks.append('. '.join(current_chunk) + '.')
+
+    parts = []
+    chat_context = input_content
+    for i, chunk in enumerate(chunks):
+        response = chain.invoke({"context": chat_context, "input_text": chunk})
+        chat_context = response if i == 0 else chat_context + response
+        parts.append(response)
+    return "\n".join(parts)
+
+
+def run_variant(variant: str, path: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    """One run in this process; returns its measurements."""
+    from app.podcastfy.content_generator import LongFormContentGenerator
+
+    chain = InstantChain()
+    # Imports (langchain) alone; the peak minus this is what the run itself used
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    start = time.perf_counter()
+    if variant == "legacy":
+        transcript = legacy_generate_long_form(path, chain, config["max_num_chunks"], config["min_chunk_size"])
+    else:
+        generator = LongFormContentGenerator(chain, None, config)
+        with open(path) as f:
+            transcript = generator.generate_long_form(f, {"podcast_name": "Bench", "podcast_tagline": "Bench"})
+    return {
+        "seconds": time.perf_counter() - start,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "rounds": chain.rounds,
+        "max_context_chars": chain.max_context,
+        "max_input_chars": chain.max_input,
+        "transcript_chars": len(transcript),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,10,100", help="input sizes in MB, comma separated")
+    parser.add_argument("--variants", default=",".join(VARIANTS), help="variants to run, comma separated")
+    parser.add_argument("--max-num-chunks", type=int, default=8)
+    parser.add_argument("--min-chunk-size", type=int, default=600)
+    parser.add_argument("--max-chunk-tokens", type=int, default=100000)
+    parser.add_argument("--context-tokens", type=int, default=8000)
+    parser.add_argument("--child", nargs=2, metavar=("VARIANT", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    config = {
+        "max_num_chunks": args.max_num_chunks,
+        "min_chunk_size": args.min_chunk_size,
+        "max_chunk_tokens": args.max_chunk_tokens,
+        "context_tokens": args.context_tokens,
+    }
+    if args.child:
+        # Progress prints of the generator would interleave with the result
+        sys.stdout = open(os.devnull, "w")
+        result = run_variant(args.child[0], args.child[1], config)
+        sys.stdout = sys.__stdout__
+        print(json.dumps(result))
+        return 0
+
+    print(f"{'MB':>5s} {'variant':10s} {'seconds':>8s} {'import RSS MB':>14s} {'peak RSS MB':>12s} {'rounds':>7s} "
+          f"{'max context':>12s} {'max input':>10s}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in (int(s) for s in args.sizes.split(",")):
+            path = os.path.join(work_dir, f"input_{size}mb.txt")
+            write_input(path, size)
+            for variant in args.variants.split(","):
+                command = [sys.executable, "-m", "benchmarks.longform_memory", "--child", variant, path,
+                           "--max-num-chunks", str(args.max_num_chunks), "--min-chunk-size", str(args.min_chunk_size),
+                           "--max-chunk-tokens", str(args.max_chunk_tokens),
+                           "--context-tokens", str(args.context_tokens)]
+                completed = subprocess.run(command, capture_output=True, text=True)
+                if completed.returncode != 0:
+                    print(f"{size:5d} {variant:10s} failed: {completed.stderr.strip().splitlines()[-1:]}")
+                    continue
+                r = json.loads(completed.stdout.strip().splitlines()[-1])
+                print(f"{size:5d} {variant:10s} {r['seconds']:8.2f} {r['baseline_rss_mb']:14.0f} "
+                      f"{r['peak_rss_mb']:12.0f} {r['rounds']:7d} "
+                      f"{r['max_context_chars']:12d} {r['max_input_chars']:10d}")
+            os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+End-to-end digest benchmark over the recorded backends.
+
+Simulates N users running the nightly digest (Gmail fetch, HTML cleaning, boilerplate
+stripping, story clustering, transcript generation, TTS, audio assembly and upload) on a
+pool of workers, and reports throughput, p50/p95 latency per traced stage and peak RSS.
+
+    python -m benchmarks.run --users 20 --workers 4 --time-scale 0.1
+    python -m benchmarks.run --stage ingest --time-scale 0   # CPU cost of ingestion only
+
+--stage selects how far each episode goes: "ingest" stops after the newsletter content
+is built, "transcript" after the LLM, "audio" (the default) runs the whole digest.
+"""
+
+import argparse
+import concurrent.futures
+import contextlib
+import io
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from app import access, boilerplate
+from app.podcastfy.utils import tracing
+
+from . import fakes
+
+STAGES = ("ingest", "transcript", "audio")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_user(index: int, args: argparse.Namespace, service: fakes.FakeGmailService,
+             boilerplate_index: boilerplate.BoilerplateIndex, work_dir: str) -> tracing.TraceCollector:
+    """Builds one simulated user's episode and returns its spans."""
+    with tracing.collect() as trace:
+        with tracing.span("digest.episode", user=index):
+            content = access.create_podcast_content(service, boilerplate_index)
+            if content and args.stage != "ingest":
+                from app import podcast, storagemanagement
+                from app.podcastfy.client import generate_podcast
+
+                # Each user writes its transcript and audio to its own directory
+                user_dir = os.path.join(work_dir, f"user{index}")
+                os.makedirs(user_dir, exist_ok=True)
+                conversation_config = dict(
+                    podcast.podcast_config,
+                    text_to_speech={"output_directories": {"transcripts": user_dir, "audio": user_dir}},
+                )
+                audio_file = generate_podcast(
+                    text=content,
+                    llm_model_name="gemini-2.5-pro",
+                    tts_model=args.tts_model,
+                    conversation_config=conversation_config,
+                    transcript_only=args.stage == "transcript",
+                )
+                if args.stage == "audio":
+                    storagemanagement.upload_blob("benchmark", audio_file, f"static/user{index}_{os.path.basename(audio_file)}")
+    return trace
+
+
+def summarize(traces: List[tracing.TraceCollector], elapsed: float) -> Dict[str, Any]:
+    """Throughput, per-stage latency percentiles and peak RSS of a run."""
+    durations: Dict[str, List[float]] = {}
+    for trace in traces:
+        for current in trace.spans:
+            durations.setdefault(current.name, []).append(current.duration_ms or 0.0)
+    stages = {
+        name: {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 0.50), 1),
+            "p95_ms": round(percentile(values, 0.95), 1),
+            "total_ms": round(sum(values), 1),
+        }
+        for name, values in durations.items()
+    }
+    return {
+        "users": len(traces),
+        "elapsed_s": round(elapsed, 2),
+        "users_per_min": round(60 * len(traces) / elapsed, 2) if elapsed else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "stages": dict(sorted(stages.items(), key=lambda item: item[1]["total_ms"], reverse=True)),
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"{report['users']} users in {report['elapsed_s']} s: {report['users_per_min']} users/min, "
+          f"peak RSS {report['peak_rss_mb']} MB")
+    print(f"{'stage':24s} {'count':>6s} {'p50 ms':>10s} {'p95 ms':>10s} {'total ms':>12s}")
+    for name, stage in report["stages"].items():
+        print(f"{name:24s} {stage['count']:6d} {stage['p50_ms']:10.1f} {stage['p95_ms']:10.1f} "
+              f"{stage['total_ms']:12.1f}")
+
+
+def main(argv: List[str] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10, help="simulated users")
+    parser.add_argument("--workers", type=int, default=1, help="users processed concurrently")
+    parser.add_argument("--stage", choices=STAGES, default="audio", help="last stage of each episode")
+    parser.add_argument("--tts-model", default="gemini", choices=("gemini", "geminimulti", "openai", "elevenlabs"),
+                        help="recorded TTS provider")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="multiplier for the recorded latencies; 0 measures CPU time only")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the latency samples")
+    parser.add_argument("--data-dir", default=fakes.DATA_DIR, help="fixture directory")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep the pipeline's own output")
+    args = parser.parse_args(argv)
+
+    # Span log lines would swamp the report; the collectors still see every span
+    tracing.logger.disabled = not args.verbose
+
+    latency = fakes.Latency.load(os.path.join(args.data_dir, "backends.yaml"),
+                                 time_scale=args.time_scale, seed=args.seed)
+    service = fakes.FakeGmailService(fakes.load_newsletters(args.data_dir), latency)
+    transcripts = fakes.load_transcripts(args.data_dir)
+    # Shared by all users, as in the digest task
+    boilerplate_index = boilerplate.BoilerplateIndex()
+
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with tempfile.TemporaryDirectory() as work_dir, \
+            fakes.installed(latency, transcripts, llm=args.stage != "ingest", tts=args.stage == "audio"):
+        start = time.perf_counter()
+        with output, concurrent.futures.ThreadPoolExecutor(max_workers=args.workers) as pool:
+            futures = [
+                pool.submit(run_user, index, args, service, boilerplate_index, work_dir)
+                for index in range(args.users)
+            ]
+            traces = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+
+    report = summarize(traces, elapsed)
+    report["config"] = {k: v for k, v in vars(args).items() if k not in ("json_path", "verbose")}
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()